@@ -0,0 +1,5 @@
+import time
+
+# Set when the first app module is imported; startup timings are measured
+# from here
+IMPORT_STARTED = time.perf_counter()
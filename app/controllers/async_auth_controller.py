@@ -0,0 +1,305 @@
+"""Async counterparts of app.controllers.auth_controller (DB_MODE=async).
+
+HTTP behaviour is identical to the sync controller; only the database
+round-trips are awaited. bcrypt is CPU bound, so hashing and verification
+run on the CPU executor and are awaited.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.controllers.auth_controller import (
+    build_user_verification_email,
+    email_taken_query,
+    reject_existing_email,
+)
+from app.core.config import SECRET_KEY, ALGORITHM
+from app.core.logger import logger
+from app.core.revocation import revocation_store
+from app.core.security import (
+    create_access_token,
+    hash_password_async,
+    verify_and_update_password_async,
+)
+from app.models.auth_user import User
+from app.schema.user_schema import UserCreate, UserLogin
+from app.utils.auth_service import verify_email_verification_token
+from app.utils.email_outbox import enqueue_email_async
+
+
+async def _get_user_by(db: AsyncSession, **filters):
+    result = await db.execute(select(User).filter_by(**filters))
+    return result.scalars().first()
+
+
+# Signup user
+async def create_user(user: UserCreate, db: AsyncSession):
+    logger.debug("Creating user account for email: {}", user.email)
+
+    if not user:
+        logger.warning("Invalid user data provided during signup")
+        raise HTTPException(status_code=400, detail="Invalid user data")
+
+    if (await db.execute(email_taken_query(user.email))).first():
+        reject_existing_email(user.email)
+
+    user_obj = User(
+        id=uuid.uuid4(),
+        first_name=user.first_name,
+        last_name=user.last_name,
+        email=user.email,
+        password_hash=await hash_password_async(user.password),
+        is_active=False,  # Set to inactive until email is verified
+    )
+    db.add(user_obj)
+    logger.debug("Queueing verification email to: {}", user_obj.email)
+    await queue_user_verification_email(
+        db, user_obj.email, str(user_obj.id), check_pending=False
+    )
+    # The unique index catches a signup racing this one past the check
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        reject_existing_email(user.email)
+    logger.info("User account created: {} (ID: {})", user.email, user_obj.id)
+
+    return {
+        "user_id": user_obj.id,
+        "email": user_obj.email,
+        "message": "User created successfully. Please verify your email.",
+    }
+
+
+# Signin user
+async def authenticate_user(user_in: UserLogin, db: AsyncSession):
+    logger.debug("Authenticating user: {}", user_in.email)
+
+    user = await _get_user_by(db, email=user_in.email)
+
+    valid, new_hash = (
+        await verify_and_update_password_async(
+            user_in.password, user.password_hash
+        )
+        if user else (False, None)
+    )
+    if not valid:
+        logger.warning("Failed login attempt for email: {}", user_in.email)
+        raise HTTPException(status_code=400, detail="Invalid login data")
+
+    if not user.is_active:
+        logger.warning("Login attempt for inactive user: {}", user_in.email)
+        raise HTTPException(status_code=403, detail="User account is inactive")
+
+    if new_hash:
+        await db.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(password_hash=new_hash)
+        )
+        await db.commit()
+        logger.info("Password rehashed for user: {}", user.id)
+
+    logger.info(
+        "User authenticated successfully: {} (ID: {})", user_in.email, user.id
+    )
+
+    now = datetime.utcnow()
+    access_data = {
+        "sub": str(user.id),
+        "role": user.role,
+        "iat": now,
+        "exp": now + timedelta(hours=1),
+        "type": "access",
+    }
+    access_token = create_access_token(data=access_data)
+
+    refresh_data = {
+        "sub": str(user.id),
+        "iat": now,
+        "exp": now + timedelta(days=7),
+        "type": "refresh",
+        # Identifies the token for revocation
+        "jti": uuid.uuid4().hex,
+    }
+    refresh_token = create_access_token(data=refresh_data)
+
+    logger.debug("Access and refresh tokens generated for user: {}", user.id)
+
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": 3600,
+    }
+
+
+# Refresh token
+async def refresh_access_token(refresh_token: str, db: AsyncSession):
+    logger.debug("Attempting to refresh access token")
+
+    try:
+        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        if payload.get("type") != "refresh":
+            logger.warning("Invalid token type for refresh operation")
+            raise HTTPException(status_code=400, detail="Invalid token type")
+
+        jti = payload.get("jti")
+        if not jti or await revocation_store.is_revoked_async(
+            db, jti, payload["exp"]
+        ):
+            logger.warning("Revoked or unidentified refresh token: {}", jti)
+            raise HTTPException(
+                status_code=401, detail="Could not validate credentials"
+            )
+
+        user_id = payload.get("sub")
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except (TypeError, ValueError):
+            logger.warning("Invalid subject in refresh token: {}", user_id)
+            raise HTTPException(
+                status_code=401, detail="Could not validate credentials"
+            )
+        user = await _get_user_by(db, id=user_uuid)
+        if not user:
+            logger.warning("User not found for token refresh: {}", user_id)
+            raise HTTPException(status_code=404, detail="User not found")
+
+        if not user.is_active:
+            logger.warning("Token refresh for inactive user: {}", user_id)
+            raise HTTPException(
+                status_code=403, detail="User account is inactive"
+            )
+
+        logger.info("Refresh token validated for user: {}", user_id)
+
+        now = datetime.utcnow()
+        access_data = {
+            "sub": str(user.id),
+            "role": user.role,
+            "iat": now,
+            "exp": now + timedelta(hours=1),
+            "type": "access",
+        }
+        new_access_token = create_access_token(data=access_data)
+        logger.debug("New access token created for user: {}", user_id)
+
+        return {
+            "access_token": new_access_token,
+            "token_type": "bearer",
+            "expires_in": 3600,
+        }
+    except JWTError as e:
+        logger.error("JWT error during token refresh: {}", e)
+        raise HTTPException(
+            status_code=401, detail="Could not validate credentials"
+        )
+
+
+# Revoke refresh token
+async def revoke_refresh_token(refresh_token: str, db: AsyncSession):
+    logger.debug("Attempting to revoke refresh token")
+
+    try:
+        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as e:
+        logger.warning("JWT error during token revocation: {}", e)
+        raise HTTPException(
+            status_code=401, detail="Could not validate credentials"
+        )
+    if payload.get("type") != "refresh" or not payload.get("jti"):
+        logger.warning("Invalid token type for revoke operation")
+        raise HTTPException(status_code=400, detail="Invalid token type")
+
+    await revocation_store.revoke_async(db, payload["jti"], payload["exp"])
+    logger.info("Refresh token revoked for user: {}", payload.get("sub"))
+    return {"message": "Refresh token revoked"}
+
+
+# Activate user email
+async def activate_user_email(token: str, db: AsyncSession):
+    """Activate user email by verifying the email verification token"""
+    logger.debug("Attempting to activate user email with token")
+
+    try:
+        user_id = verify_email_verification_token(token)
+        if not user_id:
+            logger.warning("Email verification token missing user ID")
+            raise HTTPException(status_code=400, detail="Invalid token")
+        user_id = uuid.UUID(user_id)
+
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, User.is_active.is_not(True))
+            .values(is_active=True)
+            .returning(User.id, User.email)
+        )
+        user = result.first()
+        if not user:
+            if await _get_user_by(db, id=user_id):
+                logger.warning(
+                    "Email activation attempted for already active user: {}",
+                    user_id
+                )
+                raise HTTPException(
+                    status_code=400, detail="User email already activated"
+                )
+            logger.warning(
+                "User not found during email activation: {}", user_id
+            )
+            raise HTTPException(status_code=404, detail="User not found")
+
+        await db.commit()
+        logger.info(
+            "User email activated successfully: {} (ID: {})",
+            user.email, user_id
+        )
+
+        return {
+            "message": "User email activated successfully",
+            "user_id": user.id,
+            "email": user.email,
+        }
+
+    except JWTError as e:
+        logger.error("JWT error during email verification: {}", e)
+        raise HTTPException(
+            status_code=401, detail="Invalid or expired verification token"
+        )
+    except Exception as e:
+        logger.error("Error activating email: {}", e)
+        raise HTTPException(
+            status_code=400, detail=f"Error activating email: {str(e)}"
+        )
+
+
+async def verify_user_email_request(email: str, db: AsyncSession):
+    logger.debug("Email verification requested for: {}", email)
+
+    user = await _get_user_by(db, email=email)
+    if not user:
+        logger.warning(
+            "Email verification request for non-existent email: {}", email
+        )
+        raise HTTPException(status_code=404, detail="User not found")
+
+    logger.info("Queueing verification email to: {}", email)
+    await queue_user_verification_email(db, user.email, str(user.id))
+    await db.commit()
+    return {"message": "Verification email sent successfully"}
+
+
+async def queue_user_verification_email(
+    db: AsyncSession, to_email: str, user_id: str, check_pending: bool = True
+):
+    email = build_user_verification_email(user_id)
+    await enqueue_email_async(
+        db, to_email, check_pending=check_pending, **email
+    )
+    logger.info("Verification email queued for: {}", to_email)
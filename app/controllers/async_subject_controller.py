@@ -0,0 +1,220 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.controllers.subject_controller import (
+    ESTIMATED_COUNT_SQL,
+    SUBJECT_FIELDS,
+    SUBJECTS_TABLE,
+    build_subject,
+    build_subject_query,
+    build_subjects_count,
+    build_subjects_page,
+    build_subjects_page_query,
+    build_search_query,
+    build_search_results,
+    build_bulk_delete_result,
+    build_filter_conditions,
+    build_filter_delete,
+    bulk_delete_by_ids_chunks,
+    bulk_insert_chunks,
+    collect_bulk_result,
+    decode_cursor,
+    filter_delete_sizes,
+    plan_bulk_insert,
+    subject_cache,
+    subject_key,
+    subjects_count_key,
+    subjects_page_key,
+    subjects_search_key,
+    table_versions,
+)
+from app.core.cache import CachedValue
+from app.models.subject import Subject
+from app.schema import subject_schema as schemas
+from app.core.config import SUBJECTS_COUNT_MODE
+from app.core.logger import logger
+
+
+async def create_subject(db: AsyncSession, subject: schemas.SubjectCreate):
+    logger.debug("Creating subject in database: {}", subject.name)
+    db_subject = Subject(**subject.model_dump())
+    db.add(db_subject)
+    await table_versions.bump_async(db, SUBJECTS_TABLE)
+    await db.commit()
+    table_versions.mark_stale(SUBJECTS_TABLE)
+    logger.debug("Subject created with ID: {}", db_subject.id)
+    return db_subject
+
+
+async def create_subjects_bulk(
+    db: AsyncSession, subjects: list[schemas.SubjectCreate]
+) -> dict:
+    logger.debug("Bulk creating {} subjects", len(subjects))
+    rows, conflicts = plan_bulk_insert(subjects)
+    created = []
+    dialect_name = db.get_bind().dialect.name
+    try:
+        for chunk, statement in bulk_insert_chunks(dialect_name, rows):
+            if statement is not None:
+                returned = (await db.execute(statement)).all()
+            else:
+                returned = await _insert_rows_one_by_one(db, chunk)
+            created += collect_bulk_result(chunk, returned, conflicts)
+        if created:
+            await table_versions.bump_async(db, SUBJECTS_TABLE)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    table_versions.mark_stale(SUBJECTS_TABLE)
+    conflicts.sort(key=lambda c: c["index"])
+    logger.debug(
+        "Bulk create finished: {} created, {} conflicts",
+        len(created), len(conflicts)
+    )
+    return {"created": created, "conflicts": conflicts}
+
+
+async def _insert_rows_one_by_one(db: AsyncSession, chunk) -> list:
+    returned = []
+    for _, values in chunk:
+        try:
+            async with db.begin_nested():
+                result = await db.execute(
+                    insert(Subject)
+                    .values(values)
+                    .returning(*SUBJECT_FIELDS.values())
+                )
+                returned.append(result.one())
+        except IntegrityError:
+            pass
+    return returned
+
+
+async def get_subject(db: AsyncSession, subject_id: int) -> CachedValue:
+    version = await table_versions.current_async(db, SUBJECTS_TABLE)
+
+    async def load():
+        logger.debug("Querying subject with ID: {}", subject_id)
+        result = await db.execute(build_subject_query(subject_id))
+        return build_subject(result.first())
+
+    return await subject_cache.get_or_load_async(
+        subject_key(version, subject_id), load
+    )
+
+
+async def get_subjects(
+    db: AsyncSession, limit: int, after: str | None = None,
+    fields: list[str] | None = None,
+) -> CachedValue:
+    fields = fields or list(SUBJECT_FIELDS)
+    after_id = decode_cursor(after) if after else None
+    version = await table_versions.current_async(db, SUBJECTS_TABLE)
+
+    async def load():
+        logger.debug(
+            "Querying subjects page: limit={}, after={}", limit, after_id
+        )
+        query = build_subjects_page_query(limit, after_id, fields)
+        result = await db.execute(query)
+        return build_subjects_page(result.all(), limit, fields)
+
+    key = subjects_page_key(version, limit, after_id, fields)
+    return await subject_cache.get_or_load_async(key, load)
+
+
+async def search_subjects(
+    db: AsyncSession, q: str, limit: int, offset: int = 0
+) -> CachedValue:
+    version = await table_versions.current_async(db, SUBJECTS_TABLE)
+
+    async def load():
+        logger.debug(
+            "Searching subjects: q={!r}, limit={}, offset={}",
+            q, limit, offset,
+        )
+        dialect_name = db.get_bind().dialect.name
+        query = build_search_query(dialect_name, q, limit, offset)
+        result = await db.execute(query)
+        return build_search_results(result.all(), limit, offset)
+
+    key = subjects_search_key(version, q, limit, offset)
+    return await subject_cache.get_or_load_async(key, load)
+
+
+async def count_subjects(db: AsyncSession) -> tuple[int, bool]:
+    version = await table_versions.current_async(db, SUBJECTS_TABLE)
+
+    async def load():
+        if (
+            SUBJECTS_COUNT_MODE == "estimated"
+            and db.get_bind().dialect.name == "postgresql"
+        ):
+            estimate = (await db.execute(ESTIMATED_COUNT_SQL)).scalar()
+            if estimate is not None and estimate >= 0:
+                return build_subjects_count(int(estimate), True)
+        total = (
+            await db.execute(select(func.count()).select_from(Subject))
+        ).scalar()
+        return build_subjects_count(total, False)
+
+    cached = await subject_cache.get_or_load_async(
+        subjects_count_key(version), load
+    )
+    return tuple(cached.payload)
+
+
+async def delete_subject(db: AsyncSession, subject_id: int):
+    logger.debug("Deleting subject with ID: {}", subject_id)
+    result = await db.execute(
+        delete(Subject)
+        .where(Subject.id == subject_id)
+        .returning(*SUBJECT_FIELDS.values())
+    )
+    subject = result.first()
+    if subject:
+        await table_versions.bump_async(db, SUBJECTS_TABLE)
+        await db.commit()
+        table_versions.mark_stale(SUBJECTS_TABLE)
+        logger.debug("Subject with ID {} deleted from database", subject_id)
+    return subject
+
+
+async def delete_subjects_bulk(
+    db: AsyncSession, request: schemas.SubjectBulkDelete
+) -> dict:
+    deleted = []
+    has_more = False
+    ids = list(dict.fromkeys(request.ids)) if request.ids else None
+    try:
+        if ids is not None:
+            logger.debug("Bulk deleting {} subjects by id", len(ids))
+            for _, statement in bulk_delete_by_ids_chunks(ids):
+                deleted += (await db.execute(statement)).scalars().all()
+        else:
+            logger.debug(
+                "Bulk deleting subjects by filter: {}", request.filter
+            )
+            conditions = build_filter_conditions(request.filter)
+            for size in filter_delete_sizes():
+                statement = build_filter_delete(conditions, size)
+                chunk = (await db.execute(statement)).scalars().all()
+                deleted += chunk
+                if len(chunk) < size:
+                    break
+            else:
+                result = await db.execute(
+                    select(Subject.id).where(*conditions).limit(1)
+                )
+                has_more = result.first() is not None
+        if deleted:
+            await table_versions.bump_async(db, SUBJECTS_TABLE)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    if deleted:
+        table_versions.mark_stale(SUBJECTS_TABLE)
+    logger.debug("Bulk delete finished: {} deleted", len(deleted))
+    return build_bulk_delete_result(ids, deleted, has_more)
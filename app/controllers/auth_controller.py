@@ -1,17 +1,21 @@
+import uuid
 from os import getenv
 from app.schema.user_schema import UserCreate, UserLogin
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.models.auth_user import User
 from app.core.security import (
     create_access_token,
     hash_password,
-    verify_password,
+    verify_and_update_password,
 )
 from datetime import datetime, timedelta
 from app.core.config import SECRET_KEY, ALGORITHM
-from app.utils.email_service import send_email
+from app.utils.email_outbox import enqueue_email
 from app.core.logger import logger
+from app.core.revocation import revocation_store
 from app.utils.auth_service import (
     generate_email_verification_token,
     verify_email_verification_token,
@@ -19,20 +23,29 @@ from app.utils.auth_service import (
 from jose import JWTError, jwt
 
 
+def email_taken_query(email: str):
+    # Index-only lookup, so a duplicate signup is rejected before bcrypt
+    return select(User.id).where(User.email == email).limit(1)
+
+
+def reject_existing_email(email: str):
+    logger.warning("Signup attempt with existing email: {}", email)
+    raise HTTPException(status_code=409, detail="Email already registered")
+
+
 # Signup user
 def create_user(user: UserCreate, db: Session):
-    logger.debug(f"Creating user account for email: {user.email}")
+    logger.debug("Creating user account for email: {}", user.email)
 
     if not user:
         logger.warning("Invalid user data provided during signup")
         raise HTTPException(status_code=400, detail="Invalid user data")
 
-    if db.query(User).filter_by(email=user.email).first():
-        logger.warning(f"Signup attempt with existing email: {user.email}")
-        raise HTTPException(status_code=409, detail="Email already registered")
+    if db.execute(email_taken_query(user.email)).first():
+        reject_existing_email(user.email)
 
-    logger.debug(f"User account validation passed for {user.email}")
     user_obj = User(
+        id=uuid.uuid4(),
         first_name=user.first_name,
         last_name=user.last_name,
         email=user.email,
@@ -40,13 +53,18 @@ def create_user(user: UserCreate, db: Session):
         is_active=False,  # Set to inactive until email is verified
     )
     db.add(user_obj)
-    db.commit()
-    db.refresh(user_obj)
-    logger.info(f"User account created: {user.email} (ID: {user_obj.id})")
-
-    # Send Email for verification
-    logger.debug(f"Sending verification email to: {user_obj.email}")
-    send_user_verification_email(user_obj.email, str(user_obj.id))
+    # Queue the verification email in the same transaction as the user
+    logger.debug("Queueing verification email to: {}", user_obj.email)
+    queue_user_verification_email(
+        db, user_obj.email, str(user_obj.id), check_pending=False
+    )
+    # The unique index catches a signup racing this one past the check
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        reject_existing_email(user.email)
+    logger.info("User account created: {} (ID: {})", user.email, user_obj.id)
 
     return {
         "user_id": user_obj.id,
@@ -57,20 +75,29 @@ def create_user(user: UserCreate, db: Session):
 
 # Signin user
 def authenticate_user(user_in: UserLogin, db: Session):
-    logger.debug(f"Authenticating user: {user_in.email}")
+    logger.debug("Authenticating user: {}", user_in.email)
 
     user = db.query(User).filter_by(email=user_in.email).first()
 
-    if not user or not verify_password(user_in.password, user.password_hash):
-        logger.warning(f"Failed login attempt for email: {user_in.email}")
+    valid, new_hash = (
+        verify_and_update_password(user_in.password, user.password_hash)
+        if user else (False, None)
+    )
+    if not valid:
+        logger.warning("Failed login attempt for email: {}", user_in.email)
         raise HTTPException(status_code=400, detail="Invalid login data")
 
     if not user.is_active:
-        logger.warning(f"Login attempt for inactive user: {user_in.email}")
+        logger.warning("Login attempt for inactive user: {}", user_in.email)
         raise HTTPException(status_code=403, detail="User account is inactive")
 
+    if new_hash:
+        # Stored with an outdated cost; move it to BCRYPT_ROUNDS
+        set_password_hash(db, new_hash, id=user.id)
+        logger.info("Password rehashed for user: {}", user.id)
+
     logger.info(
-        f"User authenticated successfully: {user_in.email} (ID: {user.id})"
+        "User authenticated successfully: {} (ID: {})", user_in.email, user.id
     )
 
     # Create the JWT token
@@ -92,10 +119,12 @@ def authenticate_user(user_in: UserLogin, db: Session):
         "iat": now,
         "exp": now + timedelta(days=7),
         "type": "refresh",
+        # Identifies the token for revocation
+        "jti": uuid.uuid4().hex,
     }
     refresh_token = create_access_token(data=refresh_data)
 
-    logger.debug(f"Access and refresh tokens generated for user: {user.id}")
+    logger.debug("Access and refresh tokens generated for user: {}", user.id)
 
     return {
         "access_token": access_token,
@@ -115,13 +144,35 @@ def refresh_access_token(refresh_token: str, db: Session):
             logger.warning("Invalid token type for refresh operation")
             raise HTTPException(status_code=400, detail="Invalid token type")
 
+        jti = payload.get("jti")
+        if not jti or revocation_store.is_revoked(
+            db, jti, payload["exp"]
+        ):
+            logger.warning("Revoked or unidentified refresh token: {}", jti)
+            raise HTTPException(
+                status_code=401, detail="Could not validate credentials"
+            )
+
         user_id = payload.get("sub")
-        user = db.query(User).filter_by(id=user_id).first()
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except (TypeError, ValueError):
+            logger.warning("Invalid subject in refresh token: {}", user_id)
+            raise HTTPException(
+                status_code=401, detail="Could not validate credentials"
+            )
+        user = db.query(User).filter_by(id=user_uuid).first()
         if not user:
-            logger.warning(f"User not found for token refresh: {user_id}")
+            logger.warning("User not found for token refresh: {}", user_id)
             raise HTTPException(status_code=404, detail="User not found")
 
-        logger.info(f"Refresh token validated for user: {user_id}")
+        if not user.is_active:
+            logger.warning("Token refresh for inactive user: {}", user_id)
+            raise HTTPException(
+                status_code=403, detail="User account is inactive"
+            )
+
+        logger.info("Refresh token validated for user: {}", user_id)
 
         now = datetime.utcnow()
         access_data = {
@@ -132,7 +183,7 @@ def refresh_access_token(refresh_token: str, db: Session):
             "type": "access",
         }
         new_access_token = create_access_token(data=access_data)
-        logger.debug(f"New access token created for user: {user_id}")
+        logger.debug("New access token created for user: {}", user_id)
 
         return {
             "access_token": new_access_token,
@@ -140,10 +191,30 @@ def refresh_access_token(refresh_token: str, db: Session):
             "expires_in": 3600,
         }
     except JWTError as e:
-        logger.error(f"JWT error during token refresh: {str(e)}")
+        logger.error("JWT error during token refresh: {}", e)
+        raise HTTPException(
+            status_code=401, detail="Could not validate credentials"
+        )
+
+
+# Revoke refresh token
+def revoke_refresh_token(refresh_token: str, db: Session):
+    logger.debug("Attempting to revoke refresh token")
+
+    try:
+        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as e:
+        logger.warning("JWT error during token revocation: {}", e)
         raise HTTPException(
             status_code=401, detail="Could not validate credentials"
         )
+    if payload.get("type") != "refresh" or not payload.get("jti"):
+        logger.warning("Invalid token type for revoke operation")
+        raise HTTPException(status_code=400, detail="Invalid token type")
+
+    revocation_store.revoke(db, payload["jti"], payload["exp"])
+    logger.info("Refresh token revoked for user: {}", payload.get("sub"))
+    return {"message": "Refresh token revoked"}
 
 
 # Activate user email
@@ -156,31 +227,34 @@ def activate_user_email(token: str, db: Session):
         if not user_id:
             logger.warning("Email verification token missing user ID")
             raise HTTPException(status_code=400, detail="Invalid token")
-
-        # Find user and activate
-        user = db.query(User).filter_by(id=user_id).first()
+        user_id = uuid.UUID(user_id)
+
+        # Activate in one statement; only look the user up to tell
+        # "not found" from "already active" when nothing was updated
+        user = db.execute(
+            update(User)
+            .where(User.id == user_id, User.is_active.is_not(True))
+            .values(is_active=True)
+            .returning(User.id, User.email)
+        ).first()
         if not user:
+            if db.execute(select(User.id).filter_by(id=user_id)).first():
+                logger.warning(
+                    "Email activation attempted for already active user: {}",
+                    user_id
+                )
+                raise HTTPException(
+                    status_code=400, detail="User email already activated"
+                )
             logger.warning(
-                f"User not found during email activation: {user_id}"
+                "User not found during email activation: {}", user_id
             )
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Check if already activated
-        if user.is_active:
-            logger.warning(
-                "Email activation attempted for already active user: %s",
-                user_id
-            )
-            raise HTTPException(
-                status_code=400, detail="User email already activated"
-            )
-
-        # Activate user
-        user.is_active = True
         db.commit()
-        db.refresh(user)
         logger.info(
-            f"User email activated successfully: {user.email} (ID: {user_id})"
+            "User email activated successfully: {} (ID: {})",
+            user.email, user_id
         )
 
         return {
@@ -190,72 +264,78 @@ def activate_user_email(token: str, db: Session):
         }
 
     except JWTError as e:
-        logger.error(f"JWT error during email verification: {str(e)}")
+        logger.error("JWT error during email verification: {}", e)
         raise HTTPException(
             status_code=401, detail="Invalid or expired verification token"
         )
     except Exception as e:
-        logger.error(f"Error activating email: {str(e)}")
+        logger.error("Error activating email: {}", e)
         raise HTTPException(
             status_code=400, detail=f"Error activating email: {str(e)}"
         )
 
 
+def set_password_hash(db: Session, password_hash: str, **filters):
+    """Update the matching user's password; return its id or None."""
+    user_id = db.execute(
+        update(User)
+        .filter_by(**filters)
+        .values(password_hash=password_hash)
+        .returning(User.id)
+    ).scalar()
+    if user_id is not None:
+        db.commit()
+    return user_id
+
+
 # Change user password
 def change_user_password(user_id: int, new_password: str, db: Session):
-    logger.info(f"Password change requested for user: {user_id}")
+    logger.info("Password change requested for user: {}", user_id)
 
-    user = db.query(User).filter_by(id=user_id).first()
-    if not user:
+    if set_password_hash(db, hash_password(new_password), id=user_id) is None:
         logger.warning(
-            f"Password change attempt for non-existent user: {user_id}"
+            "Password change attempt for non-existent user: {}", user_id
         )
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.password = hash_password(new_password)
-    db.commit()
-    db.refresh(user)
-    logger.info(f"Password changed successfully for user: {user_id}")
+    logger.info("Password changed successfully for user: {}", user_id)
 
     return {"message": "Password changed successfully"}
 
 
 # Forget user password
 def forget_user_password(email: str, new_password: str, db: Session):
-    logger.info(f"Password reset requested for email: {email}")
+    logger.info("Password reset requested for email: {}", email)
 
-    user = db.query(User).filter_by(email=email).first()
-    if not user:
+    if set_password_hash(db, hash_password(new_password), email=email) is None:
         logger.warning(
-            f"Password reset attempt for non-existent email: {email}"
+            "Password reset attempt for non-existent email: {}", email
         )
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.password = hash_password(new_password)
-    db.commit()
-    db.refresh(user)
-    logger.info(f"Password reset successfully for email: {email}")
+    logger.info("Password reset successfully for email: {}", email)
 
     return {"message": "Password reset successfully"}
 
 
 def verify_user_email_request(email: str, db: Session):
-    logger.debug(f"Email verification requested for: {email}")
+    logger.debug("Email verification requested for: {}", email)
 
     user = db.query(User).filter_by(email=email).first()
     if not user:
         logger.warning(
-            f"Email verification request for non-existent email: {email}"
+            "Email verification request for non-existent email: {}", email
         )
         raise HTTPException(status_code=404, detail="User not found")
 
-    logger.info(f"Sending verification email to: {email}")
-    send_user_verification_email(user.email, str(user.id))
+    logger.info("Queueing verification email to: {}", email)
+    queue_user_verification_email(db, user.email, str(user.id))
+    db.commit()
     return {"message": "Verification email sent successfully"}
 
 
-def send_user_verification_email(to_email: str, user_id: str):
-    logger.debug(f"Generating email verification token for user: {user_id}")
+def build_user_verification_email(user_id: str) -> dict:
+    logger.debug("Generating email verification token for user: {}", user_id)
 
     verification_token = generate_email_verification_token(user_id)
     base_url = getenv("DOMAIN_NAME", "localhost:8000")
@@ -267,7 +347,18 @@ def send_user_verification_email(to_email: str, user_id: str):
     subject = "Verify your email"
     body = f"""Please verify your email by clicking on the following
       link: {verification_link}"""
-    # Call the email service to send the email
-    logger.debug(f"Sending verification email to: {to_email}")
-    send_email(to_email, subject, body)
-    logger.info(f"Verification email sent successfully to: {to_email}")
+    # Pending duplicates (e.g. repeated /auth/activate calls) are sent once
+    return {
+        "subject": subject,
+        "body": body,
+        "dedup_key": f"verify-email:{user_id}",
+    }
+
+
+def queue_user_verification_email(
+    db: Session, to_email: str, user_id: str, check_pending: bool = True
+):
+    """Add the verification email to the outbox; the caller commits."""
+    email = build_user_verification_email(user_id)
+    enqueue_email(db, to_email, check_pending=check_pending, **email)
+    logger.info("Verification email queued for: {}", to_email)
@@ -0,0 +1,221 @@
+"""Collects the /metrics exposition.
+
+Gauges are read here, at scrape time, so recording them costs the request
+path nothing.
+"""
+from collections import Counter
+
+from anyio.to_thread import current_default_thread_limiter
+from sqlalchemy.pool import QueuePool
+
+from app.core.concurrency import concurrency_limiters
+from app.core.config import BCRYPT_ROUNDS
+from app.core.executor import cpu_executor
+from app.core.logger import dropped_log_lines
+from app.core.metrics import (
+    MetricsWriter,
+    active_requests,
+    password_hash_seconds,
+    pool_hold,
+    pool_wait,
+    request_latency,
+    request_queue_wait,
+    startup_seconds,
+)
+from app.core.rate_limit import rate_limiter
+from app.database import (
+    created_engines,
+    get_async_replica_router,
+    get_replica_router,
+)
+
+
+def _write_requests(writer: MetricsWriter):
+    writer.histogram(
+        "http_request_duration_seconds",
+        "Request latency by method, route template and status code.",
+        request_latency,
+        ("method", "route", "status"),
+    )
+    in_flight = Counter()
+    for scope in list(active_requests.values()):
+        route = scope.get("route")
+        # Requests that have not been routed yet
+        in_flight[(route.path if route is not None else "routing",)] += 1
+    writer.sample(
+        "http_requests_in_flight", "gauge",
+        "Requests currently being handled, by route template.",
+        dict(in_flight), ("route",),
+    )
+
+
+def _write_concurrency(writer: MetricsWriter):
+    limiters = concurrency_limiters.items()
+    for metric, help_text, read in (
+        ("concurrency_limit", "Requests a route group may run at once.",
+         lambda limiter: limiter.limit),
+        ("concurrency_in_flight", "Requests running per route group.",
+         lambda limiter: limiter.active),
+        ("concurrency_queued", "Requests waiting for a slot.",
+         lambda limiter: limiter.queued),
+    ):
+        writer.sample(
+            metric, "gauge", help_text,
+            {(group,): read(limiter) for group, limiter in limiters},
+            ("group",),
+        )
+    writer.sample(
+        "concurrency_rejected_total", "counter",
+        "Requests shed with a 503, by route group and reason.",
+        {
+            (group, reason): count
+            for group, limiter in limiters
+            for reason, count in limiter.rejected.items()
+        },
+        ("group", "reason"),
+    )
+    writer.histogram(
+        "request_queue_seconds",
+        "Time admitted requests waited for a slot in their route group.",
+        request_queue_wait,
+        ("group",),
+    )
+
+
+def _write_pools(writer: MetricsWriter):
+    gauges = {
+        "db_pool_size": ("Connections the pool keeps open.", QueuePool.size),
+        "db_pool_checked_out": (
+            "Connections currently checked out.", QueuePool.checkedout
+        ),
+        "db_pool_checked_in": (
+            "Idle connections in the pool.", QueuePool.checkedin
+        ),
+        "db_pool_overflow": (
+            "Connections open beyond pool_size.",
+            lambda pool: max(0, pool.overflow()),
+        ),
+    }
+    pools = {
+        name: bound.pool for name, bound in created_engines().items()
+        if isinstance(bound.pool, QueuePool)
+    }
+    for metric, (help_text, read) in gauges.items():
+        writer.sample(
+            metric, "gauge", help_text,
+            {(name,): read(pool) for name, pool in pools.items()},
+            ("engine",),
+        )
+    ejected = {}
+    for prefix, get_router in (
+        ("replica", get_replica_router),
+        ("async-replica", get_async_replica_router),
+    ):
+        router = get_router() if f"{prefix}0" in pools else None
+        if router is not None:
+            down = set(router.ejected())
+            for index in range(len(router.session_factories)):
+                ejected[(f"{prefix}{index}",)] = int(index in down)
+    writer.sample(
+        "db_replica_ejected", "gauge",
+        "1 while a read replica is out of the rotation after a failure.",
+        ejected, ("engine",),
+    )
+    writer.histogram(
+        "db_pool_wait_seconds",
+        "Time spent waiting for a pooled connection.",
+        pool_wait,
+        ("engine",),
+    )
+    writer.histogram(
+        "db_pool_hold_seconds",
+        "Time a connection stayed checked out of the pool.",
+        pool_hold,
+        ("engine",),
+    )
+
+
+def _write_executors(writer: MetricsWriter):
+    stats = cpu_executor.stats()
+    for metric, kind, key, help_text in (
+        ("cpu_executor_workers", "gauge", "max_workers",
+         "Worker processes or threads hashing passwords."),
+        ("cpu_executor_in_flight", "gauge", "in_flight",
+         "bcrypt tasks running or queued."),
+        ("cpu_executor_queue_depth", "gauge", "queue_depth",
+         "bcrypt tasks waiting for a worker."),
+        ("cpu_executor_rejected_total", "counter", "rejected",
+         "bcrypt tasks rejected because the queue was full."),
+        ("cpu_executor_completed_total", "counter", "completed",
+         "bcrypt tasks completed."),
+        ("cpu_executor_task_seconds_total", "counter", "task_seconds_total",
+         "Time spent running bcrypt tasks."),
+    ):
+        writer.sample(metric, kind, help_text, {(): stats[key]})
+
+    writer.histogram(
+        "password_hash_seconds",
+        "Time bcrypt took per call, excluding executor queueing.",
+        password_hash_seconds,
+        ("operation",),
+    )
+    writer.sample(
+        "password_hash_rounds", "gauge",
+        "bcrypt cost factor new hashes are made with.",
+        {(): BCRYPT_ROUNDS},
+    )
+
+    # Threads that run sync routes and dependencies
+    limiter = current_default_thread_limiter()
+    for metric, help_text, value in (
+        ("threadpool_threads_max", "Thread pool capacity.",
+         limiter.total_tokens),
+        ("threadpool_threads_busy", "Threads currently in use.",
+         limiter.borrowed_tokens),
+        ("threadpool_tasks_waiting", "Calls waiting for a free thread.",
+         limiter.statistics().tasks_waiting),
+    ):
+        writer.sample(metric, "gauge", help_text, {(): value})
+
+
+def _write_rate_limits(writer: MetricsWriter):
+    stats = rate_limiter.stats()
+    writer.sample(
+        "rate_limit_checks_total", "counter",
+        "Auth requests checked per rate limit rule, by outcome.",
+        {
+            (rule, outcome): count
+            for rule, counts in stats["rules"].items()
+            for outcome, count in counts.items()
+        },
+        ("rule", "outcome"),
+    )
+    # The database storage doesn't track its keys in the process
+    if stats["tracked_keys"] >= 0:
+        writer.sample(
+            "rate_limit_tracked_keys", "gauge",
+            "Keys held by the in-memory rate limit storage.",
+            {(): stats["tracked_keys"]},
+        )
+
+
+def render_metrics() -> str:
+    """Must run on the event loop (reads the anyio thread limiter)."""
+    writer = MetricsWriter()
+    _write_requests(writer)
+    _write_concurrency(writer)
+    _write_pools(writer)
+    _write_executors(writer)
+    _write_rate_limits(writer)
+    writer.sample(
+        "app_startup_seconds", "gauge",
+        "Time this process spent in each startup phase.",
+        {(phase,): seconds for phase, seconds in startup_seconds.items()},
+        ("phase",),
+    )
+    writer.sample(
+        "log_lines_dropped_total", "counter",
+        "Log lines dropped because the log writer fell behind.",
+        {(): dropped_log_lines()},
+    )
+    return writer.render()
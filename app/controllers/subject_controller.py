@@ -1,34 +1,575 @@
+import base64
+import binascii
+import json
+
+from sqlalchemy import (
+    case,
+    delete,
+    column,
+    func,
+    insert,
+    or_,
+    select,
+    table,
+    text,
+    union,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.subject import Subject
 from app.schema import subject_schema as schemas
+from app.core.cache import (
+    CachedValue,
+    MemoryCacheBackend,
+    make_cached_value,
+    ReadThroughCache,
+    TableVersions,
+)
+from app.core.config import (
+    BULK_DELETE_CHUNK_SIZE,
+    BULK_INSERT_CHUNK_SIZE,
+    CACHE_VERSION_CHECK_INTERVAL,
+    SQLITE_BULK_INSERT_CHUNK_SIZE,
+    SUBJECT_CACHE_ENABLED,
+    SUBJECT_CACHE_MAX_ENTRIES,
+    SUBJECT_CACHE_TTL,
+    SUBJECT_SEARCH_MAX_CANDIDATES,
+    SUBJECTS_BULK_MAX_ITEMS,
+    SUBJECTS_COUNT_MODE,
+)
 from app.core.logger import logger
 
+# Columns a client may request through ?fields=
+SUBJECT_FIELDS = {
+    "id": Subject.id,
+    "name": Subject.name,
+    "description": Subject.description,
+}
+
+# Planner row estimate; reltuples is -1 until the table has been analyzed
+ESTIMATED_COUNT_SQL = text(
+    "SELECT reltuples::bigint FROM pg_class WHERE oid = 'subjects'::regclass"
+)
+
+SUBJECTS_TABLE = Subject.__tablename__
+
+# FTS5 index on SQLite (see app/models/subject.py)
+subjects_fts = table("subjects_fts", column("rowid"), column("subjects_fts"))
+
+table_versions = TableVersions(CACHE_VERSION_CHECK_INTERVAL)
+subject_cache = ReadThroughCache(
+    MemoryCacheBackend(SUBJECT_CACHE_MAX_ENTRIES),
+    ttl=SUBJECT_CACHE_TTL,
+    enabled=SUBJECT_CACHE_ENABLED,
+)
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """Return the last seen subject id, or raise ValueError."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError,
+            TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(last_id, int):
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+def parse_fields(fields: str | None) -> list[str]:
+    """Return the requested projection, or raise ValueError."""
+    if not fields:
+        return list(SUBJECT_FIELDS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in SUBJECT_FIELDS]
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def build_subject_query(subject_id: int):
+    return select(*SUBJECT_FIELDS.values()).where(Subject.id == subject_id)
+
+
+def build_subjects_page_query(
+    limit: int, after_id: int | None, fields: list[str]
+):
+    # id is always selected - the next cursor is built from it
+    columns = [Subject.id] + [
+        SUBJECT_FIELDS[f] for f in fields if f != "id"
+    ]
+    query = select(*columns).order_by(Subject.id).limit(limit + 1)
+    if after_id is not None:
+        query = query.where(Subject.id > after_id)
+    return query
+
+
+def build_subjects_page(rows, limit: int, fields: list[str]) -> CachedValue:
+    """Split ``limit + 1`` fetched rows into items and the next cursor."""
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(rows[limit - 1].id)
+    items = [
+        {f: row._mapping[f] for f in fields} for row in rows[:limit]
+    ]
+    return make_cached_value(items, {"next_cursor": next_cursor})
+
+
+def subject_row(subject: Subject) -> dict:
+    """The SubjectResponse fields of a loaded Subject, as plain values."""
+    return {name: getattr(subject, name) for name in SUBJECT_FIELDS}
+
+
+def build_subject(row) -> CachedValue:
+    return make_cached_value(dict(row._mapping) if row else None)
+
+
+def build_subjects_count(total: int, is_estimate: bool) -> CachedValue:
+    return make_cached_value([total, is_estimate])
+
+
+# Sorts after any character a name can continue a prefix with
+_PREFIX_END = "\U0010ffff"
+# Trigrams need 3 characters; shorter queries only match name prefixes
+SEARCH_SUBSTRING_MIN_LENGTH = 3
+
+
+def _name_prefix_candidates(dialect_name: str, q: str):
+    """Names starting with ``q`` (case-insensitive), exact match first.
+
+    A range scan on the case-insensitive name index, so it costs the same
+    however many rows match; the FTS/trigram candidates are capped in no
+    particular order and could otherwise miss the best matches.
+    """
+    if dialect_name == "sqlite":
+        # NOCASE folds ASCII only, like the LIKE in match_group below
+        key = Subject.name.collate("NOCASE")
+        low = q
+    else:
+        key = func.lower(Subject.name).collate("C")
+        low = q.lower()
+    return (
+        select(Subject.id)
+        .where(key >= low)
+        .where(key < low + _PREFIX_END)
+        .order_by(key)
+        .limit(SUBJECT_SEARCH_MAX_CANDIDATES)
+    )
+
+
+def _with_matches(prefixes, matches):
+    matches = matches.limit(SUBJECT_SEARCH_MAX_CANDIDATES).subquery()
+    return union(select(prefixes.c.id), select(matches.c.id)).subquery()
+
+
+def build_search_query(dialect_name: str, q: str, limit: int, offset: int):
+    """Subjects whose name or description contains ``q``, best first.
+
+    The index yields at most SUBJECT_SEARCH_MAX_CANDIDATES matches, in no
+    particular order, plus as many name prefix matches from the name index
+    (so an exact or prefix match is never cut). Only that set is ranked:
+    names starting with ``q``, then names containing it, then
+    description-only matches; shorter names first within each group.
+    Capping the candidates keeps broad queries ("a", "the") as cheap as
+    selective ones however large the table grows.
+
+    Queries shorter than SEARCH_SUBSTRING_MIN_LENGTH can't use the trigram
+    indexes and only match name prefixes.
+    """
+    prefixes = _name_prefix_candidates(dialect_name, q).subquery()
+    if len(q) < SEARCH_SUBSTRING_MIN_LENGTH:
+        candidates = prefixes
+    elif dialect_name == "sqlite":
+        # The trigram tokenizer matches substrings; quoting makes q a
+        # literal string instead of FTS5 query syntax
+        match = '"' + q.replace('"', '""') + '"'
+        matches = select(subjects_fts.c.rowid.label("id")).where(
+            subjects_fts.c.subjects_fts.op("MATCH")(match)
+        )
+        candidates = _with_matches(prefixes, matches)
+    else:
+        # On PostgreSQL the pg_trgm GIN indexes serve these ILIKEs
+        matches = select(Subject.id).where(
+            or_(
+                Subject.name.icontains(q, autoescape=True),
+                Subject.description.icontains(q, autoescape=True),
+            )
+        )
+        candidates = _with_matches(prefixes, matches)
+
+    match_group = case(
+        (Subject.name.istartswith(q, autoescape=True), 0),
+        (Subject.name.icontains(q, autoescape=True), 1),
+        else_=2,
+    )
+    return (
+        select(*SUBJECT_FIELDS.values())
+        .join(candidates, candidates.c.id == Subject.id)
+        .order_by(match_group, func.length(Subject.name), Subject.id)
+        .limit(limit + 1)
+        .offset(offset)
+    )
+
+
+def build_search_results(rows, limit: int, offset: int) -> CachedValue:
+    next_offset = offset + limit if len(rows) > limit else None
+    items = [dict(row._mapping) for row in rows[:limit]]
+    return make_cached_value(items, {"next_offset": next_offset})
+
+
+def subject_key(version: int, subject_id: int) -> str:
+    return f"subjects:v{version}:id:{subject_id}"
+
+
+def subjects_page_key(
+    version: int, limit: int, after_id: int | None, fields: list[str]
+) -> str:
+    return (
+        f"subjects:v{version}:page:{limit}:{after_id}:{','.join(fields)}"
+    )
+
+
+def subjects_count_key(version: int) -> str:
+    return f"subjects:v{version}:count"
+
+
+def subjects_search_key(version: int, q: str, limit: int, offset: int):
+    return f"subjects:v{version}:search:{limit}:{offset}:{q}"
+
+
+def plan_bulk_insert(subjects: list[schemas.SubjectCreate]):
+    """Split a bulk request into unique rows and in-request duplicates.
+
+    Returns ``(rows, conflicts)``; each row keeps its request index.
+    """
+    rows, conflicts, seen = [], [], set()
+    for index, subject in enumerate(subjects):
+        if subject.name in seen:
+            conflicts.append({
+                "index": index,
+                "name": subject.name,
+                "detail": "Duplicate name in request",
+            })
+            continue
+        seen.add(subject.name)
+        rows.append((index, subject.model_dump()))
+    return rows, conflicts
+
+
+def bulk_insert_chunks(dialect_name: str, rows: list):
+    """Yield ``(chunk, statement)`` pairs for a multi-row insert.
+
+    On PostgreSQL and SQLite each statement is a single
+    ``INSERT ... ON CONFLICT (name) DO NOTHING RETURNING`` so rows whose
+    name already exists are skipped instead of failing the batch. Other
+    dialects get ``statement=None`` and fall back to row-by-row inserts.
+    """
+    if dialect_name == "postgresql":
+        dialect_insert, size = postgresql.insert, BULK_INSERT_CHUNK_SIZE
+    elif dialect_name == "sqlite":
+        dialect_insert, size = sqlite.insert, SQLITE_BULK_INSERT_CHUNK_SIZE
+    else:
+        dialect_insert, size = None, BULK_INSERT_CHUNK_SIZE
+
+    for start in range(0, len(rows), size):
+        chunk = rows[start:start + size]
+        if dialect_insert is None:
+            yield chunk, None
+            continue
+        statement = (
+            dialect_insert(Subject)
+            .values([values for _, values in chunk])
+            .on_conflict_do_nothing(index_elements=[Subject.name])
+            .returning(*SUBJECT_FIELDS.values())
+        )
+        yield chunk, statement
+
+
+def collect_bulk_result(chunk, returned_rows, conflicts: list) -> list:
+    """Match RETURNING rows back to the request and record the misses."""
+    by_name = {row.name: dict(row._mapping) for row in returned_rows}
+    created = []
+    for index, values in chunk:
+        row = by_name.get(values["name"])
+        if row is None:
+            conflicts.append({
+                "index": index,
+                "name": values["name"],
+                "detail": "Subject name already exists",
+            })
+        else:
+            created.append(row)
+    return created
+
+
+def create_subjects_bulk(
+    db: Session, subjects: list[schemas.SubjectCreate]
+) -> dict:
+    """Insert many subjects in one transaction.
+
+    Name conflicts are reported per row and do not abort the batch.
+    Returns ``{"created": [...], "conflicts": [...]}`` with conflicts
+    ordered by request index.
+    """
+    logger.debug("Bulk creating {} subjects", len(subjects))
+    rows, conflicts = plan_bulk_insert(subjects)
+    created = []
+    dialect_name = db.get_bind().dialect.name
+    try:
+        for chunk, statement in bulk_insert_chunks(dialect_name, rows):
+            if statement is not None:
+                returned = db.execute(statement).all()
+            else:
+                returned = _insert_rows_one_by_one(db, chunk)
+            created += collect_bulk_result(chunk, returned, conflicts)
+        if created:
+            table_versions.bump(db, SUBJECTS_TABLE)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    table_versions.mark_stale(SUBJECTS_TABLE)
+    conflicts.sort(key=lambda c: c["index"])
+    logger.debug(
+        "Bulk create finished: {} created, {} conflicts",
+        len(created), len(conflicts)
+    )
+    return {"created": created, "conflicts": conflicts}
+
+
+def _insert_rows_one_by_one(db: Session, chunk) -> list:
+    returned = []
+    for _, values in chunk:
+        try:
+            with db.begin_nested():
+                returned.append(
+                    db.execute(
+                        insert(Subject)
+                        .values(values)
+                        .returning(*SUBJECT_FIELDS.values())
+                    ).one()
+                )
+        except IntegrityError:
+            pass
+    return returned
+
+
+def bulk_delete_by_ids_chunks(ids: list[int]):
+    """Yield ``(chunk, statement)`` pairs deleting ``ids`` chunk by chunk.
+
+    Each statement is ``DELETE ... WHERE id IN (...) RETURNING id``.
+    """
+    for start in range(0, len(ids), BULK_DELETE_CHUNK_SIZE):
+        chunk = ids[start:start + BULK_DELETE_CHUNK_SIZE]
+        yield chunk, (
+            delete(Subject)
+            .where(Subject.id.in_(chunk))
+            .returning(Subject.id)
+        )
+
+
+def build_filter_conditions(filters: schemas.SubjectFilter) -> list:
+    conditions = []
+    prefix = filters.name_prefix
+    if prefix is not None:
+        # LIKE can use an index but is case-insensitive on SQLite; the
+        # substr comparison keeps the match exact on every database
+        conditions.append(Subject.name.startswith(prefix, autoescape=True))
+        conditions.append(func.substr(Subject.name, 1, len(prefix)) == prefix)
+    if filters.min_id is not None:
+        conditions.append(Subject.id >= filters.min_id)
+    if filters.max_id is not None:
+        conditions.append(Subject.id <= filters.max_id)
+    return conditions
+
+
+def build_filter_delete(conditions: list, limit: int):
+    """Delete up to ``limit`` matching subjects, lowest ids first."""
+    matching = (
+        select(Subject.id).where(*conditions).order_by(Subject.id).limit(limit)
+    )
+    return (
+        delete(Subject)
+        .where(Subject.id.in_(matching.scalar_subquery()))
+        .returning(Subject.id)
+    )
+
+
+def filter_delete_sizes():
+    """Chunk sizes for a filter delete, up to SUBJECTS_BULK_MAX_ITEMS."""
+    remaining = SUBJECTS_BULK_MAX_ITEMS
+    while remaining > 0:
+        size = min(BULK_DELETE_CHUNK_SIZE, remaining)
+        yield size
+        remaining -= size
+
+
+def build_bulk_delete_result(
+    requested: list[int] | None, deleted: list[int], has_more: bool
+) -> dict:
+    found = set(deleted)
+    not_found = [i for i in requested or [] if i not in found]
+    return {
+        "deleted": sorted(deleted),
+        "not_found": not_found,
+        "has_more": has_more,
+    }
+
+
+def delete_subjects_bulk(
+    db: Session, request: schemas.SubjectBulkDelete
+) -> dict:
+    """Delete the requested ids, or the subjects matching a filter.
+
+    Everything runs in one transaction with one table version bump, so
+    caches are invalidated once for the whole request. A filter deletes at
+    most SUBJECTS_BULK_MAX_ITEMS rows; ``has_more`` says if any are left.
+    """
+    deleted = []
+    has_more = False
+    ids = list(dict.fromkeys(request.ids)) if request.ids else None
+    try:
+        if ids is not None:
+            logger.debug("Bulk deleting {} subjects by id", len(ids))
+            for _, statement in bulk_delete_by_ids_chunks(ids):
+                deleted += db.execute(statement).scalars().all()
+        else:
+            logger.debug(
+                "Bulk deleting subjects by filter: {}", request.filter
+            )
+            conditions = build_filter_conditions(request.filter)
+            for size in filter_delete_sizes():
+                chunk = db.execute(
+                    build_filter_delete(conditions, size)
+                ).scalars().all()
+                deleted += chunk
+                if len(chunk) < size:
+                    break
+            else:
+                has_more = db.execute(
+                    select(Subject.id).where(*conditions).limit(1)
+                ).first() is not None
+        if deleted:
+            table_versions.bump(db, SUBJECTS_TABLE)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if deleted:
+        table_versions.mark_stale(SUBJECTS_TABLE)
+    logger.debug("Bulk delete finished: {} deleted", len(deleted))
+    return build_bulk_delete_result(ids, deleted, has_more)
+
 
 def create_subject(db: Session, subject: schemas.SubjectCreate):
-    logger.debug(f"Creating subject in database: {subject.name}")
+    logger.debug("Creating subject in database: {}", subject.name)
     db_subject = Subject(**subject.model_dump())
     db.add(db_subject)
+    table_versions.bump(db, SUBJECTS_TABLE)
     db.commit()
-    db.refresh(db_subject)
-    logger.debug(f"Subject created with ID: {db_subject.id}")
+    table_versions.mark_stale(SUBJECTS_TABLE)
+    logger.debug("Subject created with ID: {}", db_subject.id)
     return db_subject
 
 
-def get_subject(db: Session, subject_id: int):
-    logger.debug(f"Querying subject with ID: {subject_id}")
-    return db.query(Subject).filter(Subject.id == subject_id).first()
+def get_subject(db: Session, subject_id: int) -> CachedValue:
+    """Return the cached subject; its payload is None if it doesn't exist."""
+    version = table_versions.current(db, SUBJECTS_TABLE)
+
+    def load():
+        logger.debug("Querying subject with ID: {}", subject_id)
+        row = db.execute(build_subject_query(subject_id)).first()
+        return build_subject(row)
+
+    return subject_cache.get_or_load(subject_key(version, subject_id), load)
+
+
+def get_subjects(
+    db: Session, limit: int, after: str | None = None,
+    fields: list[str] | None = None,
+) -> CachedValue:
+    """Return one cached keyset page of subjects ordered by id.
+
+    The payload is the list of items holding only the requested fields;
+    ``meta["next_cursor"]`` is None on the last page. Raises ValueError for
+    a malformed cursor.
+    """
+    fields = fields or list(SUBJECT_FIELDS)
+    after_id = decode_cursor(after) if after else None
+    version = table_versions.current(db, SUBJECTS_TABLE)
+
+    def load():
+        logger.debug(
+            "Querying subjects page: limit={}, after={}", limit, after_id
+        )
+        query = build_subjects_page_query(limit, after_id, fields)
+        return build_subjects_page(db.execute(query).all(), limit, fields)
+
+    key = subjects_page_key(version, limit, after_id, fields)
+    return subject_cache.get_or_load(key, load)
+
+
+def search_subjects(
+    db: Session, q: str, limit: int, offset: int = 0
+) -> CachedValue:
+    """Return one cached page of ranked search results.
+
+    ``meta["next_offset"]`` is None on the last page.
+    """
+    version = table_versions.current(db, SUBJECTS_TABLE)
+
+    def load():
+        logger.debug(
+            "Searching subjects: q={!r}, limit={}, offset={}",
+            q, limit, offset,
+        )
+        dialect_name = db.get_bind().dialect.name
+        query = build_search_query(dialect_name, q, limit, offset)
+        return build_search_results(db.execute(query).all(), limit, offset)
+
+    key = subjects_search_key(version, q, limit, offset)
+    return subject_cache.get_or_load(key, load)
+
+
+def count_subjects(db: Session) -> tuple[int, bool]:
+    """Return ``(total, is_estimate)`` for the subjects table."""
+    version = table_versions.current(db, SUBJECTS_TABLE)
 
+    def load():
+        if (
+            SUBJECTS_COUNT_MODE == "estimated"
+            and db.get_bind().dialect.name == "postgresql"
+        ):
+            estimate = db.execute(ESTIMATED_COUNT_SQL).scalar()
+            if estimate is not None and estimate >= 0:
+                return build_subjects_count(int(estimate), True)
+        total = db.execute(select(func.count()).select_from(Subject)).scalar()
+        return build_subjects_count(total, False)
 
-def get_subjects(db: Session):
-    logger.debug("Querying all subjects from database")
-    return db.query(Subject).all()
+    cached = subject_cache.get_or_load(subjects_count_key(version), load)
+    return tuple(cached.payload)
 
 
 def delete_subject(db: Session, subject_id: int):
-    logger.debug(f"Deleting subject with ID: {subject_id}")
-    subject = get_subject(db, subject_id)
+    """Delete the subject; return its row, or None if it didn't exist."""
+    logger.debug("Deleting subject with ID: {}", subject_id)
+    # DELETE ... RETURNING finds and removes the row in one round-trip
+    result = db.execute(
+        delete(Subject)
+        .where(Subject.id == subject_id)
+        .returning(*SUBJECT_FIELDS.values())
+    )
+    subject = result.first()
     if subject:
-        db.delete(subject)
+        table_versions.bump(db, SUBJECTS_TABLE)
         db.commit()
-        logger.debug(f"Subject with ID {subject_id} deleted from database")
+        table_versions.mark_stale(SUBJECTS_TABLE)
+        logger.debug("Subject with ID {} deleted from database", subject_id)
     return subject
@@ -0,0 +1,169 @@
+"""Authentication dependencies for protected routes.
+
+``get_current_user`` builds the caller's Principal from the access token
+claims alone - no database lookup. Verified tokens are remembered in a
+bounded LRU until they expire, so a client reusing its token skips the
+signature check on later requests. Routes that must see the current
+``is_active`` flag or role opt into a lookup with
+``get_current_user_fresh`` (or ``require_role(..., fresh=True)``).
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import ALGORITHM, SECRET_KEY, TOKEN_CACHE_MAX_ENTRIES
+from app.core.logger import logger
+from app.database import get_db
+from app.models.auth_user import User, UserRole
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: str
+    role: UserRole
+    claims: dict
+
+
+class VerifiedTokenCache:
+    """LRU of token signature -> claims, each entry expiring at ``exp``."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, tuple[str, dict, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _split(token: str):
+        signing_input, _, signature = token.rpartition(".")
+        return signing_input, signature
+
+    def get(self, token: str) -> dict | None:
+        signing_input, signature = self._split(token)
+        with self._lock:
+            item = self._data.get(signature)
+            # The signature only vouches for the header and payload it was
+            # issued with
+            if item is None or item[0] != signing_input:
+                self.misses += 1
+                return None
+            if item[2] <= time.time():
+                del self._data[signature]
+                self.misses += 1
+                return None
+            self._data.move_to_end(signature)
+            self.hits += 1
+            return item[1]
+
+    def put(self, token: str, claims: dict):
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        signing_input, signature = self._split(token)
+        with self._lock:
+            self._data[signature] = (signing_input, claims, float(exp))
+            self._data.move_to_end(signature)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_MAX_ENTRIES)
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=401,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def decode_access_token(token: str) -> dict:
+    """Return verified access token claims, or raise 401."""
+    claims = token_cache.get(token)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as e:
+            logger.warning("Rejected access token: {}", e)
+            raise credentials_exception()
+        if claims.get("type") != "access" or not claims.get("sub"):
+            logger.warning("Rejected token that is not an access token")
+            raise credentials_exception()
+        token_cache.put(token, claims)
+    return claims
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+) -> Principal:
+    if credentials is None:
+        raise credentials_exception()
+    claims = decode_access_token(credentials.credentials)
+    try:
+        role = UserRole(claims.get("role"))
+    except ValueError:
+        raise credentials_exception()
+    return Principal(user_id=claims["sub"], role=role, claims=claims)
+
+
+def get_current_user_fresh(
+    principal: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db, scope="function"),
+) -> Principal:
+    """Like get_current_user, but re-reads role and is_active from the DB."""
+    try:
+        user_id = uuid.UUID(principal.user_id)
+    except ValueError:
+        raise credentials_exception()
+    row = db.execute(
+        select(User.role, User.is_active).where(User.id == user_id)
+    ).first()
+    if row is None:
+        raise credentials_exception()
+    if not row.is_active:
+        raise HTTPException(status_code=403, detail="User account is inactive")
+    return Principal(
+        user_id=principal.user_id, role=row.role, claims=principal.claims
+    )
+
+
+def require_role(*roles: UserRole, fresh: bool = False):
+    """Dependency that allows only callers holding one of ``roles``."""
+    source = get_current_user_fresh if fresh else get_current_user
+
+    async def check_role(principal: Principal = Depends(source)) -> Principal:
+        if principal.role not in roles:
+            logger.warning(
+                "User {} with role {} denied; requires {}",
+                principal.user_id,
+                principal.role.value,
+                [r.value for r in roles],
+            )
+            raise HTTPException(
+                status_code=403, detail="Not enough permissions"
+            )
+        return principal
+
+    return check_role
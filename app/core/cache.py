@@ -0,0 +1,309 @@
+"""Read-through cache with TTL/LRU eviction and single-flight misses.
+
+Entries are stored as pre-encoded JSON bodies together with a strong ETag,
+so a hit costs neither a query nor serialization, and a matching
+If-None-Match costs not even the body.
+
+Invalidation is version based: writers bump a per-table counter in the
+``table_versions`` table inside their own transaction, and readers include
+the current version in every cache key. Other workers notice the bump the
+next time they re-read the counter (at most every
+CACHE_VERSION_CHECK_INTERVAL seconds), so a shared database is all that is
+needed to keep several worker processes coherent.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+from sqlalchemy import insert, select, update
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.logger import logger
+from app.core.serialization import dumps
+from app.models.table_version import TableVersion
+
+
+class CachedValue(NamedTuple):
+    payload: Any
+    body: bytes
+    etag: str
+    # Side data that is not part of the body (e.g. pagination cursors)
+    meta: dict
+
+
+def make_cached_value(payload, meta: dict | None = None) -> CachedValue:
+    body = dumps(payload)
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return CachedValue(payload, body, etag, meta or {})
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match uses the weak comparison function (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (c.strip() for c in if_none_match.split(","))
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def cached_json_response(
+    request: Request, cached: CachedValue, headers: dict | None = None
+) -> Response:
+    """Send ``cached`` with its ETag, or a bodyless 304 if the client has it"""
+    headers = {"ETag": cached.etag, **(headers or {})}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        cached.body, media_type="application/json", headers=headers
+    )
+
+
+class CacheBackend:
+    """Storage interface for ReadThroughCache.
+
+    Implement this to back the cache with a shared store instead of
+    process memory.
+    """
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self._async_calls: dict[str, asyncio.Future] = {}
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: str, fn):
+        future = self._async_calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Followers re-raise it; mark it retrieved for the leader
+            future.exception()
+            raise
+        finally:
+            del self._async_calls[key]
+
+
+class TableVersions:
+    """
+    Per-table version counters shared through the database.
+
+    Versions are remembered per database (primary or replica), so a
+    cached value is always keyed by a version read from the same database
+    it was loaded from; a lagging replica can't store old rows under the
+    primary's newer version.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        # Read and written by every request thread
+        self._lock = threading.Lock()
+        self._local: dict[tuple[int, str], tuple[int, float]] = {}
+
+    def _fresh(self, key: tuple[int, str]):
+        with self._lock:
+            item = self._local.get(key)
+        if item and time.monotonic() - item[1] < self.check_interval:
+            return item[0]
+        return None
+
+    def _store(self, key: tuple[int, str], version) -> int:
+        version = version or 0
+        with self._lock:
+            self._local[key] = (version, time.monotonic())
+        return version
+
+    @staticmethod
+    def _select(name: str):
+        return select(TableVersion.version).where(TableVersion.name == name)
+
+    @staticmethod
+    def _update(name: str):
+        return (
+            update(TableVersion)
+            .where(TableVersion.name == name)
+            .values(version=TableVersion.version + 1)
+        )
+
+    def current(self, db, name: str) -> int:
+        key = (id(db.get_bind()), name)
+        version = self._fresh(key)
+        if version is None:
+            result = db.execute(self._select(name))
+            version = self._store(key, result.scalar())
+        return version
+
+    async def current_async(self, db, name: str) -> int:
+        key = (id(db.get_bind()), name)
+        version = self._fresh(key)
+        if version is None:
+            result = await db.execute(self._select(name))
+            version = self._store(key, result.scalar())
+        return version
+
+    def bump(self, db, name: str):
+        """Bump ``name`` inside the caller's transaction."""
+        if db.execute(self._update(name)).rowcount == 0:
+            db.execute(insert(TableVersion).values(name=name, version=1))
+
+    async def bump_async(self, db, name: str):
+        if (await db.execute(self._update(name))).rowcount == 0:
+            await db.execute(insert(TableVersion).values(name=name, version=1))
+
+    def mark_stale(self, name: str):
+        """Force the next read to fetch the committed version."""
+        with self._lock:
+            for key in [key for key in self._local if key[1] == name]:
+                del self._local[key]
+
+    def reset(self):
+        with self._lock:
+            self._local.clear()
+
+
+class ReadThroughCache:
+    def __init__(self, backend: CacheBackend, ttl: float, enabled=True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: str, loader) -> CachedValue:
+        """Return the cached value for ``key`` or run ``loader`` once.
+
+        ``loader`` returns the CachedValue to store (see make_cached_value).
+        """
+        if not self.enabled:
+            return loader()
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return self._flight.do(key, lambda: self._load(key, loader))
+
+    async def get_or_load_async(self, key: str, loader) -> CachedValue:
+        if not self.enabled:
+            return await loader()
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        async def load():
+            value = await loader()
+            self.backend.set(key, value, self.ttl)
+            return value
+
+        return await self._flight.do_async(key, load)
+
+    def _load(self, key: str, loader) -> CachedValue:
+        logger.debug("Cache miss for key: {}", key)
+        value = loader()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
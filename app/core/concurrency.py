@@ -0,0 +1,203 @@
+"""Per-route-group concurrency limits with load shedding.
+
+Under a traffic spike, sync routes used to queue for a thread and then
+again for a pooled connection, and clients saw 30 second hangs before an
+error. Requests are now admitted per route group (auth, export, the rest)
+before any of that: a group runs at most its limit at once and lets a
+bounded number of requests wait. Any other request gets a 503 with
+Retry-After at once:
+
+- the queue is full, or
+- the oldest queued request has already waited longer than
+  REQUEST_QUEUE_TARGET (the queue is not draining fast enough).
+
+A queued request that is still waiting after REQUEST_QUEUE_TARGET gets
+the same 503, so the time spent queueing stays bounded.
+
+The default limits follow THREADPOOL_THREADS, so admitted requests also
+fit in the thread pool and the connection pool (see app.core.config).
+
+An admitted request's Slot is put in the ASGI scope under SLOT_SCOPE_KEY.
+Inner code that would otherwise sit idle on a slot (an idempotent retry
+waiting for its original) gives it back and takes a new one only if it
+has work to do.
+"""
+import asyncio
+import time
+from collections import deque
+
+from starlette.responses import JSONResponse
+
+from app.core.config import (
+    CONCURRENCY_LIMIT_AUTH,
+    CONCURRENCY_LIMIT_DEFAULT,
+    CONCURRENCY_LIMIT_EXPORT,
+    CONCURRENCY_QUEUE_FACTOR,
+    REQUEST_QUEUE_TARGET,
+)
+from app.core.logger import logger
+from app.core.metrics import request_queue_wait
+
+# Path prefix -> group; anything else is "default"
+ROUTE_GROUPS = (("/auth/", "auth"), ("/export", "export"))
+
+# Never limited, so overload stays observable
+EXEMPT_PATHS = frozenset({"/metrics"})
+
+RETRY_AFTER_SECONDS = 1
+
+SLOT_SCOPE_KEY = "app.concurrency_slot"
+
+
+def route_group(path: str) -> str:
+    for prefix, group in ROUTE_GROUPS:
+        if path.startswith(prefix):
+            return group
+    return "default"
+
+
+def _expire(future: asyncio.Future):
+    if not future.done():
+        future.set_result(False)
+
+
+class GroupLimiter:
+    """Admission for one route group. Only used from the event loop."""
+
+    def __init__(
+        self, limit: int, max_queue: int, target: float,
+        clock=time.monotonic,
+    ):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.target = target
+        self.clock = clock
+        self.active = 0
+        # (future, enqueued at); a future's result says if it got a slot
+        self._waiters: deque[tuple[asyncio.Future, float]] = deque()
+        self.rejected = {"queue_full": 0, "queue_time": 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _reject(self, reason: str) -> str:
+        self.rejected[reason] += 1
+        return reason
+
+    async def acquire(self) -> str | None:
+        """Take a slot; return why the request was rejected, or None."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return self._reject("queue_full")
+        now = self.clock()
+        if self._waiters and now - self._waiters[0][1] >= self.target:
+            return self._reject("queue_time")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = (future, now)
+        self._waiters.append(entry)
+        timer = loop.call_later(self.target, _expire, future)
+        try:
+            admitted = await future
+        except asyncio.CancelledError:
+            # Handed a slot just as the client went away
+            if (
+                future.done() and not future.cancelled()
+                and future.result()
+            ):
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+        return None if admitted else self._reject("queue_time")
+
+    def release(self):
+        # The slot passes straight to the oldest waiter still waiting
+        while self._waiters:
+            future, _ = self._waiters.popleft()
+            if not future.done():
+                future.set_result(True)
+                return
+        self.active -= 1
+
+
+class Slot:
+    """An admitted request's hold on its group limiter."""
+
+    def __init__(self, limiter: GroupLimiter):
+        self.limiter = limiter
+        self.held = True
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.limiter.release()
+
+    async def reacquire(self) -> str | None:
+        """Take a slot again; return why it was rejected, or None."""
+        if self.held:
+            return None
+        rejected = await self.limiter.acquire()
+        self.held = rejected is None
+        return rejected
+
+
+def busy_response() -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Server busy, please retry"},
+        status_code=503,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+def build_limiters(target: float = REQUEST_QUEUE_TARGET):
+    limits = {
+        "default": CONCURRENCY_LIMIT_DEFAULT,
+        "auth": CONCURRENCY_LIMIT_AUTH,
+        "export": CONCURRENCY_LIMIT_EXPORT,
+    }
+    return {
+        group: GroupLimiter(
+            limit, int(limit * CONCURRENCY_QUEUE_FACTOR), target
+        )
+        for group, limit in limits.items()
+    }
+
+
+concurrency_limiters = build_limiters()
+
+
+class ConcurrencyLimitMiddleware:
+    """Admits requests per route group and sheds the excess with a 503."""
+
+    def __init__(self, app, limiters: dict[str, GroupLimiter]):
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        group = route_group(scope["path"])
+        limiter = self.limiters[group]
+        started = time.perf_counter()
+        rejected = await limiter.acquire()
+        if rejected is not None:
+            logger.warning(
+                "Shedding {} {} ({} group, {})",
+                scope["method"], scope["path"], group, rejected,
+            )
+            await busy_response()(scope, receive, send)
+            return
+        request_queue_wait.observe(time.perf_counter() - started, (group,))
+        slot = scope[SLOT_SCOPE_KEY] = Slot(limiter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            slot.release()
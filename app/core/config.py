@@ -10,6 +10,92 @@ DEBUG = ENVIRONMENT != "production"
 SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
+# Verified access tokens remembered so repeat requests skip the signature
+# check; entries expire with the token
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# Revoked refresh token IDs are grouped in buckets of this many seconds by
+# token expiry; a bucket is dropped once all of its tokens have expired
+REVOCATION_BUCKET_SECONDS = int(os.getenv("REVOCATION_BUCKET_SECONDS", "3600"))
+# How often each worker picks up revocations made by other workers
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "5"))
+
+# Server Configuration (python -m app.server)
+# Worker processes forked by the server; the limits below are per worker
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+if WEB_WORKERS < 1:
+    raise ValueError("WEB_WORKERS must be at least 1")
+# Connections all workers may hold on the primary database together; each
+# worker's pool gets an equal share, split 1:2 between kept and overflow
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "60"))
+_worker_connections = max(1, DB_MAX_CONNECTIONS // WEB_WORKERS)
+DB_POOL_SIZE = int(
+    os.getenv("DB_POOL_SIZE", str(max(1, _worker_connections // 3)))
+)
+DB_MAX_OVERFLOW = int(
+    os.getenv("DB_MAX_OVERFLOW", str(_worker_connections - DB_POOL_SIZE))
+)
+# Threads running sync routes in each worker. Every one of them can hold a
+# pooled connection, so more threads than connections would only queue
+# on the pool.
+THREADPOOL_THREADS = int(
+    os.getenv("THREADPOOL_THREADS", str(DB_POOL_SIZE + DB_MAX_OVERFLOW))
+)
+
+# Load Shedding Configuration
+# Requests each route group may run at once in a worker. Defaults follow
+# THREADPOOL_THREADS (and so DB_MAX_CONNECTIONS): other routes may use
+# every thread and connection, the bcrypt-bound /auth routes half of
+# them and the long-running /export streams a tenth.
+CONCURRENCY_LIMIT_ENABLED = (
+    os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true"
+)
+CONCURRENCY_LIMIT_DEFAULT = int(
+    os.getenv("CONCURRENCY_LIMIT_DEFAULT", str(THREADPOOL_THREADS))
+)
+CONCURRENCY_LIMIT_AUTH = int(
+    os.getenv("CONCURRENCY_LIMIT_AUTH", str(max(1, THREADPOOL_THREADS // 2)))
+)
+CONCURRENCY_LIMIT_EXPORT = int(
+    os.getenv(
+        "CONCURRENCY_LIMIT_EXPORT", str(max(1, THREADPOOL_THREADS // 10))
+    )
+)
+if min(
+    CONCURRENCY_LIMIT_DEFAULT, CONCURRENCY_LIMIT_AUTH, CONCURRENCY_LIMIT_EXPORT
+) < 1:
+    raise ValueError("CONCURRENCY_LIMIT_* must be at least 1")
+# Requests a group may queue beyond its limit, per running request
+CONCURRENCY_QUEUE_FACTOR = float(os.getenv("CONCURRENCY_QUEUE_FACTOR", "2"))
+# Longest a request waits in the queue before a 503. Once the oldest
+# queued request has waited this long, new ones are rejected at once.
+REQUEST_QUEUE_TARGET = (
+    float(os.getenv("REQUEST_QUEUE_TARGET_MS", "500")) / 1000
+)
+# Seconds to wait for a pooled connection before a 503 (SQLAlchemy's own
+# default is 30). Admitted requests fit in the pool, so a long wait means
+# it is shared with background work or other groups; fail fast instead.
+DB_POOL_TIMEOUT = float(
+    os.getenv("DB_POOL_TIMEOUT", str(max(1.0, 2 * REQUEST_QUEUE_TARGET)))
+)
+
+# CPU Executor Configuration (bcrypt hashing / verification)
+# CPU_EXECUTOR: "process" (default) or "thread"
+CPU_EXECUTOR_KIND = os.getenv("CPU_EXECUTOR", "process").lower()
+# The host's cores are shared between the web workers
+CPU_EXECUTOR_WORKERS = int(
+    os.getenv(
+        "CPU_EXECUTOR_WORKERS",
+        str(max(1, (os.cpu_count() or 1) // WEB_WORKERS)),
+    )
+)
+# Tasks allowed to wait for a free worker before new ones are rejected
+CPU_EXECUTOR_MAX_QUEUE = int(os.getenv("CPU_EXECUTOR_MAX_QUEUE", "64"))
+# bcrypt cost factor (2**rounds iterations). Pick it for the host with
+# `python -m benchmarks.bcrypt_rounds`; hashes stored with another cost
+# are rehashed on the user's next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+if not 4 <= BCRYPT_ROUNDS <= 31:
+    raise ValueError("BCRYPT_ROUNDS must be between 4 and 31")
 
 # Database Configuration
 """
@@ -92,4 +178,196 @@ def get_database_url() -> str:
     return "sqlite:///./app.db"
 
 
+def get_async_database_url(database_url: str) -> str:
+    """
+    Map a sync database URL onto its asyncio driver.
+
+    - sqlite:///...      -> sqlite+aiosqlite:///...
+    - postgresql://...   -> postgresql+asyncpg://...
+
+    URLs that already name a driver are returned unchanged.
+    """
+    scheme, sep, rest = database_url.partition("://")
+    if "+" in scheme:
+        return database_url
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if scheme in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    raise ValueError(f"No async driver configured for '{scheme}' URLs")
+
+
 DATABASE_URL = get_database_url()
+
+# Read Replica Configuration
+# Comma-separated URLs that read-only routes (get_read_db) are spread
+# over; empty sends every read to DATABASE_URL
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# Seconds a replica that failed to connect is left out of the rotation
+REPLICA_EJECT_SECONDS = float(os.getenv("REPLICA_EJECT_SECONDS", "30"))
+# After a client writes, its reads go to the primary for this long so it
+# sees its own changes despite replication lag
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Database access mode: "sync" (default) or "async".
+# "async" serves the API from async routes backed by an AsyncEngine
+# (aiosqlite for SQLite, asyncpg for PostgreSQL), so request concurrency
+# is no longer capped by the thread pool. Switch between the two to A/B
+# throughput against the same database.
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+if DB_MODE not in ("sync", "async"):
+    raise ValueError("DB_MODE must be 'sync' or 'async'")
+USE_ASYNC_DB = DB_MODE == "async"
+
+# DDL run at startup: "skip" (none), "migrate" (create missing tables) or
+# "check" (refuse to start if a table is missing). Development defaults to
+# "migrate" so the local SQLite database works out of the box.
+DB_SCHEMA_MODE = os.getenv(
+    "DB_SCHEMA_MODE", "migrate" if ENVIRONMENT == "development" else "skip"
+).lower()
+if DB_SCHEMA_MODE not in ("skip", "migrate", "check"):
+    raise ValueError("DB_SCHEMA_MODE must be 'skip', 'migrate' or 'check'")
+# Pool connections opened at startup (capped at the pool size)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "0"))
+
+# Pagination Configuration
+SUBJECTS_PAGE_SIZE = int(os.getenv("SUBJECTS_PAGE_SIZE", "100"))
+SUBJECTS_MAX_PAGE_SIZE = int(os.getenv("SUBJECTS_MAX_PAGE_SIZE", "1000"))
+# X-Total-Count source: "estimated" reads the planner's row estimate on
+# PostgreSQL (falls back to exact elsewhere), "exact" always runs COUNT(*)
+SUBJECTS_COUNT_MODE = os.getenv("SUBJECTS_COUNT_MODE", "estimated").lower()
+# GET /subjects/search page sizes
+SUBJECT_SEARCH_PAGE_SIZE = int(os.getenv("SUBJECT_SEARCH_PAGE_SIZE", "20"))
+SUBJECT_SEARCH_MAX_PAGE_SIZE = int(
+    os.getenv("SUBJECT_SEARCH_MAX_PAGE_SIZE", "100")
+)
+# Index matches ranked per search; results past this many are not reached
+SUBJECT_SEARCH_MAX_CANDIDATES = int(
+    os.getenv("SUBJECT_SEARCH_MAX_CANDIDATES", "1000")
+)
+
+# Bulk Write Configuration
+SUBJECTS_BULK_MAX_ITEMS = int(os.getenv("SUBJECTS_BULK_MAX_ITEMS", "10000"))
+# Rows per INSERT statement. SQLite builds can be limited to 999 bound
+# parameters, PostgreSQL to 65535.
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "1000"))
+SQLITE_BULK_INSERT_CHUNK_SIZE = int(
+    os.getenv("SQLITE_BULK_INSERT_CHUNK_SIZE", "400")
+)
+# Ids per DELETE ... WHERE id IN (...) statement, one bound parameter each
+BULK_DELETE_CHUNK_SIZE = int(os.getenv("BULK_DELETE_CHUNK_SIZE", "900"))
+
+# Export Configuration - rows fetched per server-side cursor batch
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Email Configuration
+# Without SMTP_HOST, outgoing mail is printed to stdout (development).
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+EMAIL_FROM = os.getenv("EMAIL_FROM", "no-reply@localhost")
+
+# Email Outbox Configuration
+# Run the outbox sender thread in the API process. python -m app.server
+# only starts it in its first worker.
+EMAIL_OUTBOX_WORKER = (
+    os.getenv("EMAIL_OUTBOX_WORKER", "true").lower() == "true"
+)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_POLL_INTERVAL = float(
+    os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", "2.0")
+)
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+# Seconds after which another worker may take over a claimed message
+EMAIL_OUTBOX_CLAIM_TIMEOUT = float(
+    os.getenv("EMAIL_OUTBOX_CLAIM_TIMEOUT", "300")
+)
+# Retry delay: BACKOFF_BASE * 2 ** (attempts - 1), capped at BACKOFF_MAX
+EMAIL_OUTBOX_BACKOFF_BASE = float(os.getenv("EMAIL_OUTBOX_BACKOFF_BASE", "30"))
+EMAIL_OUTBOX_BACKOFF_MAX = float(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX", "3600"))
+
+# Auth Rate Limit Configuration
+# Limits are "<requests>/<seconds>", checked before any bcrypt or DB work.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# "memory" (per process) or "database" (shared by all workers)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+# Keys tracked by the memory backend before the oldest are evicted
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+LOGIN_RATE_LIMIT_PER_IP = os.getenv("LOGIN_RATE_LIMIT_PER_IP", "30/60")
+LOGIN_RATE_LIMIT_PER_EMAIL = os.getenv("LOGIN_RATE_LIMIT_PER_EMAIL", "5/60")
+REGISTER_RATE_LIMIT_PER_IP = os.getenv("REGISTER_RATE_LIMIT_PER_IP", "10/60")
+REGISTER_RATE_LIMIT_PER_EMAIL = os.getenv(
+    "REGISTER_RATE_LIMIT_PER_EMAIL", "3/60"
+)
+
+# Idempotency-Key Configuration (POST /subjects/ and /auth/register)
+IDEMPOTENCY_ENABLED = (
+    os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+)
+# "memory" (per process) or "database" (shared by all workers; needed for
+# retries to find their original when WEB_WORKERS > 1)
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory").lower()
+if IDEMPOTENCY_BACKEND not in ("memory", "database"):
+    raise ValueError("IDEMPOTENCY_BACKEND must be 'memory' or 'database'")
+# Seconds a stored response is replayed to retries with the same key
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# Keys kept by the memory backend before the oldest are evicted
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+# Seconds a duplicate waits for the in-flight original before a 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+# Seconds a key stays locked by a request that never finished (e.g. its
+# worker died) before a retry may run it again
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+# Read Cache Configuration
+SUBJECT_CACHE_ENABLED = (
+    os.getenv("SUBJECT_CACHE_ENABLED", "true").lower() == "true"
+)
+SUBJECT_CACHE_TTL = float(os.getenv("SUBJECT_CACHE_TTL", "60"))
+SUBJECT_CACHE_MAX_ENTRIES = int(os.getenv("SUBJECT_CACHE_MAX_ENTRIES", "1024"))
+# How often (seconds) a worker re-reads table versions bumped by others
+CACHE_VERSION_CHECK_INTERVAL = float(
+    os.getenv("CACHE_VERSION_CHECK_INTERVAL", "1.0")
+)
+
+# Logging Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Directory of app.log and error.log (default: logs/ in the project root)
+LOG_DIR = os.getenv(
+    "LOG_DIR",
+    os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "logs"),
+)
+# Level of logs/app.log; errors always also go to logs/error.log
+LOG_FILE_LEVEL = os.getenv("LOG_FILE_LEVEL", LOG_LEVEL)
+# Hand records to a background writer thread instead of doing the I/O on
+# the request thread
+LOG_ENQUEUE = os.getenv("LOG_ENQUEUE", "true").lower() == "true"
+# Lines a writer may fall behind before new lines are dropped
+LOG_QUEUE_MAX_LINES = int(os.getenv("LOG_QUEUE_MAX_LINES", "10000"))
+# Fraction of records kept per level, e.g. "DEBUG=0.01,INFO=0.5";
+# unlisted levels are always kept and errors are never sampled
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# Metrics Configuration
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Request latency histogram bucket upper bounds, in seconds
+METRICS_LATENCY_BUCKETS = os.getenv(
+    "METRICS_LATENCY_BUCKETS",
+    "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10",
+)
+
+# SQL Instrumentation Configuration
+SQL_INSTRUMENTATION_ENABLED = (
+    os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+)
+# Statements at least this slow are logged (parameters redacted)
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+# Identical statements per request that get flagged as a likely N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
@@ -0,0 +1,175 @@
+"""Bounded executor for CPU-bound work such as bcrypt.
+
+bcrypt costs hundreds of milliseconds of CPU per call. Running it inline
+ties up the calling worker, so it is handed to a dedicated pool instead:
+
+- ``process`` (default): a ProcessPoolExecutor, so hashes scale with cores
+  instead of serializing on one interpreter.
+- ``thread``: a ThreadPoolExecutor, used when configured or when a process
+  pool cannot be started (e.g. no /dev/shm in the container).
+
+At most ``max_workers + max_queue`` tasks may be pending at once. Beyond
+that ``submit`` raises ExecutorSaturatedError instead of queueing, which the
+API maps to a 503.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core.config import (
+    CPU_EXECUTOR_KIND,
+    CPU_EXECUTOR_MAX_QUEUE,
+    CPU_EXECUTOR_WORKERS,
+)
+from app.core.logger import logger
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when the CPU executor queue is full."""
+
+
+class CPUExecutor:
+    def __init__(self, kind: str, max_workers: int, max_queue: int):
+        if kind not in ("process", "thread"):
+            raise ValueError("CPU executor kind must be 'process' or 'thread'")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool: Executor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._task_seconds = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                try:
+                    # spawn: children must not inherit DB connections or
+                    # the server's threads
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                except (OSError, NotImplementedError) as e:
+                    logger.warning(
+                        "Process pool unavailable ({}), falling back to "
+                        "threads", e
+                    )
+                    self.kind = "thread"
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="cpu-executor",
+                )
+            logger.info(
+                "CPU executor started: {} pool, {} workers, queue limit {}",
+                self.kind, self.max_workers, self.max_queue
+            )
+        return self._pool
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise ExecutorSaturatedError(
+                    f"CPU executor saturated ({self._in_flight} tasks pending)"
+                )
+            self._in_flight += 1
+            self._submitted += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+            pool = self._get_pool()
+
+        started = time.perf_counter()
+        try:
+            future = self._submit_to(pool, fn, args)
+        except BaseException:
+            # Including a failed re-submit, or the slot would leak
+            with self._lock:
+                self._in_flight -= 1
+                self._failed += 1
+            raise
+
+        def _done(f: Future):
+            with self._lock:
+                self._in_flight -= 1
+                self._task_seconds += time.perf_counter() - started
+                # exception() raises CancelledError on a cancelled future
+                if not f.cancelled() and f.exception() is None:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+        future.add_done_callback(_done)
+        return future
+
+    def _submit_to(self, pool: Executor, fn, args) -> Future:
+        try:
+            return pool.submit(fn, *args)
+        except BrokenProcessPool:
+            logger.error("CPU process pool is broken, switching to threads")
+            with self._lock:
+                self._pool = None
+                self.kind = "thread"
+                pool = self._get_pool()
+            return pool.submit(fn, *args)
+
+    def run(self, fn, *args):
+        """Run ``fn`` on the pool and block the calling thread for it."""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        """Run ``fn`` on the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.max_workers),
+                "max_in_flight": self._max_in_flight,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "task_seconds_total": self._task_seconds,
+            }
+
+    def _after_fork(self):
+        # The parent's pool and its management threads are not usable in
+        # a forked child; start a new one on first use
+        self._lock = threading.Lock()
+        self._pool = None
+        self._in_flight = 0
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+
+cpu_executor = CPUExecutor(
+    CPU_EXECUTOR_KIND, CPU_EXECUTOR_WORKERS, CPU_EXECUTOR_MAX_QUEUE
+)
+os.register_at_fork(after_in_child=cpu_executor._after_fork)
@@ -0,0 +1,498 @@
+"""Idempotency-Key support for the create endpoints.
+
+Clients retry POST /subjects/ and /auth/register after a timeout without
+knowing whether the first attempt went through. With an Idempotency-Key
+header, the first response is stored and every retry with the same key
+gets it back verbatim (plus ``Idempotent-Replayed: true``) without the
+request reaching the routes, so no second bcrypt hash, email or 409.
+
+- A key is bound to the request it was first used with (method, path,
+  query, Authorization and body, hashed). Reusing it for a different
+  request is a 422.
+- A duplicate that arrives while the original is still running waits for
+  it, up to IDEMPOTENCY_WAIT_SECONDS, then gets a 409 to retry later. It
+  gives its concurrency slot (app.core.concurrency) back while it waits,
+  so a retry storm doesn't starve unrelated requests, and polls another
+  worker's original with a growing interval.
+- Only responses a retry could not change are stored: 5xx, 408 and 429
+  release the key so the next attempt runs again.
+
+Responses live in a pluggable store, like the rate limiter counters:
+
+- MemoryIdempotencyStore: per process, bounded LRU with expiry.
+- DatabaseIdempotencyStore: the idempotency_keys table, so retries that
+  land on another worker find the original too.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from anyio import CancelScope
+from anyio.to_thread import run_sync
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from starlette.responses import JSONResponse
+
+from app.core.concurrency import SLOT_SCOPE_KEY, busy_response
+from app.core.config import (
+    IDEMPOTENCY_BACKEND,
+    IDEMPOTENCY_LOCK_SECONDS,
+    IDEMPOTENCY_MAX_KEYS,
+    IDEMPOTENCY_TTL,
+    IDEMPOTENCY_WAIT_SECONDS,
+)
+from app.core.logger import logger
+from app.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENT_ROUTES = frozenset({"/subjects/", "/auth/register"})
+
+MAX_KEY_LENGTH = 255
+
+# Statuses a retry may see differently, so they are never replayed
+RETRYABLE_STATUSES = frozenset({408, 429})
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    # None while the original request is in flight
+    status: int | None
+    headers: list | None
+    body: bytes | None
+    expires_at: float
+
+    @property
+    def pending(self) -> bool:
+        return self.status is None
+
+
+class IdempotencyStore:
+    """Response storage for IdempotencyMiddleware."""
+
+    # Whether calls do I/O and must stay off the event loop
+    blocking = False
+
+    def begin(
+        self, key: str, fingerprint: str, lock_until: float, now: float
+    ) -> StoredResponse | None:
+        """Claim ``key`` for a new request, or return what holds it.
+
+        Returns None if the caller now owns the key (a pending entry
+        expiring at ``lock_until`` was stored), otherwise the unexpired
+        entry, pending or complete.
+        """
+        raise NotImplementedError
+
+    def complete(self, key: str, response: StoredResponse):
+        raise NotImplementedError
+
+    def release(self, key: str):
+        """Drop ``key`` if its request is still pending."""
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, StoredResponse] = OrderedDict()
+
+    def begin(self, key, fingerprint, lock_until, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                return entry
+            self._store(
+                key, StoredResponse(fingerprint, None, None, None, lock_until)
+            )
+            return None
+
+    def complete(self, key, response):
+        with self._lock:
+            self._store(key, response)
+
+    def _store(self, key: str, entry: StoredResponse):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.pending:
+                del self._entries[key]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    blocking = True
+
+    # Purge expired keys roughly once per this many new requests
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._claims = 0
+
+    @staticmethod
+    def _claim(dialect: str, key, fingerprint, lock_until, now):
+        dialect_insert = (
+            postgresql.insert if dialect == "postgresql" else sqlite.insert
+        )
+        statement = dialect_insert(IdempotencyKey).values(
+            key=key, fingerprint=fingerprint, expires_at=lock_until
+        )
+        # Takes over an expired row too; a live one is left alone
+        return statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={
+                "fingerprint": statement.excluded.fingerprint,
+                "status_code": None,
+                "headers": None,
+                "body": None,
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=IdempotencyKey.expires_at <= now,
+        ).returning(IdempotencyKey.key)
+
+    def begin(self, key, fingerprint, lock_until, now):
+        db = self.session_factory()
+        try:
+            dialect = db.get_bind().dialect.name
+            # The row can vanish between the claim and the read (released
+            # or purged); claiming again then succeeds
+            for _ in range(2):
+                claimed = db.execute(
+                    self._claim(dialect, key, fingerprint, lock_until, now)
+                ).scalar()
+                if claimed is not None:
+                    self._claims += 1
+                    if self._claims % self.CLEANUP_EVERY == 0:
+                        db.execute(
+                            delete(IdempotencyKey).where(
+                                IdempotencyKey.expires_at <= now
+                            )
+                        )
+                    db.commit()
+                    return None
+                row = db.execute(
+                    select(
+                        IdempotencyKey.fingerprint,
+                        IdempotencyKey.status_code,
+                        IdempotencyKey.headers,
+                        IdempotencyKey.body,
+                        IdempotencyKey.expires_at,
+                    ).where(IdempotencyKey.key == key)
+                ).first()
+                db.commit()
+                if row is not None:
+                    return StoredResponse(*row)
+            raise RuntimeError(f"Could not claim idempotency key {key}")
+        finally:
+            db.close()
+
+    def complete(self, key, response):
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    fingerprint=response.fingerprint,
+                    status_code=response.status,
+                    headers=response.headers,
+                    body=response.body,
+                    expires_at=response.expires_at,
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, key):
+        db = self.session_factory()
+        try:
+            db.execute(
+                delete(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .where(IdempotencyKey.status_code.is_(None))
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def reset(self):
+        db = self.session_factory()
+        try:
+            db.execute(delete(IdempotencyKey))
+            db.commit()
+        finally:
+            db.close()
+
+
+def _build_store() -> IdempotencyStore:
+    if IDEMPOTENCY_BACKEND == "database":
+        from app.database import get_sessionmaker
+
+        # Resolved per call so importing this module builds no engine
+        return DatabaseIdempotencyStore(lambda: get_sessionmaker()())
+    return MemoryIdempotencyStore(IDEMPOTENCY_MAX_KEYS)
+
+
+idempotency_store = _build_store()
+
+
+def request_fingerprint(scope, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (
+        scope["method"].encode(),
+        scope["path"].encode(),
+        scope.get("query_string", b""),
+        dict(scope["headers"]).get(b"authorization", b""),
+        body,
+    ):
+        # Length-prefixed so parts can't run into each other
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+async def _read_body(receive) -> bytes | None:
+    """The whole request body, or None if the client disconnected."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+class _Capture:
+    """The response as it is sent, kept for storing once complete."""
+
+    def __init__(self):
+        self.status: int | None = None
+        self.headers: list = []
+        self.chunks: list[bytes] = []
+        self.complete = False
+
+    def add(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            self.headers = [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in message.get("headers", [])
+            ]
+        elif message["type"] == "http.response.body":
+            self.chunks.append(message.get("body", b""))
+            self.complete = not message.get("more_body", False)
+
+    def storable(self) -> bool:
+        return (
+            self.complete
+            and self.status < 500
+            and self.status not in RETRYABLE_STATUSES
+        )
+
+
+class IdempotencyMiddleware:
+    """Stores and replays responses for requests with an Idempotency-Key."""
+
+    def __init__(
+        self,
+        app,
+        store: IdempotencyStore,
+        paths=IDEMPOTENT_ROUTES,
+        ttl: float = IDEMPOTENCY_TTL,
+        wait_seconds: float = IDEMPOTENCY_WAIT_SECONDS,
+        lock_seconds: float = IDEMPOTENCY_LOCK_SECONDS,
+        poll_interval: float = 0.05,
+        max_poll_interval: float = 1.0,
+        clock=time.time,
+    ):
+        self.app = app
+        self.store = store
+        self.paths = paths
+        self.ttl = ttl
+        self.wait_seconds = wait_seconds
+        self.lock_seconds = lock_seconds
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.clock = clock
+        # Originals running in this process, for duplicates to wait on
+        self._in_flight: dict[str, asyncio.Event] = {}
+
+    async def _call(self, fn, *args):
+        if self.store.blocking:
+            return await run_sync(fn, *args)
+        return fn(*args)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        header = dict(scope["headers"]).get(b"idempotency-key")
+        if header is None:
+            await self.app(scope, receive, send)
+            return
+        key = header.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await JSONResponse(
+                {"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} "
+                           "characters"},
+                status_code=400,
+            )(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        if body is None:
+            return
+        fingerprint = request_fingerprint(scope, body)
+        store_key = f"{scope['path']}:{key}"
+
+        slot = scope.get(SLOT_SCOPE_KEY)
+        stored = await self._claim(store_key, fingerprint, slot)
+        if stored is not None:
+            await self._respond_with(stored, fingerprint, key)(
+                scope, receive, send
+            )
+            return
+        # Given back while waiting; the route needs one again
+        if slot is not None and await slot.reacquire() is not None:
+            await self._call(self.store.release, store_key)
+            await busy_response()(scope, receive, send)
+            return
+
+        event = self._in_flight[store_key] = asyncio.Event()
+        capture = _Capture()
+        sent = False
+
+        async def replay_body():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send_and_capture(message):
+            capture.add(message)
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, send_and_capture)
+        finally:
+            # Waiters must find the outcome, even if this task is cancelled
+            with CancelScope(shield=True):
+                await self._finish(store_key, fingerprint, capture)
+                if self._in_flight.get(store_key) is event:
+                    del self._in_flight[store_key]
+                event.set()
+
+    async def _claim(self, store_key: str, fingerprint: str, slot=None):
+        """Own ``store_key`` (None) or return the entry that settles it."""
+        deadline = time.monotonic() + self.wait_seconds
+        poll_interval = self.poll_interval
+        while True:
+            now = self.clock()
+            stored = await self._call(
+                self.store.begin, store_key, fingerprint,
+                now + self.lock_seconds, now,
+            )
+            if stored is None or not stored.pending:
+                return stored
+            if stored.fingerprint != fingerprint:
+                return stored
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return stored
+            if slot is not None:
+                slot.release()
+            event = self._in_flight.get(store_key)
+            if event is None:
+                # The original runs in another worker; back off so long
+                # waits don't keep querying the store
+                await asyncio.sleep(min(poll_interval, remaining))
+                poll_interval = min(poll_interval * 2, self.max_poll_interval)
+                continue
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def _respond_with(self, stored: StoredResponse, fingerprint, key):
+        if stored.fingerprint != fingerprint:
+            logger.warning(
+                "Idempotency-Key {} reused for another request", key
+            )
+            return JSONResponse(
+                {"detail": "Idempotency-Key was used for a different request"},
+                status_code=422,
+            )
+        if stored.pending:
+            logger.warning("Idempotency-Key {} still in progress", key)
+            return JSONResponse(
+                {"detail": "A request with this Idempotency-Key is still "
+                           "in progress"},
+                status_code=409,
+                headers={"Retry-After": "1"},
+            )
+        logger.info("Replaying response for Idempotency-Key {}", key)
+        return _StoredReplay(stored)
+
+    async def _finish(self, store_key, fingerprint, capture: _Capture):
+        try:
+            if capture.storable():
+                response = StoredResponse(
+                    fingerprint,
+                    capture.status,
+                    capture.headers,
+                    b"".join(capture.chunks),
+                    self.clock() + self.ttl,
+                )
+                await self._call(self.store.complete, store_key, response)
+            else:
+                await self._call(self.store.release, store_key)
+        except Exception as e:
+            # The response already went out; a retry just runs again
+            logger.error(
+                "Could not record idempotency key {}: {}", store_key, e
+            )
+
+
+class _StoredReplay:
+    def __init__(self, stored: StoredResponse):
+        self.stored = stored
+
+    async def __call__(self, scope, receive, send):
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in self.stored.headers
+        ]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.stored.status,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": self.stored.body})
@@ -1,51 +1,308 @@
-import sys
+"""Loguru configuration.
+
+Call sites pass arguments instead of pre-formatting, e.g.
+``logger.debug("Fetching subject with ID: {}", subject_id)``. Loguru then
+skips the formatting entirely when no sink accepts the level.
+
+With LOG_ENQUEUE (the default) each record is formatted on the calling
+thread and the line is handed to a writer thread through a bounded
+in-process queue, so request threads never wait on stdout or disk.
+Rotated files are zipped on a separate thread. LOG_SAMPLE_RATES keeps only
+a fraction of records per level (e.g. ``DEBUG=0.01``); sampling cuts the
+volume written, and errors are never sampled.
+
+Run ``python -m benchmarks.logging_overhead`` to compare the modes.
+"""
+import asyncio
+import atexit
+import copy
 import os
+import queue
+import random
+import sys
+import threading
+import zipfile
+
 from loguru import logger
 
-# Remove default handler
-logger.remove()
+from app.core.config import (
+    LOG_DIR,
+    LOG_ENQUEUE,
+    LOG_FILE_LEVEL,
+    LOG_LEVEL,
+    LOG_QUEUE_MAX_LINES,
+    LOG_SAMPLE_RATES,
+)
 
 # Create logs directory if it doesn't exist
-log_dir = os.path.join(os.path.dirname(__file__), "../../logs")
+log_dir = LOG_DIR
 os.makedirs(log_dir, exist_ok=True)
 
-# Log level based on environment
-log_level = os.getenv("LOG_LEVEL", "INFO")
-
-# Console handler - for development/debugging
-logger.add(
-    sys.stdout,
-    level=log_level,
-    format='''
+CONSOLE_FORMAT = '''
     <green>{time:YYYY-MM-DD HH:mm:ss}</green>
       | <level>{level: <8}</level>
         | <cyan>{name}</cyan>:<cyan>{function}</cyan>
         :<cyan>{line}</cyan> - <level>{message}</level>
-        ''',
-    colorize=True,
+        '''
+FILE_FORMAT = (
+    "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | "
+    "{name}:{function}:{line} - {message}"
 )
 
-# File handler - for all logs
-logger.add(
-    os.path.join(log_dir, "app.log"),
-    level="DEBUG",
-    format=(
-        "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | "
-        "{name}:{function}:{line} - {message}"
-    ),
-    rotation="500 MB",
-    retention="10 days",
-    compression="zip",
-)
+ERROR_LEVEL_NO = logger.level("ERROR").no
 
-# File handler - for errors only
-logger.add(
-    os.path.join(log_dir, "error.log"),
-    level="ERROR",
-    format=(
-        "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | "
-        "{name}:{function}:{line} - {message}"
-    ),
-    rotation="500 MB",
-    retention="30 days",
-)
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parse ``"DEBUG=0.01,INFO=0.5"`` into ``{"DEBUG": 0.01, ...}``."""
+    rates = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        level, _, rate = item.partition("=")
+        rates[level.strip().upper()] = float(rate)
+    return rates
+
+
+class LevelSampler:
+    """Keeps a fraction of records per level.
+
+    The decision is made once per record (as a patcher) so every sink
+    agrees on which records were dropped.
+    """
+
+    def __init__(self, rates: dict[str, float], rng=random.random):
+        self.rates = rates
+        self.rng = rng
+
+    def patch(self, record):
+        if not self.rates or record["level"].no >= ERROR_LEVEL_NO:
+            return
+        rate = self.rates.get(record["level"].name)
+        if rate is not None and self.rng() >= rate:
+            record["extra"]["sampled_out"] = True
+
+    @staticmethod
+    def keep(record) -> bool:
+        return not record["extra"].get("sampled_out", False)
+
+
+def compress_in_background(path: str):
+    """Zip a rotated log file without holding up the writer."""
+
+    def run():
+        try:
+            with zipfile.ZipFile(
+                f"{path}.zip", "w", zipfile.ZIP_DEFLATED
+            ) as archive:
+                archive.write(path, os.path.basename(path))
+            os.remove(path)
+        except OSError as e:
+            sys.stderr.write(f"Log compression failed for {path}: {e}\n")
+
+    threading.Thread(target=run, name="log-compress", daemon=True).start()
+
+
+class BackgroundSink:
+    """Loguru sink that passes formatted lines to ``target`` on a thread.
+
+    Loguru's own ``enqueue=True`` pickles every record through a
+    multiprocessing pipe, which costs the caller more than a buffered file
+    write; this only appends the already formatted line to a queue.
+    """
+
+    def __init__(
+        self, target, on_stop=None, name="log-writer",
+        max_lines: int = LOG_QUEUE_MAX_LINES,
+    ):
+        self._target = target
+        self._on_stop = on_stop
+        self._name = name
+        self._max_lines = max_lines
+        # Lines dropped because the writer fell max_lines behind
+        self.dropped = 0
+        self._start()
+
+    def _start(self):
+        self._queue = queue.Queue(self._max_lines)
+        self._thread = threading.Thread(
+            target=self._run, name=self._name, daemon=True
+        )
+        self._thread.start()
+
+    def write(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            # Never block the request on a stalled stdout or disk
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            try:
+                self._target(item)
+            except Exception as e:
+                sys.stderr.write(f"Log writer failed: {e}\n")
+
+    def join(self, timeout: float | None = None):
+        """Wait until every line written so far has been handed over."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    async def complete(self):
+        # Awaited by ``await logger.complete()``
+        await asyncio.to_thread(self.join)
+
+    def stop(self):
+        # Called by loguru when the handler is removed
+        self._queue.put(None)
+        self._thread.join()
+        if self._on_stop is not None:
+            self._on_stop()
+
+
+_background_sinks: list[BackgroundSink] = []
+
+
+def flush_logs(timeout: float | None = None):
+    """Block until queued log lines have been written."""
+    for sink in _background_sinks:
+        sink.join(timeout)
+
+
+def dropped_log_lines() -> int:
+    return sum(sink.dropped for sink in _background_sinks)
+
+
+def _restart_writers_after_fork():
+    # Threads don't survive fork(); a forked server worker needs its own
+    # writers. Lines still queued in the parent are written by the parent.
+    for sink in _background_sinks:
+        sink._start()
+
+
+# Writer threads are daemons; don't lose the last lines on exit
+atexit.register(flush_logs, 5)
+os.register_at_fork(after_in_child=_restart_writers_after_fork)
+
+
+def log_file_name(name: str, worker: int | None = None) -> str:
+    """``app.log`` for the master, ``app-worker-<slot>.log`` in a worker.
+
+    Each process rotates only its own files; the dash keeps the worker
+    files out of the master's ``app.*.log`` retention glob.
+    """
+    if worker is None:
+        return f"{name}.log"
+    return f"{name}-worker-{worker}.log"
+
+
+def _add_file_sinks(
+    target, directory, file_level, format, filter=None, worker=None
+):
+    # File handler - for all logs
+    target.add(
+        os.path.join(directory, log_file_name("app", worker)),
+        level=file_level,
+        format=format,
+        filter=filter,
+        rotation="500 MB",
+        retention="10 days",
+        compression=compress_in_background,
+    )
+
+    # File handler - for errors only
+    target.add(
+        os.path.join(directory, log_file_name("error", worker)),
+        level="ERROR",
+        format=format,
+        rotation="500 MB",
+        retention="30 days",
+    )
+
+
+def _write_console(console):
+    def write(message):
+        console.write(message)
+        console.flush()
+
+    return write
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    file_level: str = LOG_FILE_LEVEL,
+    enqueue: bool = LOG_ENQUEUE,
+    sample_rates: str = LOG_SAMPLE_RATES,
+    directory: str = log_dir,
+    console=sys.stdout,
+    worker: int | None = None,
+):
+    # Remove default handler
+    logger.remove()
+    _background_sinks.clear()
+    sampler = LevelSampler(parse_sample_rates(sample_rates))
+
+    if not enqueue:
+        logger.configure(patcher=sampler.patch)
+        # Console handler - for development/debugging
+        if console is not None:
+            logger.add(
+                console,
+                level=level,
+                format=CONSOLE_FORMAT,
+                colorize=True,
+                filter=sampler.keep,
+            )
+        _add_file_sinks(
+            logger, directory, file_level, FILE_FORMAT, sampler.keep,
+            worker,
+        )
+        return
+
+    # Independent loguru core that only the writer thread logs to; lines
+    # arrive pre-formatted and are written raw
+    writer = copy.deepcopy(logger)
+    writer.configure(patcher=lambda record: None)
+    _add_file_sinks(
+        writer, directory, file_level, "{message}", worker=worker
+    )
+    logger.configure(patcher=sampler.patch)
+
+    if console is not None:
+        console_sink = BackgroundSink(
+            _write_console(console), name="log-console"
+        )
+        _background_sinks.append(console_sink)
+        logger.add(
+            console_sink,
+            level=level,
+            format=CONSOLE_FORMAT,
+            colorize=True,
+            filter=sampler.keep,
+        )
+
+    file_sink = BackgroundSink(
+        lambda message: writer.opt(raw=True).log(
+            message.record["level"].name, message
+        ),
+        on_stop=writer.remove,
+        name="log-files",
+    )
+    _background_sinks.append(file_sink)
+    logger.add(
+        file_sink,
+        # app.log and error.log are both fed from here
+        level=min(logger.level(file_level).no, ERROR_LEVEL_NO),
+        format=FILE_FORMAT,
+        filter=sampler.keep,
+    )
+
+
+configure_logging()
@@ -0,0 +1,247 @@
+"""Request latency, pool and executor metrics in Prometheus text format.
+
+The hot path stays lock free: histograms have fixed, preallocated buckets
+and every thread updates its own counters (a lock is only taken the first
+time a thread records a series). ``/metrics`` sums the per-thread counters
+and reads the pool/executor gauges at scrape time. A thread's counters are
+folded into a shared series when the thread exits.
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import METRICS_LATENCY_BUCKETS
+
+# Upper bounds in seconds; the +Inf bucket is implicit
+POOL_WAIT_BUCKETS = (
+    0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    30,
+)
+# bcrypt is tuned to take tens to hundreds of milliseconds
+PASSWORD_HASH_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.75, 1,
+    2, 5,
+)
+
+
+def parse_buckets(spec: str) -> tuple[float, ...]:
+    return tuple(sorted(float(b) for b in spec.split(",") if b.strip()))
+
+
+class _ShardOwner:
+    """Held only by a thread's local storage, so it dies with the thread."""
+
+    __slots__ = ("series", "__weakref__")
+
+    def __init__(self):
+        self.series: dict[tuple, list] = {}
+
+
+class Histogram:
+    """Fixed-bucket histogram of one or more label sets."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: list[dict] = []
+        # Counters of threads that have exited (the threadpool replaces
+        # idle threads), so shards don't pile up
+        self._retired: dict[tuple, list] = {}
+
+    def _series(self, labels: tuple) -> list:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            owner = self._local.owner = _ShardOwner()
+            shard = self._local.shard = owner.series
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(owner, self._retire, shard)
+        series = shard.get(labels)
+        if series is None:
+            # One counter per bucket plus +Inf, then the running sum
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        return series
+
+    def _retire(self, shard: dict):
+        with self._lock:
+            self._shards.remove(shard)
+            _merge(self._retired, shard)
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self._series(labels)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> dict[tuple, list]:
+        """Return ``{labels: [bucket counts..., sum]}`` over all threads."""
+        totals: dict[tuple, list] = {}
+        # Under the lock so a shard retiring meanwhile isn't counted twice
+        with self._lock:
+            _merge(totals, self._retired)
+            for shard in self._shards:
+                _merge(totals, shard)
+        return totals
+
+    def reset(self):
+        with self._lock:
+            self._retired.clear()
+            for shard in self._shards:
+                shard.clear()
+
+
+def _merge(totals: dict[tuple, list], shard: dict[tuple, list]):
+    for labels, series in list(shard.items()):
+        total = totals.get(labels)
+        if total is None:
+            totals[labels] = list(series)
+        else:
+            for i, value in enumerate(series):
+                total[i] += value
+
+
+request_latency = Histogram(parse_buckets(METRICS_LATENCY_BUCKETS))
+pool_wait = Histogram(POOL_WAIT_BUCKETS)
+pool_hold = Histogram(POOL_WAIT_BUCKETS)
+# Key in a pooled connection's info dict while it is checked out
+CHECKED_OUT_AT = "metrics_checked_out_at"
+# Time admitted requests waited for a slot in their route group
+request_queue_wait = Histogram(POOL_WAIT_BUCKETS)
+# Time bcrypt itself took, by operation (hash / verify)
+password_hash_seconds = Histogram(PASSWORD_HASH_BUCKETS)
+
+
+# Seconds spent in each startup phase of this process (import, schema,
+# pool_warmup, total), filled in by the lifespan handler
+startup_seconds: dict[str, float] = {}
+
+
+# Requests in progress, keyed by id(scope). Only touched from the event
+# loop thread; /metrics groups them by route when scraped.
+active_requests: dict[int, dict] = {}
+
+
+class MetricsMiddleware:
+    """Records latency per method, route template and status code."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        key = id(scope)
+        active_requests[key] = scope
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            del active_requests[key]
+            request_latency.observe(
+                time.perf_counter() - start,
+                (scope["method"], route_label(scope), status),
+            )
+
+
+def route_label(scope) -> str:
+    # Templates like /subjects/{subject_id} keep the label set bounded
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+class _TimedPoolMixin:
+    """Pool that records how long each checkout waited for a connection
+    and how long the connection was held before it came back."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - start, (self.label,))
+        record.info[CHECKED_OUT_AT] = time.perf_counter()
+        return record
+
+    def _do_return_conn(self, record):
+        started = record.info.pop(CHECKED_OUT_AT, None)
+        if started is not None:
+            pool_hold.observe(time.perf_counter() - started, (self.label,))
+        super()._do_return_conn(record)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    label = "sync"
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    label = "async"
+
+
+def _escape(value) -> str:
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsWriter:
+    """Builds a Prometheus text exposition (format 0.0.4)."""
+
+    def __init__(self):
+        self.lines: list[str] = []
+
+    def _header(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(
+        self, name: str, kind: str, help_text: str,
+        values: dict[tuple, float], label_names: tuple = (),
+    ):
+        self._header(name, kind, help_text)
+        for labels, value in values.items():
+            self.lines.append(
+                f"{name}{_labels(label_names, labels)} {value}"
+            )
+
+    def histogram(
+        self, name: str, help_text: str, histogram: Histogram,
+        label_names: tuple = (),
+    ):
+        self._header(name, "histogram", help_text)
+        bounds = [repr(float(b)) for b in histogram.buckets] + ["+Inf"]
+        for labels, series in sorted(
+            histogram.collect().items(), key=lambda item: str(item[0])
+        ):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                label_text = _labels(label_names, labels, f'le="{bound}"')
+                self.lines.append(f"{name}_bucket{label_text} {cumulative}")
+            label_text = _labels(label_names, labels)
+            self.lines.append(f"{name}_sum{label_text} {series[-1]}")
+            self.lines.append(f"{name}_count{label_text} {cumulative}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -0,0 +1,147 @@
+"""Per-request SQL statistics.
+
+Cursor events on every engine add each statement to the QueryStats of the
+request being served (found through a context variable, which anyio
+carries into the thread pool for sync routes). QueryStatsMiddleware then:
+
+- sends ``Server-Timing: db;dur=<ms>;desc="<n> queries"``
+- logs the query count and DB time of the request at DEBUG
+- warns when one statement shape ran SQL_N_PLUS_ONE_THRESHOLD or more
+  times in a single request, the usual sign of an N+1 pattern
+
+Statements slower than SQL_SLOW_QUERY_MS are logged with their parameter
+values redacted.
+"""
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.core.config import SQL_N_PLUS_ONE_THRESHOLD, SQL_SLOW_QUERY_MS
+from app.core.logger import logger
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Parameterized SQL text -> executions; same text, same shape
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [
+            (statement, count)
+            for statement, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+        )
+
+
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def redact_parameters(parameters):
+    """Keep the shape of bound parameters but none of their values."""
+    if isinstance(parameters, dict):
+        return {key: "?" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany
+            return f"<{len(parameters)} parameter sets>"
+        return ["?"] * len(parameters)
+    return "?"
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    if seconds * 1000 >= SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query ({:.1f} ms): {} parameters={}",
+            seconds * 1000, statement, redact_parameters(parameters),
+        )
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute doesn't run for failed statements
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine):
+    """Attach the hooks to an Engine (or an AsyncEngine's sync_engine)."""
+    if event.contains(
+        engine, "before_cursor_execute", _before_cursor_execute
+    ):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (b"server-timing", stats.server_timing().encode())
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope, stats: QueryStats):
+        if not stats.count:
+            return
+        logger.debug(
+            "{} {}: {} queries in {:.1f} ms",
+            scope["method"], scope["path"], stats.count,
+            stats.seconds * 1000,
+        )
+        for statement, count in stats.repeated(SQL_N_PLUS_ONE_THRESHOLD):
+            logger.warning(
+                "Possible N+1 in {} {}: statement ran {} times: {}",
+                scope["method"], scope["path"], count, statement,
+            )
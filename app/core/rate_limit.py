@@ -0,0 +1,309 @@
+"""Admission control for the credential endpoints.
+
+Every /auth/login and /auth/register call costs a full bcrypt operation, so
+a credential-stuffing burst would otherwise saturate the CPU executor.
+Requests are checked against per-IP and per-email budgets *before* any
+bcrypt or user lookup runs, and over-budget requests get a 429.
+
+Budgets use the sliding-window counter algorithm: hits are counted in fixed
+windows and the previous window is weighted by how much of it still
+overlaps the sliding window. Counters live in a pluggable storage:
+
+- MemoryRateLimitStorage: per process, bounded LRU of keys.
+- DatabaseRateLimitStorage: the rate_limit_counters table, so limits are
+  shared by every worker that talks to the same database.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from fastapi import HTTPException, Request
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.config import (
+    LOGIN_RATE_LIMIT_PER_EMAIL,
+    LOGIN_RATE_LIMIT_PER_IP,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_MAX_KEYS,
+    REGISTER_RATE_LIMIT_PER_EMAIL,
+    REGISTER_RATE_LIMIT_PER_IP,
+)
+from app.core.logger import logger
+from app.models.rate_limit_counter import RateLimitCounter
+
+
+class RateLimit(NamedTuple):
+    name: str
+    limit: int
+    window: int  # seconds
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RateLimit":
+        """Parse ``"<requests>/<seconds>"``."""
+        limit, _, window = spec.partition("/")
+        return cls(name, int(limit), int(window))
+
+
+class RateLimitStorage:
+    """Counter storage for RateLimiter."""
+
+    # Whether calls do I/O and must stay off the event loop
+    blocking = False
+
+    def hit(self, key: str, window: int) -> tuple[int, int]:
+        """Count one hit for ``key`` in ``window``.
+
+        Returns the new count together with the previous window's count,
+        both read atomically with the increment.
+        """
+        raise NotImplementedError
+
+    def undo(self, key: str, window: int):
+        """Take back a hit whose request was rejected."""
+        raise NotImplementedError
+
+    def get(self, key: str, window: int) -> int:
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryRateLimitStorage(RateLimitStorage):
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._counts: OrderedDict[str, dict[int, int]] = OrderedDict()
+
+    def hit(self, key: str, window: int) -> tuple[int, int]:
+        with self._lock:
+            windows = self._counts.get(key)
+            if windows is None:
+                windows = self._counts[key] = {}
+                while len(self._counts) > self.max_keys:
+                    self._counts.popitem(last=False)
+            else:
+                self._counts.move_to_end(key)
+            # Only the current and previous windows are ever read
+            for old in [w for w in windows if w < window - 1]:
+                del windows[old]
+            windows[window] = windows.get(window, 0) + 1
+            return windows[window], windows.get(window - 1, 0)
+
+    def undo(self, key: str, window: int):
+        with self._lock:
+            windows = self._counts.get(key)
+            if windows and windows.get(window, 0) > 0:
+                windows[window] -= 1
+
+    def get(self, key: str, window: int) -> int:
+        with self._lock:
+            return self._counts.get(key, {}).get(window, 0)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+    def size(self) -> int:
+        return len(self._counts)
+
+
+class DatabaseRateLimitStorage(RateLimitStorage):
+    blocking = True
+
+    # Purge expired windows roughly once per this many hits
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._hits = 0
+
+    def hit(self, key: str, window: int) -> tuple[int, int]:
+        db = self.session_factory()
+        try:
+            dialect = db.get_bind().dialect.name
+            dialect_insert = (
+                postgresql.insert if dialect == "postgresql" else sqlite.insert
+            )
+            statement = dialect_insert(RateLimitCounter).values(
+                key=key, window=window, count=1
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=[RateLimitCounter.key, RateLimitCounter.window],
+                set_={"count": RateLimitCounter.count + 1},
+            ).returning(RateLimitCounter.count)
+            count = db.execute(statement).scalar()
+            previous = db.execute(
+                select(RateLimitCounter.count)
+                .where(RateLimitCounter.key == key)
+                .where(RateLimitCounter.window == window - 1)
+            ).scalar()
+            self._hits += 1
+            if self._hits % self.CLEANUP_EVERY == 0:
+                db.execute(
+                    delete(RateLimitCounter).where(
+                        RateLimitCounter.window < window - 1
+                    )
+                )
+            db.commit()
+            return count, previous or 0
+        finally:
+            db.close()
+
+    def undo(self, key: str, window: int):
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(RateLimitCounter)
+                .where(RateLimitCounter.key == key)
+                .where(RateLimitCounter.window == window)
+                .where(RateLimitCounter.count > 0)
+                .values(count=RateLimitCounter.count - 1)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def get(self, key: str, window: int) -> int:
+        db = self.session_factory()
+        try:
+            count = db.execute(
+                select(RateLimitCounter.count)
+                .where(RateLimitCounter.key == key)
+                .where(RateLimitCounter.window == window)
+            ).scalar()
+            return count or 0
+        finally:
+            db.close()
+
+    def reset(self):
+        db = self.session_factory()
+        try:
+            db.execute(delete(RateLimitCounter))
+            db.commit()
+        finally:
+            db.close()
+
+    def size(self) -> int:
+        return -1  # not tracked locally
+
+
+class RateLimiter:
+    def __init__(self, storage: RateLimitStorage, clock=time.time):
+        self.storage = storage
+        self.clock = clock
+        self._stats: dict[str, dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+
+    def check(self, rule: RateLimit, key: str) -> float | None:
+        """Count a hit against ``rule``; return Retry-After if over budget.
+
+        The hit is counted first and the decision made on the counts that
+        come back, so concurrent requests (threads or workers) can never
+        all see the last free slot. Rejected hits are taken back, so a
+        client that backs off regains its budget as the window slides.
+        """
+        rejected = self.check_all([(rule, key)])
+        return None if rejected is None else rejected[2]
+
+    def check_all(self, checks: list[tuple[RateLimit, str]]):
+        """Count a hit against each ``(rule, key)``, like check().
+
+        Stops at the first rule over budget and takes back the hits this
+        call already counted, so a request rejected by one rule costs no
+        budget under the others. Returns ``(rule, key, retry_after)`` for
+        that rule, or None.
+        """
+        now = self.clock()
+        counted = []
+        for rule, key in checks:
+            window = int(now // rule.window)
+            elapsed = (now % rule.window) / rule.window
+            storage_key = f"{rule.name}:{key}"
+
+            current, previous = self.storage.hit(storage_key, window)
+            estimate = previous * (1 - elapsed) + current
+
+            rejected = estimate > rule.limit
+            with self._stats_lock:
+                stats = self._stats.setdefault(
+                    rule.name, {"allowed": 0, "rejected": 0}
+                )
+                stats["rejected" if rejected else "allowed"] += 1
+            counted.append((storage_key, window))
+            if rejected:
+                for storage_key, window in counted:
+                    self.storage.undo(storage_key, window)
+                # Upper bound: by then the previous window no longer counts
+                return rule, key, max(1.0, rule.window * (1 - elapsed))
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.storage).__name__,
+            "tracked_keys": self.storage.size(),
+            "rules": {
+                name: dict(s) for name, s in list(self._stats.items())
+            },
+        }
+
+    def reset(self):
+        self.storage.reset()
+        self._stats.clear()
+
+
+def _build_storage() -> RateLimitStorage:
+    if RATE_LIMIT_BACKEND == "database":
+        from app.database import get_sessionmaker
+
+        # Resolved per call so importing this module builds no engine
+        return DatabaseRateLimitStorage(lambda: get_sessionmaker()())
+    return MemoryRateLimitStorage(RATE_LIMIT_MAX_KEYS)
+
+
+rate_limiter = RateLimiter(_build_storage())
+
+# Rules per action: (rule, what the key is built from)
+AUTH_RATE_LIMITS = {
+    "login": [
+        (RateLimit.parse("login:ip", LOGIN_RATE_LIMIT_PER_IP), "ip"),
+        (RateLimit.parse("login:email", LOGIN_RATE_LIMIT_PER_EMAIL), "email"),
+    ],
+    "register": [
+        (RateLimit.parse("register:ip", REGISTER_RATE_LIMIT_PER_IP), "ip"),
+        (
+            RateLimit.parse("register:email", REGISTER_RATE_LIMIT_PER_EMAIL),
+            "email",
+        ),
+    ],
+}
+
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the
+    # X-Forwarded-For client rather than the proxy
+    return request.client.host if request.client else "unknown"
+
+
+def enforce_auth_rate_limits(request: Request, action: str, email: str):
+    """Raise 429 if ``action`` is over budget for this client or email."""
+    if not RATE_LIMIT_ENABLED:
+        return
+    keys = {"ip": client_ip(request), "email": email.lower()}
+    rejected = rate_limiter.check_all(
+        [(rule, keys[key_type]) for rule, key_type in AUTH_RATE_LIMITS[action]]
+    )
+    if rejected is not None:
+        rule, key, retry_after = rejected
+        logger.warning("Rate limit {} exceeded for {}", rule.name, key)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(int(retry_after + 0.999))},
+        )
@@ -0,0 +1,130 @@
+"""Read replica routing.
+
+get_read_db / get_async_read_db (app/database.py) give read-only routes a
+session on one of DATABASE_REPLICA_URLS, taken round-robin. A replica that
+fails to hand out a connection is ejected for REPLICA_EJECT_SECONDS and the
+read falls through to the next replica, then to the primary.
+
+Replicas lag the primary, so a client that has just written is pinned to
+the primary for READ_YOUR_WRITES_SECONDS: ReadYourWritesMiddleware sets a
+cookie on every successful write and the read dependencies honour it. The
+cookie keeps the pin working when the next read lands on another worker.
+"""
+import itertools
+import math
+import time
+
+from sqlalchemy.exc import DBAPIError
+
+from app.core.logger import logger
+
+PRIMARY_COOKIE = "db_primary_until"
+UNSAFE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+class ReplicaRouter:
+    """Round-robin over replica session factories, skipping ejected ones."""
+
+    def __init__(
+        self, session_factories: list, eject_seconds: float,
+        clock=time.monotonic,
+    ):
+        self.session_factories = list(session_factories)
+        self.eject_seconds = eject_seconds
+        self.clock = clock
+        self._rotation = itertools.count()
+        self._ejected_until = [0.0] * len(self.session_factories)
+
+    def candidates(self) -> list[int]:
+        """Healthy replica indexes, starting at the next in the rotation."""
+        count = len(self.session_factories)
+        if not count:
+            return []
+        start = next(self._rotation) % count
+        now = self.clock()
+        return [
+            index % count for index in range(start, start + count)
+            if self._ejected_until[index % count] <= now
+        ]
+
+    def eject(self, index: int, error: Exception):
+        self._ejected_until[index] = self.clock() + self.eject_seconds
+        logger.warning(
+            "Read replica {} ejected for {}s: {}",
+            index, self.eject_seconds, error,
+        )
+
+    def ejected(self) -> list[int]:
+        now = self.clock()
+        return [
+            index for index, until in enumerate(self._ejected_until)
+            if until > now
+        ]
+
+
+def pinned_to_primary(request, clock=time.time) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > clock()
+    except ValueError:
+        return False
+
+
+def open_read_session(request, router, primary_factory):
+    """A replica session for ``request``, or a primary one if none fits."""
+    if router is not None and not pinned_to_primary(request):
+        for index in router.candidates():
+            db = router.session_factories[index]()
+            try:
+                # Checks a connection out now, so a dead replica is found
+                # before the route runs
+                db.connection()
+            except DBAPIError as e:
+                db.close()
+                router.eject(index, e)
+                continue
+            return db
+    return primary_factory()
+
+
+async def open_async_read_session(request, router, primary_factory):
+    if router is not None and not pinned_to_primary(request):
+        for index in router.candidates():
+            db = router.session_factories[index]()
+            try:
+                await db.connection()
+            except DBAPIError as e:
+                await db.close()
+                router.eject(index, e)
+                continue
+            return db
+    return primary_factory()
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client to the primary for a while after it writes."""
+
+    def __init__(self, app, seconds: float):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in UNSAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+            ):
+                cookie = (
+                    f"{PRIMARY_COOKIE}={time.time() + self.seconds:.3f}; "
+                    f"Max-Age={math.ceil(self.seconds)}; Path=/; HttpOnly; "
+                    "SameSite=Lax"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", cookie.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
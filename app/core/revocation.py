@@ -0,0 +1,164 @@
+"""Refresh token revocation.
+
+Refresh tokens carry a ``jti``; revoking one records it in the
+revoked_tokens table and in every worker's in-memory RevocationStore, so a
+refresh only touches the database when the store is due to sync.
+
+The store groups revoked IDs into buckets by token expiry. A token can only
+be looked up in the bucket its own ``exp`` claim points at, and a whole
+bucket is dropped once every token in it has expired, so memory holds only
+revocations that still matter and eviction needs no per-entry bookkeeping.
+IDs that are UUIDs are kept as their 16 raw bytes.
+"""
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.config import REVOCATION_BUCKET_SECONDS, REVOCATION_SYNC_INTERVAL
+from app.core.logger import logger
+from app.models.revoked_token import RevokedToken
+
+# Rows are synced by id; re-read this many ids below the high-water mark
+# so a transaction that committed out of id order is still picked up
+SYNC_OVERLAP = 100
+
+
+def _compact(jti: str):
+    try:
+        return uuid.UUID(jti).bytes
+    except ValueError:
+        return jti
+
+
+def _timestamp(expires_at: datetime) -> float:
+    return expires_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationStore:
+    def __init__(
+        self, bucket_seconds: int, sync_interval: float, clock=time.time
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets: dict[int, set] = {}
+        self._last_id = 0
+        self._synced_at: float | None = None
+
+    def _bucket(self, exp: float) -> int:
+        return int(exp // self.bucket_seconds)
+
+    def _evict(self, now: float):
+        expired = [
+            b for b in self._buckets
+            if (b + 1) * self.bucket_seconds <= now
+        ]
+        for bucket in expired:
+            del self._buckets[bucket]
+
+    def add(self, jti: str, exp: float):
+        now = self.clock()
+        if exp <= now:
+            return
+        with self._lock:
+            self._evict(now)
+            self._buckets.setdefault(self._bucket(exp), set()).add(
+                _compact(jti)
+            )
+
+    def contains(self, jti: str, exp: float) -> bool:
+        with self._lock:
+            bucket = self._buckets.get(self._bucket(exp))
+            return bucket is not None and _compact(jti) in bucket
+
+    def _sync_due(self) -> bool:
+        return (
+            self._synced_at is None
+            or time.monotonic() - self._synced_at >= self.sync_interval
+        )
+
+    def _sync_query(self):
+        return (
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.id > self._last_id - SYNC_OVERLAP)
+            .where(RevokedToken.expires_at > datetime.utcnow())
+            .order_by(RevokedToken.id)
+        )
+
+    def _apply(self, rows):
+        for row in rows:
+            self.add(row.jti, _timestamp(row.expires_at))
+            self._last_id = max(self._last_id, row.id)
+        self._synced_at = time.monotonic()
+
+    def sync(self, db):
+        """Load revocations recorded by other workers."""
+        self._apply(db.execute(self._sync_query()).all())
+
+    async def sync_async(self, db):
+        self._apply((await db.execute(self._sync_query())).all())
+
+    def is_revoked(self, db, jti: str, exp: float) -> bool:
+        if self._sync_due():
+            self.sync(db)
+        return self.contains(jti, exp)
+
+    async def is_revoked_async(self, db, jti: str, exp: float) -> bool:
+        if self._sync_due():
+            await self.sync_async(db)
+        return self.contains(jti, exp)
+
+    @staticmethod
+    def _revoke_statements(db, jti: str, exp: float):
+        dialect = db.get_bind().dialect.name
+        dialect_insert = (
+            postgresql.insert if dialect == "postgresql" else sqlite.insert
+        )
+        expires_at = datetime.utcfromtimestamp(exp)
+        insert = dialect_insert(RevokedToken).values(
+            jti=jti, expires_at=expires_at
+        ).on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        # Revocations are rare; purging here keeps the table small
+        purge = delete(RevokedToken).where(
+            RevokedToken.expires_at <= datetime.utcnow()
+        )
+        return insert, purge
+
+    def revoke(self, db, jti: str, exp: float):
+        """Record the revocation and commit the caller's transaction."""
+        for statement in self._revoke_statements(db, jti, exp):
+            db.execute(statement)
+        db.commit()
+        self.add(jti, exp)
+        logger.info("Revoked refresh token {}", jti)
+
+    async def revoke_async(self, db, jti: str, exp: float):
+        for statement in self._revoke_statements(db, jti, exp):
+            await db.execute(statement)
+        await db.commit()
+        self.add(jti, exp)
+        logger.info("Revoked refresh token {}", jti)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "buckets": len(self._buckets),
+                "entries": sum(len(b) for b in self._buckets.values()),
+                "last_synced_id": self._last_id,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+        self._last_id = 0
+        self._synced_at = None
+
+
+revocation_store = RevocationStore(
+    REVOCATION_BUCKET_SECONDS, REVOCATION_SYNC_INTERVAL
+)
@@ -1,29 +1,138 @@
+import time
+
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
-from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ALGORITHM,
+    BCRYPT_ROUNDS,
+    SECRET_KEY,
+)
+from app.core.executor import cpu_executor
 from app.core.logger import logger
+from app.core.metrics import password_hash_seconds
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# needs_update() flags hashes whose cost differs from BCRYPT_ROUNDS
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS
+)
 
 
-def hash_password(password: str) -> str:
+# bcrypt runs on the CPU executor; these module-level functions are what
+# gets shipped to the worker processes.
+def _hash(password: str) -> str:
     # bcrypt has a 72-byte limit, truncate if necessary
-    logger.debug("Hashing password")
     return pwd_context.hash(password[:72])
 
 
-def verify_password(password: str, hashed: str) -> bool:
+def _verify(password: str, hashed: str) -> bool:
     # bcrypt has a 72-byte limit, truncate if necessary
-    logger.debug("Verifying password")
     return pwd_context.verify(password[:72], hashed)
 
 
+def _verify_and_update(password: str, hashed: str):
+    """Return ``(valid, new_hash)``; new_hash is set when the stored cost
+    differs from BCRYPT_ROUNDS and the password was correct."""
+    if not _verify(password, hashed):
+        return False, None
+    if pwd_context.needs_update(hashed):
+        return True, _hash(password)
+    return True, None
+
+
+def _timed(fn, *args):
+    # Measured in the worker so queueing for the executor isn't counted
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def _record(operation: str, timed):
+    result, seconds = timed
+    password_hash_seconds.observe(seconds, (operation,))
+    return result
+
+
+def hash_password(password: str) -> str:
+    logger.debug("Hashing password")
+    return _record("hash", cpu_executor.run(_timed, _hash, password))
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    logger.debug("Verifying password")
+    return _record(
+        "verify", cpu_executor.run(_timed, _verify, password, hashed)
+    )
+
+
+def verify_and_update_password(password: str, hashed: str):
+    """Verify ``password``; also return a rehash if its cost is outdated."""
+    logger.debug("Verifying password")
+    return _record(
+        "verify",
+        cpu_executor.run(_timed, _verify_and_update, password, hashed),
+    )
+
+
+async def hash_password_async(password: str) -> str:
+    logger.debug("Hashing password")
+    return _record(
+        "hash", await cpu_executor.run_async(_timed, _hash, password)
+    )
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    logger.debug("Verifying password")
+    return _record(
+        "verify",
+        await cpu_executor.run_async(_timed, _verify, password, hashed),
+    )
+
+
+async def verify_and_update_password_async(password: str, hashed: str):
+    logger.debug("Verifying password")
+    return _record(
+        "verify",
+        await cpu_executor.run_async(
+            _timed, _verify_and_update, password, hashed
+        ),
+    )
+
+
+def calibrate_rounds(
+    target_seconds: float, min_rounds: int = 4, max_rounds: int = 16
+) -> tuple[int, dict[int, float]]:
+    """Pick the highest cost whose hash time stays within ``target_seconds``.
+
+    Each extra round doubles the work, so rounds are timed upwards from
+    ``min_rounds`` until one goes over the target. Returns the chosen
+    rounds and the measured seconds per rounds value (best of 3).
+    """
+    timings = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            context.hash("calibration-password")
+            best = min(best, time.perf_counter() - started)
+        timings[rounds] = best
+        if best > target_seconds:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
 def create_access_token(data: dict):
-    logger.debug(f"Creating access token for user ID: {data.get('sub')}")
+    logger.debug("Creating access token for user ID: {}", data.get("sub"))
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # A caller-supplied exp wins, e.g. the 7-day lifetime of refresh tokens
+    to_encode.setdefault(
+        "exp",
+        datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
     token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     logger.debug("Access token created successfully")
     return token
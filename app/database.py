@@ -1,48 +1,458 @@
-from sqlalchemy import create_engine
+"""Engines and sessions, built on first use.
+
+Importing this module opens nothing: the engines (and their session
+factories) are created the first time a request, worker or CLI asks for
+one, so imports in tests and tools stay cheap. Schema creation and pool
+warm-up run from the application's lifespan (see prepare_schema and
+warm_pool). Read-only routes use get_read_db, which can be served by
+DATABASE_REPLICA_URLS (see app/core/replicas.py). Sync routes get a
+LazySession, which opens the real session on first use.
+"""
+import os
+import threading
+from contextlib import AsyncExitStack
+
+from anyio import CapacityLimiter
+from anyio.lowlevel import RunVar
+from anyio.to_thread import run_sync
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from fastapi import Request
 from app.core.logger import logger
-from app.core.config import DATABASE_URL, ENVIRONMENT
+from app.core.metrics import TimedAsyncQueuePool, TimedQueuePool
+from app.core.query_stats import instrument_engine
+from app.core.replicas import (
+    ReplicaRouter,
+    open_async_read_session,
+    open_read_session,
+)
+from app.core.config import (
+    DATABASE_REPLICA_URLS,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_SCHEMA_MODE,
+    ENVIRONMENT,
+    REPLICA_EJECT_SECONDS,
+    SQL_INSTRUMENTATION_ENABLED,
+    get_async_database_url,
+)
 
 load_dotenv()
 
-logger.info(f"Environment: {ENVIRONMENT}")
-logger.info(f"Initializing database connection: {DATABASE_URL}")
-
-# Create engine with different settings based on environment
-if ENVIRONMENT == "production":
-    # Production: Connection pooling for AWS RDS
-    engine = create_engine(
-        DATABASE_URL,
-        pool_size=20,
-        max_overflow=40,
-        pool_pre_ping=True,  # Verify connections before using them
-        pool_recycle=3600,  # Recycle connections every hour
-        echo=False,
-    )
-    logger.info("Using production database connection pool configuration")
-else:
-    # Development/Staging: Standard configuration
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args=(
-            {"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-        ),
-        echo=False,
+Base = declarative_base()
+
+_lock = threading.Lock()
+_engine = None
+_session_factory = None
+_async_engine = None
+_async_session_factory = None
+_replica_engines = None
+_replica_router = None
+_async_replica_engines = None
+_async_replica_router = None
+
+
+def pool_options(url: str, pool_class) -> dict:
+    """Use a pool that reports checkout wait times to /metrics, sized to
+    this worker's share of DB_MAX_CONNECTIONS in every environment."""
+    # In-memory SQLite keeps its per-thread pool
+    if ":memory:" in url:
+        return {}
+    return {
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+
+def _display_url(url: str) -> str:
+    return make_url(url).render_as_string(hide_password=True)
+
+
+def _build_engine(url: str = DATABASE_URL, pool_pre_ping: bool = False):
+    logger.info("Initializing database connection: {}", _display_url(url))
+
+    # Create engine with different settings based on environment
+    if ENVIRONMENT == "production":
+        # Production: Connection pooling for AWS RDS
+        engine = create_engine(
+            url,
+            pool_pre_ping=True,  # Verify connections before using them
+            pool_recycle=3600,  # Recycle connections every hour
+            echo=False,
+            **pool_options(url, TimedQueuePool),
+        )
+        logger.info("Using production database connection pool configuration")
+    else:
+        # Development/Staging: Standard configuration
+        engine = create_engine(
+            url,
+            connect_args=(
+                {"check_same_thread": False} if "sqlite" in url else {}
+            ),
+            pool_pre_ping=pool_pre_ping,
+            echo=False,
+            **pool_options(url, TimedQueuePool),
+        )
+        logger.info("Using development/staging database configuration")
+
+    if SQL_INSTRUMENTATION_ENABLED:
+        instrument_engine(engine)
+    return engine
+
+
+def _build_async_engine(
+    url: str = DATABASE_URL, pool_pre_ping: bool = False
+):
+    async_url = get_async_database_url(url)
+    if ENVIRONMENT == "production":
+        async_engine = create_async_engine(
+            async_url,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            echo=False,
+            **pool_options(async_url, TimedAsyncQueuePool),
+        )
+    else:
+        async_engine = create_async_engine(
+            async_url,
+            pool_pre_ping=pool_pre_ping,
+            echo=False,
+            **pool_options(async_url, TimedAsyncQueuePool),
+        )
+    if SQL_INSTRUMENTATION_ENABLED:
+        instrument_engine(async_engine.sync_engine)
+    logger.info("Async database engine created: {}", _display_url(async_url))
+    return async_engine
+
+
+def get_engine():
+    global _engine, _session_factory
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                logger.info("Environment: {}", ENVIRONMENT)
+                engine = _build_engine()
+                # Write paths build their responses from the objects they
+                # just committed; don't reload them with another SELECT
+                _session_factory = sessionmaker(
+                    autocommit=False,
+                    autoflush=False,
+                    expire_on_commit=False,
+                    bind=engine,
+                )
+                _engine = engine
+    return _engine
+
+
+def get_sessionmaker():
+    if _session_factory is None:
+        get_engine()
+    return _session_factory
+
+
+def get_async_engine():
+    """The AsyncEngine behind DB_MODE=async routes."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                async_engine = _build_async_engine()
+                _async_session_factory = async_sessionmaker(
+                    bind=async_engine, autoflush=False,
+                    expire_on_commit=False,
+                )
+                _async_engine = async_engine
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    if _async_session_factory is None:
+        get_async_engine()
+    return _async_session_factory
+
+
+def get_replica_router():
+    """Router over the sync replica engines; None without replicas."""
+    global _replica_engines, _replica_router
+    if DATABASE_REPLICA_URLS and _replica_router is None:
+        with _lock:
+            if _replica_router is None:
+                # Pre-ping so a dead replica fails at checkout and is
+                # ejected, instead of failing the route's first query
+                _replica_engines = [
+                    _build_engine(url, pool_pre_ping=True)
+                    for url in DATABASE_REPLICA_URLS
+                ]
+                _replica_router = ReplicaRouter(
+                    [
+                        sessionmaker(
+                            autocommit=False, autoflush=False, bind=engine
+                        )
+                        for engine in _replica_engines
+                    ],
+                    REPLICA_EJECT_SECONDS,
+                )
+    return _replica_router
+
+
+def get_async_replica_router():
+    global _async_replica_engines, _async_replica_router
+    if DATABASE_REPLICA_URLS and _async_replica_router is None:
+        with _lock:
+            if _async_replica_router is None:
+                _async_replica_engines = [
+                    _build_async_engine(url, pool_pre_ping=True)
+                    for url in DATABASE_REPLICA_URLS
+                ]
+                _async_replica_router = ReplicaRouter(
+                    [
+                        async_sessionmaker(
+                            bind=engine, autoflush=False,
+                            expire_on_commit=False,
+                        )
+                        for engine in _async_replica_engines
+                    ],
+                    REPLICA_EJECT_SECONDS,
+                )
+    return _async_replica_router
+
+
+def created_engines() -> dict:
+    """Engines built so far, as ``{"sync"|"async"|..: Engine}``."""
+    engines = {}
+    if _engine is not None:
+        engines["sync"] = _engine
+    if _async_engine is not None:
+        engines["async"] = _async_engine.sync_engine
+    for index, engine in enumerate(_replica_engines or []):
+        engines[f"replica{index}"] = engine
+    for index, engine in enumerate(_async_replica_engines or []):
+        engines[f"async-replica{index}"] = engine.sync_engine
+    return engines
+
+
+def dispose_engines():
+    """Close every pooled connection, e.g. before forking workers."""
+    for engine in created_engines().values():
+        engine.dispose()
+
+
+def _forget_inherited_connections():
+    # A forked worker must not use (or close) the parent's sockets; give
+    # every engine a fresh pool and let the parent keep its connections
+    for engine in created_engines().values():
+        engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_forget_inherited_connections)
+
+
+def __getattr__(name):
+    # Module attributes from before the engines were lazy
+    lazy = {
+        "engine": get_engine,
+        "SessionLocal": get_sessionmaker,
+        "async_engine": get_async_engine,
+        "AsyncSessionLocal": get_async_sessionmaker,
+    }
+    if name in lazy:
+        return lazy[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _import_models():
+    # Registers every table on Base.metadata
+    from app.models import (  # noqa: F401
+        auth_user,
+        email_outbox,
+        idempotency_key,
+        rate_limit_counter,
+        revoked_token,
+        subject,
+        table_version,
     )
-    logger.info("Using development/staging database configuration")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-logger.debug("SQLAlchemy SessionLocal created")
 
-Base = declarative_base()
+def prepare_schema(mode: str = DB_SCHEMA_MODE, engine=None):
+    """
+    Apply DB_SCHEMA_MODE to the database.
+
+    - skip: issue no DDL at all (tables are managed outside the app)
+    - migrate: create missing tables (existing ones are left alone)
+    - check: raise RuntimeError if any table is missing
+    """
+    if mode == "skip":
+        return
+    _import_models()
+    engine = engine or get_engine()
+    if mode == "migrate":
+        Base.metadata.create_all(bind=engine)
+        # Databases created before the search index or the outbox claim
+        # columns existed
+        from app.models.subject import Subject, create_search_index
 
+        from app.models.email_outbox import add_claim_columns
 
-def get_db():
-    logger.debug("Creating database session")
-    db = SessionLocal()
+        with engine.begin() as connection:
+            create_search_index(Subject.__table__, connection)
+            add_claim_columns(connection)
+        logger.info("Database tables created")
+        return
+    existing = set(inspect(engine).get_table_names())
+    missing = sorted(set(Base.metadata.tables) - existing)
+    if missing:
+        raise RuntimeError(
+            f"Database is missing tables: {', '.join(missing)}; "
+            "run with DB_SCHEMA_MODE=migrate"
+        )
+    logger.info("Database schema check passed")
+
+
+def _warmup_size(engine, connections: int) -> int:
+    # Only a QueuePool keeps connections around to be reused
+    if not isinstance(engine.pool, QueuePool):
+        return 0
+    return max(0, min(connections, engine.pool.size()))
+
+
+def warm_pool(engine, connections: int) -> int:
+    """Open up to ``connections`` pooled connections ahead of traffic."""
+    opened = []
+    try:
+        for _ in range(_warmup_size(engine, connections)):
+            opened.append(engine.connect())
+    finally:
+        # Back into the pool, still open
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+async def warm_async_pool(async_engine, connections: int) -> int:
+    count = _warmup_size(async_engine.sync_engine, connections)
+    async with AsyncExitStack() as stack:
+        for _ in range(count):
+            await stack.enter_async_context(async_engine.connect())
+    return count
+
+
+class LazySession:
+    """Stands in for a Session until a route first uses it.
+
+    The session (and, on its first query, a pooled connection) is only
+    created when an attribute is accessed, so requests that fail
+    validation, are rejected early or are answered from the cache never
+    touch the pool. ``bind`` answers get_bind() without opening, which is
+    all the table-version cache check needs.
+    """
+
+    def __init__(self, open_session, bind=None):
+        self._open_session = open_session
+        self._bind = bind
+        self._session = None
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def _get(self):
+        if self._session is None:
+            logger.debug("Opening database session")
+            self._session = self._open_session()
+        return self._session
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def get_bind(self, *args, **kwargs):
+        if self._session is None and self._bind is not None and not (
+            args or kwargs
+        ):
+            return self._bind
+        return self._get().get_bind(*args, **kwargs)
+
+    def close(self):
+        if self._session is not None:
+            logger.debug("Closing database session")
+            self._session.close()
+            self._session = None
+
+
+# Threads for closing sessions, separate from the limiter that runs sync
+# routes: a session being closed holds a connection, so it must not wait
+# behind requests queued for a route thread. One per pooled connection.
+_release_limiter: RunVar[CapacityLimiter] = RunVar("db_release_limiter")
+
+
+def _get_release_limiter() -> CapacityLimiter:
+    try:
+        return _release_limiter.get()
+    except LookupError:
+        limiter = CapacityLimiter(DB_POOL_SIZE + DB_MAX_OVERFLOW)
+        _release_limiter.set(limiter)
+        return limiter
+
+
+async def close_lazy_session(db: LazySession):
+    # Closing returns the connection (a ROLLBACK round-trip), so it runs
+    # on a thread; an unused session has nothing to close
+    if db.opened:
+        await run_sync(db.close, limiter=_get_release_limiter())
+
+
+# The session dependencies are async so that creating and closing an unused
+# session costs no thread pool round-trip. Routes declare them with
+# scope="function", which closes the session when the route function
+# returns instead of after the response has been sent.
+async def get_db():
+    factory = get_sessionmaker()
+    db = LazySession(factory, bind=factory.kw["bind"])
+    try:
+        yield db
+    finally:
+        await close_lazy_session(db)
+
+
+async def get_async_db():
+    logger.debug("Creating async database session")
+    async with get_async_sessionmaker()() as db:
+        yield db
+        logger.debug("Closing async database session")
+
+
+async def get_read_db(request: Request):
+    """Session for read-only routes: a replica when one is usable."""
+    router = get_replica_router()
+    factory = get_sessionmaker()
+    if router is None:
+        db = LazySession(factory, bind=factory.kw["bind"])
+    else:
+        # Which database serves the read is only known once a replica
+        # has handed out a connection
+        db = LazySession(
+            lambda: open_read_session(request, router, factory)
+        )
+    try:
+        yield db
+    finally:
+        await close_lazy_session(db)
+
+
+async def get_async_read_db(request: Request):
+    logger.debug("Creating async read database session")
+    db = await open_async_read_session(
+        request, get_async_replica_router(), get_async_sessionmaker()
+    )
     try:
         yield db
     finally:
-        logger.debug("Closing database session")
-        db.close()
+        logger.debug("Closing async read database session")
+        await db.close()
@@ -1,19 +1,132 @@
-from fastapi import FastAPI
-from app.database import engine, Base
-from app.routers.subject_router import router as subject_router
-from app.routers.auth_router import router as auth_router
+import time
+from contextlib import asynccontextmanager
+
+from anyio.to_thread import current_default_thread_limiter, run_sync
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app import IMPORT_STARTED
+from app.database import (
+    get_async_engine,
+    get_engine,
+    get_sessionmaker,
+    prepare_schema,
+    warm_async_pool,
+    warm_pool,
+)
+from app.core.config import (
+    CONCURRENCY_LIMIT_ENABLED,
+    DATABASE_REPLICA_URLS,
+    DB_MODE,
+    DB_POOL_WARMUP,
+    DB_SCHEMA_MODE,
+    EMAIL_OUTBOX_WORKER,
+    IDEMPOTENCY_ENABLED,
+    METRICS_ENABLED,
+    READ_YOUR_WRITES_SECONDS,
+    SQL_INSTRUMENTATION_ENABLED,
+    THREADPOOL_THREADS,
+    USE_ASYNC_DB,
+)
+from app.core.concurrency import (
+    ConcurrencyLimitMiddleware,
+    concurrency_limiters,
+)
+from app.core.executor import ExecutorSaturatedError
+from app.core.idempotency import IdempotencyMiddleware, idempotency_store
 from app.core.logger import logger
+from app.core.metrics import MetricsMiddleware, startup_seconds
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.serialization import FastJSONResponse
+from app.core.replicas import ReadYourWritesMiddleware
+from app.routers.export_router import router as export_router
+from app.routers.metrics_router import router as metrics_router
+from app.utils.email_outbox import OutboxWorker
 
-Base.metadata.create_all(bind=engine)
+if USE_ASYNC_DB:
+    from app.routers.async_subject_router import router as subject_router
+    from app.routers.async_auth_router import router as auth_router
+else:
+    from app.routers.subject_router import router as subject_router
+    from app.routers.auth_router import router as auth_router
 
-app = FastAPI()
 
-app.include_router(subject_router)
-app.include_router(auth_router)
+async def warm_up_database() -> int:
+    if DB_POOL_WARMUP <= 0:
+        return 0
+    if USE_ASYNC_DB:
+        return await warm_async_pool(get_async_engine(), DB_POOL_WARMUP)
+    return await run_sync(warm_pool, get_engine(), DB_POOL_WARMUP)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Threads for sync routes (and the DB sessions they hold)
+    current_default_thread_limiter().total_tokens = THREADPOOL_THREADS
+    # app.server prepares the schema once before forking its workers
+    schema_mode = "done by server"
+    if not getattr(app.state, "schema_prepared", False):
+        schema_mode = DB_SCHEMA_MODE
+        await run_sync(prepare_schema)
+    schema_done = time.perf_counter()
+    warmed = await warm_up_database()
+    ready = time.perf_counter()
+    startup_seconds.update(
+        {
+            "import": IMPORTED - IMPORT_STARTED,
+            "schema": schema_done - started,
+            "pool_warmup": ready - schema_done,
+            "total": ready - IMPORT_STARTED,
+        }
+    )
+    logger.info(
+        "FastAPI application startup completed in {:.0f} ms (import "
+        "{:.0f} ms, schema {} {:.0f} ms, pool warm-up {} connections "
+        "{:.0f} ms)",
+        startup_seconds["total"] * 1000, startup_seconds["import"] * 1000,
+        schema_mode, startup_seconds["schema"] * 1000, warmed,
+        startup_seconds["pool_warmup"] * 1000,
+    )
+
+    outbox_worker = None
+    # app.server only lets its first worker run the sender
+    if EMAIL_OUTBOX_WORKER and getattr(app.state, "outbox_worker", True):
+        outbox_worker = OutboxWorker(get_sessionmaker())
+        outbox_worker.start()
+    yield
+    if outbox_worker is not None:
+        outbox_worker.stop()
+    logger.info("FastAPI application shutdown")
+    # Flush records still queued for the background log writer
+    await logger.complete()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
 
-logger.info("FastAPI application initialized")
-logger.info("Database tables created")
-logger.info("Routers registered: subjects, auth")
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(
+    request: Request, exc: ExecutorSaturatedError
+):
+    logger.warning("Rejecting {}: {}", request.url.path, exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    logger.warning(
+        "Rejecting {}: no database connection ({})", request.url.path, exc
+    )
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
 
 
 @app.get("/")
@@ -22,11 +135,33 @@ async def read_root():
     return {"Hello": "World"}
 
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("FastAPI application startup completed")
+app.include_router(subject_router)
+app.include_router(auth_router)
+app.include_router(export_router)
 
+# Innermost, so replays still get the read-your-writes cookie and are
+# timed by the metrics. Duplicates waiting for their original give their
+# concurrency slot back meanwhile.
+if IDEMPOTENCY_ENABLED:
+    app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("FastAPI application shutdown")
+if DATABASE_REPLICA_URLS:
+    app.add_middleware(
+        ReadYourWritesMiddleware, seconds=READ_YOUR_WRITES_SECONDS
+    )
+
+if SQL_INSTRUMENTATION_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+
+# Inside the metrics middleware, so shed requests show up as 503s
+if CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(
+        ConcurrencyLimitMiddleware, limiters=concurrency_limiters
+    )
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+IMPORTED = time.perf_counter()
+logger.info("FastAPI application initialized (DB_MODE={})", DB_MODE)
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text, inspect, text
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class EmailOutbox(Base):
+    """Outgoing email, written in the same transaction as the change that
+    triggers it and delivered later by the outbox worker."""
+
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    # Messages sharing a key while pending are only sent once
+    dedup_key = Column(String, index=True, nullable=True)
+    status = Column(String(16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # Naive UTC, like the rest of the token/expiry handling
+    next_attempt_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, index=True
+    )
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+    # Set while a worker is sending the message
+    claimed_at = Column(DateTime, nullable=True)
+    claimed_by = Column(String(255), nullable=True)
+
+
+CLAIM_COLUMNS = ("claimed_at", "claimed_by")
+
+
+def add_claim_columns(connection):
+    """Add the claim columns to an outbox table created before them."""
+    table = EmailOutbox.__table__
+    existing = {
+        column["name"]
+        for column in inspect(connection).get_columns(table.name)
+    }
+    for name in CLAIM_COLUMNS:
+        if name in existing:
+            continue
+        column_type = table.c[name].type.compile(connection.dialect)
+        connection.execute(text(
+            f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"
+        ))
@@ -0,0 +1,23 @@
+from sqlalchemy import JSON, Column, Float, Integer, LargeBinary, String
+from ..database import Base
+
+
+class IdempotencyKey(Base):
+    """Responses stored per Idempotency-Key, shared by all API workers.
+
+    A row without a status is a request still in flight; its expiry is a
+    lock timeout rather than the replay TTL.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    # "<path>:<Idempotency-Key header>"
+    key = Column(String(512), primary_key=True)
+    # sha256 of the request the key was first used with
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    # [[name, value], ...] as sent by the original response
+    headers = Column(JSON, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    # Unix timestamp
+    expires_at = Column(Float, nullable=False, index=True)
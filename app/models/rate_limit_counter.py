@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String
+from ..database import Base
+
+
+class RateLimitCounter(Base):
+    """Hits per key and fixed window, shared by all API workers."""
+
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String(255), primary_key=True)
+    # Window index: int(timestamp // window_seconds)
+    window = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
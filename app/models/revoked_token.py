@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from ..database import Base
+
+
+class RevokedToken(Base):
+    """Refresh tokens revoked before their expiry, keyed by ``jti``.
+
+    Rows are only needed until the token would have expired anyway and are
+    purged after that.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    # Monotonic, so workers can sync only the rows they haven't seen
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(64), unique=True, nullable=False)
+    # Naive UTC expiry of the revoked token
+    expires_at = Column(DateTime, nullable=False, index=True)
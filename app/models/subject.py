@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, event, text
 from sqlalchemy.sql import func
 from ..database import Base
 
@@ -10,3 +10,68 @@ class Subject(Base):
     name = Column(String(100), unique=True, nullable=False)
     description = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Search index for GET /subjects/search. Statements are idempotent so they
+# can also be applied to a database created before the index existed.
+SEARCH_INDEX_DDL = {
+    # Trigram GIN indexes serve ILIKE '%q%' on both columns
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_subjects_name_trgm "
+        "ON subjects USING gin (name gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_subjects_description_trgm "
+        "ON subjects USING gin (description gin_trgm_ops)",
+        # Case-insensitive name prefix range scans
+        'CREATE INDEX IF NOT EXISTS ix_subjects_name_lower '
+        'ON subjects ((lower(name)) COLLATE "C")',
+    ],
+    # External-content FTS5 table with the trigram tokenizer (substring
+    # matches, case-insensitive), kept in sync by triggers so that every
+    # write path - single, bulk and raw inserts - updates it
+    "sqlite": [
+        # Case-insensitive name prefix range scans
+        "CREATE INDEX IF NOT EXISTS ix_subjects_name_nocase "
+        "ON subjects (name COLLATE NOCASE)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS subjects_fts USING fts5("
+        "name, description, content='subjects', content_rowid='id', "
+        "tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS subjects_fts_insert "
+        "AFTER INSERT ON subjects BEGIN "
+        "INSERT INTO subjects_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS subjects_fts_delete "
+        "AFTER DELETE ON subjects BEGIN "
+        "INSERT INTO subjects_fts(subjects_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS subjects_fts_update "
+        "AFTER UPDATE ON subjects BEGIN "
+        "INSERT INTO subjects_fts(subjects_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO subjects_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END",
+    ],
+}
+
+
+def create_search_index(target, connection, **kw):
+    dialect = connection.dialect.name
+    rebuild = dialect == "sqlite" and connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = 'subjects_fts'")
+    ).first() is None
+    for statement in SEARCH_INDEX_DDL.get(dialect, []):
+        connection.execute(text(statement))
+    if rebuild:
+        # Index rows that were inserted before the FTS table existed
+        connection.execute(
+            text("INSERT INTO subjects_fts(subjects_fts) VALUES ('rebuild')")
+        )
+
+
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS subjects_fts"))
+
+
+event.listen(Subject.__table__, "after_create", create_search_index)
+event.listen(Subject.__table__, "before_drop", drop_search_index)
@@ -0,0 +1,19 @@
+from sqlalchemy import DDL, Column, Integer, String, event
+from ..database import Base
+
+
+class TableVersion(Base):
+    """Change counter per table, used to invalidate read caches."""
+
+    __tablename__ = "table_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Seed the counters so bumps are always a single UPDATE
+event.listen(
+    TableVersion.__table__,
+    "after_create",
+    DDL("INSERT INTO table_versions (name, version) VALUES ('subjects', 0)"),
+)
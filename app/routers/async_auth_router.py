@@ -0,0 +1,127 @@
+from app.schema.user_schema import (
+    RefreshTokenRequest,
+    UserCreate,
+    UserLogin,
+)
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.controllers.async_auth_controller import (
+    create_user,
+    authenticate_user,
+    refresh_access_token,
+    revoke_refresh_token,
+    activate_user_email,
+    verify_user_email_request,
+)
+from app.core.auth import Principal, get_current_user
+from app.core.logger import logger
+from app.core.rate_limit import enforce_auth_rate_limits, rate_limiter
+from starlette.concurrency import run_in_threadpool
+
+router = APIRouter(prefix="/auth", tags=["Authentication"])
+
+
+async def _enforce_rate_limits(request: Request, action: str, email: str):
+    if rate_limiter.storage.blocking:
+        await run_in_threadpool(
+            enforce_auth_rate_limits, request, action, email
+        )
+    else:
+        enforce_auth_rate_limits(request, action, email)
+
+
+@router.post("/register", status_code=201)
+async def register_user(
+    user: UserCreate, request: Request,
+    db: AsyncSession = Depends(get_async_db, scope="function"),
+):
+    logger.info("User registration attempt: {}", user.email)
+    await _enforce_rate_limits(request, "register", user.email)
+    try:
+        result = await create_user(user, db)
+        logger.info("User registered successfully: {}", user.email)
+        return result
+    except Exception as e:
+        logger.error("User registration failed for {}: {}", user.email, e)
+        raise
+
+
+@router.post("/login", status_code=200)
+async def login_user(
+    user: UserLogin, request: Request,
+    db: AsyncSession = Depends(get_async_db, scope="function"),
+):
+    logger.info("User login attempt: {}", user.email)
+    await _enforce_rate_limits(request, "login", user.email)
+    try:
+        result = await authenticate_user(user, db)
+        logger.info("User logged in successfully: {}", user.email)
+        return result
+    except Exception as e:
+        logger.warning("User login failed for {}: {}", user.email, e)
+        raise
+
+
+@router.post("/refresh", status_code=200)
+async def refresh_token(
+    body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_async_db, scope="function"),
+):
+    logger.info("Token refresh attempt")
+    try:
+        result = await refresh_access_token(body.refresh_token, db)
+        logger.info("Access token refreshed")
+        return result
+    except Exception as e:
+        logger.warning("Token refresh failed: {}", e)
+        raise
+
+
+@router.post("/logout", status_code=200)
+async def logout(
+    body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_async_db, scope="function"),
+):
+    logger.info("Logout attempt")
+    try:
+        result = await revoke_refresh_token(body.refresh_token, db)
+        logger.info("Refresh token revoked on logout")
+        return result
+    except Exception as e:
+        logger.warning("Logout failed: {}", e)
+        raise
+
+
+@router.post("/activate", status_code=200)
+async def request_to_activate_user(
+    email: str, db: AsyncSession = Depends(get_async_db, scope="function")
+):
+    logger.info("User activation request: {}", email)
+    try:
+        result = await verify_user_email_request(email, db)
+        logger.info("Activation email sent: {}", email)
+        return result
+    except Exception as e:
+        logger.error("Activation request failed for {}: {}", email, e)
+        raise
+
+
+@router.get("/verify-email", status_code=200)
+async def verify_email(
+    token: str,
+    db: AsyncSession = Depends(get_async_db, scope="function"),
+):
+    logger.info("Email verification token received")
+    try:
+        result = await activate_user_email(token, db)
+        logger.info("Email verified successfully")
+        return result
+    except Exception as e:
+        logger.warning("Email verification failed: {}", e)
+        raise
+
+
+@router.get("/me", status_code=200)
+async def read_current_user(principal: Principal = Depends(get_current_user)):
+    return {"user_id": principal.user_id, "role": principal.role}
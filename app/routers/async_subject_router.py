@@ -0,0 +1,169 @@
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.controllers import async_subject_controller as subject_controller
+from app.controllers.subject_controller import parse_fields, subject_row
+from app.core.cache import cached_json_response
+from app.core.config import (
+    SUBJECTS_BULK_MAX_ITEMS,
+    SUBJECTS_MAX_PAGE_SIZE,
+    SUBJECTS_PAGE_SIZE,
+    SUBJECT_SEARCH_MAX_CANDIDATES,
+    SUBJECT_SEARCH_MAX_PAGE_SIZE,
+    SUBJECT_SEARCH_PAGE_SIZE,
+)
+from app.database import get_async_db, get_async_read_db
+from app.schema import subject_schema as schema
+from app.core.logger import logger
+from app.core.serialization import FastJSONResponse
+
+router = APIRouter(prefix="/subjects", tags=["Subjects"])
+
+
+@router.post("/", response_model=schema.SubjectResponse, status_code=201)
+async def create_subject(
+    subject: schema.SubjectCreate,
+    db: AsyncSession = Depends(get_async_db, scope="function"),
+):
+    logger.info("Creating subject: {}", subject.name)
+    try:
+        result = await subject_controller.create_subject(db, subject)
+        logger.info("Subject created successfully with ID: {}", result.id)
+        return FastJSONResponse(subject_row(result), status_code=201)
+    except Exception as e:
+        logger.error("Error creating subject: {}", e)
+        raise
+
+
+@router.post(
+    "/bulk", response_model=schema.SubjectBulkResponse, status_code=201
+)
+async def create_subjects_bulk(
+    subjects: list[schema.SubjectCreate] = Body(
+        ..., min_length=1, max_length=SUBJECTS_BULK_MAX_ITEMS
+    ),
+    db: AsyncSession = Depends(get_async_db, scope="function"),
+):
+    logger.info("Bulk creating {} subjects", len(subjects))
+    try:
+        result = await subject_controller.create_subjects_bulk(db, subjects)
+        logger.info(
+            "Bulk create: {} created, {} conflicts",
+            len(result["created"]), len(result["conflicts"])
+        )
+        # Plain RETURNING rows; skip revalidating them one by one
+        return FastJSONResponse(result, status_code=201)
+    except Exception as e:
+        logger.error("Error bulk creating subjects: {}", e)
+        raise
+
+
+@router.post(
+    "/bulk-delete", response_model=schema.SubjectBulkDeleteResponse
+)
+async def delete_subjects_bulk(
+    request: schema.SubjectBulkDelete,
+    db: AsyncSession = Depends(get_async_db, scope="function"),
+):
+    logger.info(
+        "Bulk deleting subjects: {} ids, filter {}",
+        len(request.ids or []), request.filter
+    )
+    try:
+        result = await subject_controller.delete_subjects_bulk(db, request)
+        logger.info(
+            "Bulk delete: {} deleted, {} not found",
+            len(result["deleted"]), len(result["not_found"])
+        )
+        return FastJSONResponse(result)
+    except Exception as e:
+        logger.error("Error bulk deleting subjects: {}", e)
+        raise
+
+
+@router.get(
+    "/",
+    response_model=list[schema.SubjectListItem],
+    response_model_exclude_unset=True,
+)
+async def list_subjects(
+    request: Request,
+    limit: int = Query(SUBJECTS_PAGE_SIZE, ge=1, le=SUBJECTS_MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Opaque cursor"),
+    fields: str | None = Query(None, description="e.g. id,name"),
+    db: AsyncSession = Depends(get_async_read_db, scope="function"),
+):
+    logger.debug("Fetching subjects page: limit={}, after={}", limit, after)
+    try:
+        projection = parse_fields(fields)
+        page = await subject_controller.get_subjects(
+            db, limit, after, projection
+        )
+    except ValueError as e:
+        logger.warning("Invalid subjects page request: {}", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error listing subjects: {}", e)
+        raise
+
+    total, is_estimate = await subject_controller.count_subjects(db)
+    headers = {"X-Total-Count": str(total)}
+    if is_estimate:
+        headers["X-Total-Count-Estimated"] = "true"
+    if page.meta["next_cursor"]:
+        headers["X-Next-Cursor"] = page.meta["next_cursor"]
+    logger.info("Retrieved {} subjects", len(page.payload))
+    return cached_json_response(request, page, headers)
+
+
+@router.get("/search", response_model=list[schema.SubjectResponse])
+async def search_subjects(
+    request: Request,
+    q: str = Query(
+        ..., min_length=1, max_length=100,
+        description=(
+            "Matched against name and description; 1-2 characters "
+            "match name prefixes only"
+        ),
+    ),
+    limit: int = Query(
+        SUBJECT_SEARCH_PAGE_SIZE, ge=1, le=SUBJECT_SEARCH_MAX_PAGE_SIZE
+    ),
+    offset: int = Query(0, ge=0, le=SUBJECT_SEARCH_MAX_CANDIDATES),
+    db: AsyncSession = Depends(get_async_read_db, scope="function"),
+):
+    logger.debug("Searching subjects: q={!r}, offset={}", q, offset)
+    results = await subject_controller.search_subjects(db, q, limit, offset)
+    headers = {}
+    if results.meta["next_offset"] is not None:
+        headers["X-Next-Offset"] = str(results.meta["next_offset"])
+    logger.info("Search for {!r} returned {} subjects", q,
+                len(results.payload))
+    return cached_json_response(request, results, headers)
+
+
+@router.get("/{subject_id}", response_model=schema.SubjectResponse)
+async def get_subject(
+    subject_id: int, request: Request,
+    db: AsyncSession = Depends(get_async_read_db, scope="function"),
+):
+    logger.debug("Fetching subject with ID: {}", subject_id)
+    subject = await subject_controller.get_subject(db, subject_id)
+    if subject.payload is None:
+        logger.warning("Subject with ID {} not found", subject_id)
+        raise HTTPException(status_code=404, detail="Subject not found")
+    logger.info("Retrieved subject with ID: {}", subject_id)
+    return cached_json_response(request, subject)
+
+
+@router.delete("/{subject_id}")
+async def delete_subject(
+    subject_id: int, db: AsyncSession = Depends(get_async_db, scope="function")
+):
+    logger.info("Deleting subject with ID: {}", subject_id)
+    subject = await subject_controller.delete_subject(db, subject_id)
+    if not subject:
+        logger.warning("Subject with ID {} not found for deletion", subject_id)
+        raise HTTPException(status_code=404, detail="Subject not found")
+    logger.info("Subject with ID {} deleted successfully", subject_id)
+    return {"message": "Deleted successfully"}
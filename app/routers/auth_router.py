@@ -1,61 +1,115 @@
-from app.schema.user_schema import UserCreate, UserLogin
-from fastapi import APIRouter, Depends
+from app.schema.user_schema import (
+    RefreshTokenRequest,
+    UserCreate,
+    UserLogin,
+)
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.controllers.auth_controller import (
     create_user,
     authenticate_user,
+    refresh_access_token,
+    revoke_refresh_token,
     activate_user_email,
     verify_user_email_request,
 )
+from app.core.auth import Principal, get_current_user
 from app.core.logger import logger
+from app.core.rate_limit import enforce_auth_rate_limits
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register", status_code=201)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    logger.info(f"User registration attempt: {user.email}")
+def register_user(
+    user: UserCreate,
+    request: Request,
+    db: Session = Depends(get_db, scope="function"),
+):
+    logger.info("User registration attempt: {}", user.email)
+    enforce_auth_rate_limits(request, "register", user.email)
     try:
         result = create_user(user, db)
-        logger.info(f"User registered successfully: {user.email}")
+        logger.info("User registered successfully: {}", user.email)
         return result
     except Exception as e:
-        logger.error(f"User registration failed for {user.email}: {str(e)}")
+        logger.error("User registration failed for {}: {}", user.email, e)
         raise
 
 
 @router.post("/login", status_code=200)
-def login_user(user: UserLogin, db: Session = Depends(get_db)):
-    logger.info(f"User login attempt: {user.email}")
+def login_user(
+    user: UserLogin,
+    request: Request,
+    db: Session = Depends(get_db, scope="function"),
+):
+    logger.info("User login attempt: {}", user.email)
+    enforce_auth_rate_limits(request, "login", user.email)
     try:
         result = authenticate_user(user, db)
-        logger.info(f"User logged in successfully: {user.email}")
+        logger.info("User logged in successfully: {}", user.email)
+        return result
+    except Exception as e:
+        logger.warning("User login failed for {}: {}", user.email, e)
+        raise
+
+
+@router.post("/refresh", status_code=200)
+def refresh_token(
+    body: RefreshTokenRequest, db: Session = Depends(get_db, scope="function")
+):
+    logger.info("Token refresh attempt")
+    try:
+        result = refresh_access_token(body.refresh_token, db)
+        logger.info("Access token refreshed")
         return result
     except Exception as e:
-        logger.warning(f"User login failed for {user.email}: {str(e)}")
+        logger.warning("Token refresh failed: {}", e)
+        raise
+
+
+@router.post("/logout", status_code=200)
+def logout(
+    body: RefreshTokenRequest, db: Session = Depends(get_db, scope="function")
+):
+    logger.info("Logout attempt")
+    try:
+        result = revoke_refresh_token(body.refresh_token, db)
+        logger.info("Refresh token revoked on logout")
+        return result
+    except Exception as e:
+        logger.warning("Logout failed: {}", e)
         raise
 
 
 @router.post("/activate", status_code=200)
-def request_to_activate_user(email: str, db: Session = Depends(get_db)):
-    logger.info(f"User activation request: {email}")
+def request_to_activate_user(
+    email: str,
+    db: Session = Depends(get_db, scope="function"),
+):
+    logger.info("User activation request: {}", email)
     try:
         result = verify_user_email_request(email, db)
-        logger.info(f"Activation email sent: {email}")
+        logger.info("Activation email sent: {}", email)
         return result
     except Exception as e:
-        logger.error(f"Activation request failed for {email}: {str(e)}")
+        logger.error("Activation request failed for {}: {}", email, e)
         raise
 
 
 @router.get("/verify-email", status_code=200)
-def verify_email(token: str, db: Session = Depends(get_db)):
+def verify_email(token: str, db: Session = Depends(get_db, scope="function")):
     logger.info("Email verification token received")
     try:
         result = activate_user_email(token, db)
         logger.info("Email verified successfully")
         return result
     except Exception as e:
-        logger.warning(f"Email verification failed: {str(e)}")
+        logger.warning("Email verification failed: {}", e)
         raise
+
+
+@router.get("/me", status_code=200)
+def read_current_user(principal: Principal = Depends(get_current_user)):
+    return {"user_id": principal.user_id, "role": principal.role}
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.controllers import export_controller
+from app.core.auth import require_role
+from app.database import get_db
+from app.core.logger import logger
+from app.models.auth_user import UserRole
+
+# Full-table dumps are for admins only
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"],
+    dependencies=[Depends(require_role(UserRole.ADMIN))],
+)
+
+
+def _accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+def _export(table: str, fmt: str, request: Request, db: Session):
+    gzip = _accepts_gzip(request)
+    logger.info("Export requested: {} as {} (gzip={})", table, fmt, gzip)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{table}.{fmt}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_controller.stream_table(db, table, fmt, gzip=gzip),
+        media_type=export_controller.EXPORT_FORMATS[fmt],
+        headers=headers,
+    )
+
+
+@router.get("/subjects")
+def export_subjects(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    # Request scope: the streamed body reads from the session after the
+    # route function has returned
+    db: Session = Depends(get_db),
+):
+    return _export("subjects", format, request, db)
+
+
+@router.get("/users")
+def export_users(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+):
+    return _export("users", format, request, db)
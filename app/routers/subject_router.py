@@ -1,57 +1,170 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 
 from app.controllers import subject_controller
-from app.database import get_db
+from app.core.cache import cached_json_response
+from app.core.config import (
+    SUBJECTS_BULK_MAX_ITEMS,
+    SUBJECTS_MAX_PAGE_SIZE,
+    SUBJECTS_PAGE_SIZE,
+    SUBJECT_SEARCH_MAX_CANDIDATES,
+    SUBJECT_SEARCH_MAX_PAGE_SIZE,
+    SUBJECT_SEARCH_PAGE_SIZE,
+)
+from app.database import get_db, get_read_db
 from app.schema import subject_schema as schema
 from app.core.logger import logger
+from app.core.serialization import FastJSONResponse
 
 router = APIRouter(prefix="/subjects", tags=["Subjects"])
 
 
 @router.post("/", response_model=schema.SubjectResponse, status_code=201)
 def create_subject(
-    subject: schema.SubjectCreate, db: Session = Depends(get_db)
+    subject: schema.SubjectCreate,
+    db: Session = Depends(get_db, scope="function"),
 ):
-    logger.info(f"Creating subject: {subject.name}")
+    logger.info("Creating subject: {}", subject.name)
     try:
         result = subject_controller.create_subject(db, subject)
-        logger.info(f"Subject created successfully with ID: {result.id}")
-        return result
+        logger.info("Subject created successfully with ID: {}", result.id)
+        return FastJSONResponse(
+            subject_controller.subject_row(result), status_code=201
+        )
     except Exception as e:
-        logger.error(f"Error creating subject: {str(e)}")
+        logger.error("Error creating subject: {}", e)
         raise
 
 
-@router.get("/", response_model=list[schema.SubjectResponse])
-def list_subjects(db: Session = Depends(get_db)):
-    logger.debug("Fetching all subjects")
+@router.post(
+    "/bulk", response_model=schema.SubjectBulkResponse, status_code=201
+)
+def create_subjects_bulk(
+    subjects: list[schema.SubjectCreate] = Body(
+        ..., min_length=1, max_length=SUBJECTS_BULK_MAX_ITEMS
+    ),
+    db: Session = Depends(get_db, scope="function"),
+):
+    logger.info("Bulk creating {} subjects", len(subjects))
+    try:
+        result = subject_controller.create_subjects_bulk(db, subjects)
+        logger.info(
+            "Bulk create: {} created, {} conflicts",
+            len(result["created"]), len(result["conflicts"])
+        )
+        # Plain RETURNING rows; skip revalidating them one by one
+        return FastJSONResponse(result, status_code=201)
+    except Exception as e:
+        logger.error("Error bulk creating subjects: {}", e)
+        raise
+
+
+@router.post(
+    "/bulk-delete", response_model=schema.SubjectBulkDeleteResponse
+)
+def delete_subjects_bulk(
+    request: schema.SubjectBulkDelete,
+    db: Session = Depends(get_db, scope="function"),
+):
+    logger.info(
+        "Bulk deleting subjects: {} ids, filter {}",
+        len(request.ids or []), request.filter
+    )
+    try:
+        result = subject_controller.delete_subjects_bulk(db, request)
+        logger.info(
+            "Bulk delete: {} deleted, {} not found",
+            len(result["deleted"]), len(result["not_found"])
+        )
+        return FastJSONResponse(result)
+    except Exception as e:
+        logger.error("Error bulk deleting subjects: {}", e)
+        raise
+
+
+@router.get(
+    "/",
+    response_model=list[schema.SubjectListItem],
+    response_model_exclude_unset=True,
+)
+def list_subjects(
+    request: Request,
+    limit: int = Query(SUBJECTS_PAGE_SIZE, ge=1, le=SUBJECTS_MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Opaque cursor"),
+    fields: str | None = Query(None, description="e.g. id,name"),
+    db: Session = Depends(get_read_db, scope="function"),
+):
+    logger.debug("Fetching subjects page: limit={}, after={}", limit, after)
     try:
-        subjects = subject_controller.get_subjects(db)
-        logger.info(f"Retrieved {len(subjects)} subjects")
-        return subjects
+        projection = subject_controller.parse_fields(fields)
+        page = subject_controller.get_subjects(db, limit, after, projection)
+    except ValueError as e:
+        logger.warning("Invalid subjects page request: {}", e)
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error listing subjects: {str(e)}")
+        logger.error("Error listing subjects: {}", e)
         raise
 
+    total, is_estimate = subject_controller.count_subjects(db)
+    headers = {"X-Total-Count": str(total)}
+    if is_estimate:
+        headers["X-Total-Count-Estimated"] = "true"
+    if page.meta["next_cursor"]:
+        headers["X-Next-Cursor"] = page.meta["next_cursor"]
+    logger.info("Retrieved {} subjects", len(page.payload))
+    return cached_json_response(request, page, headers)
+
+
+@router.get("/search", response_model=list[schema.SubjectResponse])
+def search_subjects(
+    request: Request,
+    q: str = Query(
+        ..., min_length=1, max_length=100,
+        description=(
+            "Matched against name and description; 1-2 characters "
+            "match name prefixes only"
+        ),
+    ),
+    limit: int = Query(
+        SUBJECT_SEARCH_PAGE_SIZE, ge=1, le=SUBJECT_SEARCH_MAX_PAGE_SIZE
+    ),
+    offset: int = Query(0, ge=0, le=SUBJECT_SEARCH_MAX_CANDIDATES),
+    db: Session = Depends(get_read_db, scope="function"),
+):
+    logger.debug("Searching subjects: q={!r}, offset={}", q, offset)
+    results = subject_controller.search_subjects(db, q, limit, offset)
+    headers = {}
+    if results.meta["next_offset"] is not None:
+        headers["X-Next-Offset"] = str(results.meta["next_offset"])
+    logger.info("Search for {!r} returned {} subjects", q,
+                len(results.payload))
+    return cached_json_response(request, results, headers)
+
 
 @router.get("/{subject_id}", response_model=schema.SubjectResponse)
-def get_subject(subject_id: int, db: Session = Depends(get_db)):
-    logger.debug(f"Fetching subject with ID: {subject_id}")
+def get_subject(
+    subject_id: int,
+    request: Request,
+    db: Session = Depends(get_read_db, scope="function"),
+):
+    logger.debug("Fetching subject with ID: {}", subject_id)
     subject = subject_controller.get_subject(db, subject_id)
-    if not subject:
-        logger.warning(f"Subject with ID {subject_id} not found")
+    if subject.payload is None:
+        logger.warning("Subject with ID {} not found", subject_id)
         raise HTTPException(status_code=404, detail="Subject not found")
-    logger.info(f"Retrieved subject with ID: {subject_id}")
-    return subject
+    logger.info("Retrieved subject with ID: {}", subject_id)
+    return cached_json_response(request, subject)
 
 
 @router.delete("/{subject_id}")
-def delete_subject(subject_id: int, db: Session = Depends(get_db)):
-    logger.info(f"Deleting subject with ID: {subject_id}")
+def delete_subject(
+    subject_id: int,
+    db: Session = Depends(get_db, scope="function"),
+):
+    logger.info("Deleting subject with ID: {}", subject_id)
     subject = subject_controller.delete_subject(db, subject_id)
     if not subject:
-        logger.warning(f"Subject with ID {subject_id} not found for deletion")
+        logger.warning("Subject with ID {} not found for deletion", subject_id)
         raise HTTPException(status_code=404, detail="Subject not found")
-    logger.info(f"Subject with ID {subject_id} deleted successfully")
+    logger.info("Subject with ID {} deleted successfully", subject_id)
     return {"message": "Deleted successfully"}
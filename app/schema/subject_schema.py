@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+
+from app.core.config import SUBJECTS_BULK_MAX_ITEMS
 
 
 class SubjectBase(BaseModel):
@@ -15,3 +17,57 @@ class SubjectResponse(SubjectBase):
 
     class Config:
         from_attributes = True
+
+
+class SubjectListItem(BaseModel):
+    """A subject row in a list page; only the projected fields are set."""
+    id: int | None = None
+    name: str | None = None
+    description: str | None = None
+
+
+class SubjectBulkConflict(BaseModel):
+    index: int
+    name: str
+    detail: str
+
+
+class SubjectBulkResponse(BaseModel):
+    created: list[SubjectResponse]
+    conflicts: list[SubjectBulkConflict]
+
+
+class SubjectFilter(BaseModel):
+    """Subjects matching every given condition; at least one is required."""
+    name_prefix: str | None = Field(None, min_length=1)
+    min_id: int | None = None
+    max_id: int | None = None
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        conditions = (self.name_prefix, self.min_id, self.max_id)
+        if all(condition is None for condition in conditions):
+            raise ValueError("filter needs at least one condition")
+        return self
+
+
+class SubjectBulkDelete(BaseModel):
+    """Either the ids to delete or a filter selecting them."""
+    ids: list[int] | None = Field(
+        None, min_length=1, max_length=SUBJECTS_BULK_MAX_ITEMS
+    )
+    filter: SubjectFilter | None = None
+
+    @model_validator(mode="after")
+    def check_one_selector(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("give exactly one of ids or filter")
+        return self
+
+
+class SubjectBulkDeleteResponse(BaseModel):
+    deleted: list[int]
+    # Requested ids that did not exist (always empty for a filter)
+    not_found: list[int]
+    # A filter matched more than SUBJECTS_BULK_MAX_ITEMS rows; repeat it
+    has_more: bool
@@ -0,0 +1,166 @@
+"""Production entry point: a pre-fork server running WEB_WORKERS workers.
+
+    WEB_WORKERS=4 python -m app.server [--host 0.0.0.0] [--port 8000]
+
+The master process binds the listening socket, imports the application
+once and prepares the schema (DB_SCHEMA_MODE) once, then forks the
+workers. Each worker runs uvicorn on the shared socket, so the kernel
+spreads connections over them, and the preloaded code is shared
+copy-on-write.
+
+Nothing the master opened is used by a worker. The master closes its
+pooled connections before forking, and each worker starts with empty
+pools, its own log writer threads and its own bcrypt executor. Those
+after-fork hooks live next to the resources in app.database,
+app.core.logger and app.core.executor. Each worker also writes and
+rotates its own log files (app-worker-<slot>.log, error-worker-<slot>.log);
+the master keeps app.log and error.log.
+
+Per-worker limits are derived from the worker count: DB_POOL_SIZE and
+DB_MAX_OVERFLOW split DB_MAX_CONNECTIONS between the workers,
+THREADPOOL_THREADS follows the pool size, and CPU_EXECUTOR_WORKERS
+shares the cores.
+
+Only the first worker runs the email outbox sender (EMAIL_OUTBOX_WORKER),
+so the workers don't compete for the same messages.
+
+A worker that dies is replaced. SIGTERM or SIGINT on the master is
+passed to the workers, which finish their requests and exit.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from app.core.config import (
+    CPU_EXECUTOR_WORKERS,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    THREADPOOL_THREADS,
+    WEB_WORKERS,
+)
+from app.core.logger import configure_logging, flush_logs, logger
+
+# Seconds to wait before replacing a worker that exited on its own, so a
+# worker that cannot start doesn't turn into a fork loop
+RESPAWN_DELAY = 1.0
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Import the app and run the one-off startup work in the master."""
+    from app.main import app
+    from app.database import dispose_engines, prepare_schema
+
+    prepare_schema()
+    app.state.schema_prepared = True
+    # Connections opened for the schema must not leak into the workers
+    dispose_engines()
+    return app
+
+
+def run_worker(app, sock: socket.socket):
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+    config = uvicorn.Config(app, lifespan="on", proxy_headers=True)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, workers: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        # pid -> worker slot; a replacement takes over the dead one's slot
+        self.children: dict[int, int] = {}
+        self.stopping = False
+
+    def spawn(self, slot: int):
+        # Lines queued before the fork would be written by both processes
+        flush_logs(5)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                # Rotating a file shared with other processes loses lines
+                configure_logging(worker=slot)
+                self.app.state.outbox_worker = slot == 0
+                run_worker(self.app, self.sock)
+            except SystemExit as e:
+                # uvicorn exits with a status when startup fails
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException as e:
+                logger.exception("Worker {} failed: {}", os.getpid(), e)
+                code = 1
+            finally:
+                flush_logs(5)
+                os._exit(code)
+        self.children[pid] = slot
+        logger.info("Started worker {} (slot {})", pid, slot)
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for slot in range(self.workers):
+            self.spawn(slot)
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            slot = self.children.pop(pid, None)
+            if slot is None:
+                continue
+            if self.stopping:
+                continue
+            logger.warning(
+                "Worker {} exited with status {}, replacing it",
+                pid, os.waitstatus_to_exitcode(status)
+            )
+            time.sleep(RESPAWN_DELAY)
+            if not self.stopping:
+                self.spawn(slot)
+        logger.info("All workers stopped")
+        return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    sock = bind_socket(args.host, args.port)
+    app = preload()
+    logger.info(
+        "Serving on {}:{} with {} workers (per worker: pool {}+{}, "
+        "{} threads, {} bcrypt workers)",
+        args.host, args.port, WEB_WORKERS, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+        THREADPOOL_THREADS, CPU_EXECUTOR_WORKERS,
+    )
+    return Master(app, sock, WEB_WORKERS).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
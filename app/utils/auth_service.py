@@ -7,7 +7,7 @@ from app.core.logger import logger
 # Generate email verification token
 def generate_email_verification_token(user_id: int):
     """Generate a token for email verification (valid for 24 hours)"""
-    logger.debug(f"Generating email verification token for user: {user_id}")
+    logger.debug("Generating email verification token for user: {}", user_id)
 
     now = datetime.utcnow()
     data = {
@@ -31,11 +31,11 @@ def verify_email_verification_token(token: str):
             logger.warning("Invalid token type for email verification")
             return None
         user_id = payload.get("sub")
-        logger.debug(f"Email verification token valid for user: {user_id}")
+        logger.debug("Email verification token valid for user: {}", user_id)
         return user_id
     except jwt.ExpiredSignatureError:
         logger.warning("Email verification token has expired")
         return None
     except jwt.JWTError as e:
-        logger.error(f"Error decoding email verification token: {str(e)}")
+        logger.error("Error decoding email verification token: {}", e)
         return None
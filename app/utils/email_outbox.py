@@ -0,0 +1,296 @@
+"""Transactional email outbox.
+
+Request handlers call ``enqueue_email`` inside the transaction that creates
+or changes the user, so the email is recorded if and only if that change
+commits, and the request never waits on SMTP. ``OutboxWorker`` drains the
+table in the background: it claims a batch of due messages, delivers them
+over a single SMTP connection and reschedules failures with exponential
+backoff until EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+
+A claim (claimed_at/claimed_by) is committed before any email is sent, and
+each message's outcome is written in its own short transaction, so SMTP
+never runs while a pooled connection or row lock is held. Claims older
+than EMAIL_OUTBOX_CLAIM_TIMEOUT are taken over, so messages of a worker
+that died are still sent.
+"""
+import os
+import random
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    EMAIL_OUTBOX_BACKOFF_BASE,
+    EMAIL_OUTBOX_BACKOFF_MAX,
+    EMAIL_OUTBOX_BATCH_SIZE,
+    EMAIL_OUTBOX_CLAIM_TIMEOUT,
+    EMAIL_OUTBOX_MAX_ATTEMPTS,
+    EMAIL_OUTBOX_POLL_INTERVAL,
+)
+from app.core.logger import logger
+from app.models.email_outbox import EmailOutbox
+from app.utils.email_service import get_email_sender
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+
+def _pending_duplicate_query(dedup_key: str):
+    return (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.dedup_key == dedup_key)
+        .where(EmailOutbox.status == PENDING)
+        .limit(1)
+    )
+
+
+def enqueue_email(
+    db: Session,
+    to_email: str,
+    subject: str,
+    body: str,
+    dedup_key: str | None = None,
+    check_pending: bool = True,
+):
+    """Add an email to the caller's transaction; the caller commits.
+
+    Returns False if a message with the same ``dedup_key`` is already
+    waiting to be sent. Pass ``check_pending=False`` when the key cannot
+    have been used yet (e.g. it names a user created in this transaction)
+    to skip that lookup.
+    """
+    if (
+        dedup_key
+        and check_pending
+        and db.execute(_pending_duplicate_query(dedup_key)).first()
+    ):
+        logger.debug("Email already queued for key: {}", dedup_key)
+        return False
+    db.add(EmailOutbox(
+        to_email=to_email, subject=subject, body=body, dedup_key=dedup_key
+    ))
+    return True
+
+
+async def enqueue_email_async(
+    db: AsyncSession,
+    to_email: str,
+    subject: str,
+    body: str,
+    dedup_key: str | None = None,
+    check_pending: bool = True,
+):
+    if dedup_key and check_pending:
+        result = await db.execute(_pending_duplicate_query(dedup_key))
+        if result.first():
+            logger.debug("Email already queued for key: {}", dedup_key)
+            return False
+    db.add(EmailOutbox(
+        to_email=to_email, subject=subject, body=body, dedup_key=dedup_key
+    ))
+    return True
+
+
+def backoff_delay(attempts: int) -> float:
+    delay = EMAIL_OUTBOX_BACKOFF_BASE * 2 ** max(attempts - 1, 0)
+    # Jitter so retries of one outage don't all fire together
+    return min(delay, EMAIL_OUTBOX_BACKOFF_MAX) * random.uniform(0.8, 1.2)
+
+
+class OutboxWorker:
+    # Longest pause after consecutive unexpected errors, in seconds
+    MAX_ERROR_DELAY = 60
+
+    def __init__(
+        self,
+        session_factory,
+        sender_factory=get_email_sender,
+        batch_size: int = EMAIL_OUTBOX_BATCH_SIZE,
+        poll_interval: float = EMAIL_OUTBOX_POLL_INTERVAL,
+        max_attempts: int = EMAIL_OUTBOX_MAX_ATTEMPTS,
+        claim_timeout: float = EMAIL_OUTBOX_CLAIM_TIMEOUT,
+    ):
+        self.session_factory = session_factory
+        self.sender_factory = sender_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.claim_timeout = claim_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _claimable(self, now: datetime):
+        # Claims older than claim_timeout belong to a worker that died
+        return or_(
+            EmailOutbox.claimed_at.is_(None),
+            EmailOutbox.claimed_at
+            < now - timedelta(seconds=self.claim_timeout),
+        )
+
+    def _claim_batch(self) -> list[EmailOutbox]:
+        """Mark a batch of due messages as ours and commit at once, so no
+        connection or row lock is held while SMTP runs."""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            query = (
+                select(EmailOutbox.id)
+                .where(EmailOutbox.status == PENDING)
+                .where(EmailOutbox.next_attempt_at <= now)
+                .where(self._claimable(now))
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+            )
+            if db.get_bind().dialect.name == "postgresql":
+                query = query.with_for_update(skip_locked=True)
+            ids = list(db.execute(query).scalars())
+            if not ids:
+                db.rollback()
+                return []
+            # The claim condition is checked again by the UPDATE itself,
+            # so two workers racing for a row (e.g. on SQLite, which has
+            # no SKIP LOCKED) cannot both get it
+            batch = list(
+                db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(ids))
+                    .where(EmailOutbox.status == PENDING)
+                    .where(self._claimable(now))
+                    .values(claimed_at=now, claimed_by=self.worker_id)
+                    .returning(EmailOutbox)
+                ).scalars()
+            )
+            db.commit()
+            return sorted(batch, key=lambda message: message.id)
+        finally:
+            db.close()
+
+    def drain_once(self) -> int:
+        """Send one batch of due messages; return how many were handled."""
+        try:
+            batch = self._claim_batch()
+        except Exception as e:
+            logger.error("Email outbox claim failed: {}", e)
+            return 0
+        if batch:
+            self._deliver(batch)
+        return len(batch)
+
+    def _finish(self, message: EmailOutbox, **values):
+        """Record the outcome of one message and release its claim."""
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == message.id)
+                .where(EmailOutbox.claimed_by == self.worker_id)
+                .values(claimed_at=None, claimed_by=None, **values)
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # Sent again once the claim times out
+            logger.error(
+                "Email outbox update for {} failed: {}", message.id, e
+            )
+        finally:
+            db.close()
+
+    def _deliver(self, batch: list[EmailOutbox]):
+        try:
+            sender = self.sender_factory()
+        except Exception as e:
+            for message in batch:
+                self._reschedule(message, e)
+            return
+        sent_keys = set()
+        try:
+            for message in batch:
+                if message.dedup_key and message.dedup_key in sent_keys:
+                    self._finish(
+                        message, status=SENT, sent_at=datetime.utcnow()
+                    )
+                    continue
+                try:
+                    sender.send(
+                        message.to_email, message.subject, message.body
+                    )
+                except Exception as e:
+                    self._reschedule(message, e)
+                    continue
+                self._finish(
+                    message,
+                    status=SENT,
+                    sent_at=datetime.utcnow(),
+                    attempts=message.attempts + 1,
+                )
+                if message.dedup_key:
+                    sent_keys.add(message.dedup_key)
+        finally:
+            sender.close()
+        logger.info("Email outbox delivered a batch of {}", len(batch))
+
+    def _reschedule(self, message: EmailOutbox, error: Exception):
+        attempts = message.attempts + 1
+        values = {"attempts": attempts, "last_error": str(error)[:500]}
+        if attempts >= self.max_attempts:
+            logger.error(
+                "Giving up on email {} to {} after {} attempts: {}",
+                message.id, message.to_email, attempts, error
+            )
+            self._finish(message, status=FAILED, **values)
+            return
+        delay = backoff_delay(attempts)
+        logger.warning(
+            "Email {} to {} failed (attempt {}), retrying in {:.0f}s: {}",
+            message.id, message.to_email, attempts, delay, error
+        )
+        self._finish(
+            message,
+            next_attempt_at=datetime.utcnow() + timedelta(seconds=delay),
+            **values,
+        )
+
+    def run(self):
+        logger.info("Email outbox worker started")
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                handled = self.drain_once()
+            except Exception as e:
+                # An unexpected error must not end the thread: emails would
+                # stop until the process restarts
+                failures += 1
+                delay = min(
+                    self.poll_interval * 2 ** failures, self.MAX_ERROR_DELAY
+                )
+                logger.exception(
+                    "Email outbox worker failed, retrying in {:.0f}s: {}",
+                    delay, e,
+                )
+                self._stop.wait(delay)
+                continue
+            failures = 0
+            # Keep draining while full batches come back
+            if handled < self.batch_size:
+                self._stop.wait(self.poll_interval)
+        logger.info("Email outbox worker stopped")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, name="email-outbox", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
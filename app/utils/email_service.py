@@ -1,5 +1,17 @@
+import smtplib
+from email.message import EmailMessage
 from os import getenv
 
+from app.core.config import (
+    EMAIL_FROM,
+    SMTP_HOST,
+    SMTP_PASSWORD,
+    SMTP_PORT,
+    SMTP_STARTTLS,
+    SMTP_TIMEOUT,
+    SMTP_USERNAME,
+)
+
 
 def send_email(to_email: str, subject: str, body: str):
     env = getenv("ENVIRONMENT", "development")
@@ -10,3 +22,84 @@ def send_email(to_email: str, subject: str, body: str):
     # Placeholder function to simulate sending an email
     print(f"""Sending email to {to_email} with subject
          '{subject}' and body:\n{body}""")
+
+
+class ConsoleEmailSender:
+    """Development sender - prints instead of delivering."""
+
+    def send(self, to_email: str, subject: str, body: str):
+        send_email(to_email, subject, body)
+
+    def close(self):
+        pass
+
+
+class SMTPEmailSender:
+    """Sends over one SMTP connection that is reused until closed.
+
+    The outbox worker opens one sender per batch, so a batch pays for the
+    TCP/TLS handshake and login once instead of once per message.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str | None = None,
+        password: str | None = None,
+        starttls: bool = False,
+        timeout: float = SMTP_TIMEOUT,
+        from_email: str = EMAIL_FROM,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.from_email = from_email
+        self._smtp: smtplib.SMTP | None = None
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            self._smtp = smtp
+        return self._smtp
+
+    def send(self, to_email: str, subject: str, body: str):
+        message = EmailMessage()
+        message["From"] = self.from_email
+        message["To"] = to_email
+        message["Subject"] = subject
+        message.set_content(body)
+        try:
+            self._connection().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped the pooled connection - reconnect once
+            self._smtp = None
+            self._connection().send_message(message)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                self._smtp.close()
+            self._smtp = None
+
+
+def get_email_sender():
+    """Sender for the configured transport."""
+    if SMTP_HOST:
+        return SMTPEmailSender(
+            SMTP_HOST,
+            SMTP_PORT,
+            username=SMTP_USERNAME,
+            password=SMTP_PASSWORD,
+            starttls=SMTP_STARTTLS,
+        )
+    return ConsoleEmailSender()
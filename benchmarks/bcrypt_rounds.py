@@ -0,0 +1,37 @@
+"""Pick BCRYPT_ROUNDS for this host from a target hash time.
+
+Times one bcrypt hash per cost factor, the way a login or signup pays for
+it on a worker, and prints the highest cost that stays within the target.
+Run it on the production instance type; set the result as BCRYPT_ROUNDS
+and existing users move to it as they log in.
+
+    python -m benchmarks.bcrypt_rounds [--target-ms 250] [--max-rounds 16]
+"""
+import argparse
+
+from app.core.config import BCRYPT_ROUNDS
+from app.core.security import calibrate_rounds
+
+
+def run(target_ms: float, min_rounds: int, max_rounds: int):
+    chosen, timings = calibrate_rounds(
+        target_ms / 1000, min_rounds, max_rounds
+    )
+    for rounds, seconds in timings.items():
+        marks = []
+        if rounds == chosen:
+            marks.append("chosen")
+        if rounds == BCRYPT_ROUNDS:
+            marks.append("current")
+        print(f"{rounds:3d} rounds  {seconds * 1000:8.1f} ms  "
+              f"{', '.join(marks)}")
+    print(f"BCRYPT_ROUNDS={chosen}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--min-rounds", type=int, default=4)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    args = parser.parse_args()
+    run(args.target_ms, args.min_rounds, args.max_rounds)
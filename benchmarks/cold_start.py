@@ -0,0 +1,70 @@
+"""Measure how long a fresh worker process takes to serve its first request.
+
+Each run starts a new interpreter that imports app.main, runs the lifespan
+(schema mode and pool warm-up as configured) and answers one
+GET /subjects/ request. Reports the median of each phase:
+
+    DATABASE_URL=postgresql://... DB_POOL_WARMUP=5 \\
+        python -m benchmarks.cold_start --runs 10
+
+"process" is the wall time seen by the parent, from spawn until the first
+response, so it includes interpreter start-up.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import json, time
+import app.main
+from fastapi.testclient import TestClient
+from app.core.metrics import startup_seconds
+
+with TestClient(app.main.app) as client:
+    start = time.perf_counter()
+    status = client.get("/subjects/?limit=1").status_code
+    first_request = time.perf_counter() - start
+print(json.dumps({
+    **startup_seconds, "first_request": first_request, "status": status,
+}))
+"""
+
+PHASES = ("import", "schema", "pool_warmup", "first_request", "process")
+
+
+def run_once(env: dict) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    env = {
+        "LOG_LEVEL": "WARNING",
+        "EMAIL_OUTBOX_WORKER": "false",
+        **os.environ,
+    }
+    runs = [run_once(env) for _ in range(args.runs)]
+    if any(run["status"] != 200 for run in runs):
+        print("warning: first request did not return 200 "
+              "(missing tables? try DB_SCHEMA_MODE=migrate)")
+    for phase in PHASES:
+        median = statistics.median(run[phase] for run in runs)
+        print(f"{phase:<14} {median * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
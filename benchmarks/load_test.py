@@ -0,0 +1,290 @@
+"""Load test the API in-process and record latency percentiles.
+
+Drives the real ASGI app (middleware, routing, thread pool and database)
+through ``httpx.AsyncClient`` with N concurrent workers per endpoint, then
+reports p50/p95/p99 latency and throughput and writes them as JSON:
+
+    python -m benchmarks.load_test --subjects 100000 --users 50000 \\
+        --concurrency 32 --requests 2000 --output results.json
+
+Compare a run against an earlier one and fail on regressions:
+
+    python -m benchmarks.load_test --baseline results.json \\
+        --max-regression 0.15
+
+Point DATABASE_URL at a local Postgres to benchmark against it; DB_MODE
+selects sync or async routes. Rate limits are disabled unless
+--keep-rate-limits is given, since every login here comes from one IP.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.seed import BENCH_PASSWORD, seed, user_email
+
+ENDPOINTS = (
+    "get_subject", "list_subjects", "search_subjects", "login", "register",
+)
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, round(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies: list[float], errors: int, wall: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3)
+        if ordered else 0.0,
+        "throughput_rps": round(len(ordered) / wall, 1) if wall else 0.0,
+    }
+
+
+class Workload:
+    """Builds requests for each endpoint from the seeded dataset."""
+
+    def __init__(self, subject_ids: tuple[int, int], users: int, seed: int):
+        from app.controllers.subject_controller import encode_cursor
+
+        self.encode_cursor = encode_cursor
+        self.first_id, self.last_id = subject_ids
+        self.users = users
+        self.random = random.Random(seed)
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+        self.registered = 0
+
+    def request(self, endpoint: str) -> tuple[str, str, dict | None, int]:
+        """Return ``(method, url, json_body, expected_status)``."""
+        if endpoint == "get_subject":
+            subject_id = self.random.randint(self.first_id, self.last_id)
+            return "GET", f"/subjects/{subject_id}", None, 200
+        if endpoint == "list_subjects":
+            after = self.encode_cursor(
+                self.random.randint(self.first_id, self.last_id)
+            )
+            return "GET", f"/subjects/?limit=100&after={after}", None, 200
+        if endpoint == "search_subjects":
+            # Substring of a seeded name; the index must find it anywhere
+            subject_id = self.random.randint(self.first_id, self.last_id)
+            return "GET", f"/subjects/search?q=ject-{subject_id}", None, 200
+        if endpoint == "login":
+            body = {
+                "email": user_email(self.random.randrange(self.users)),
+                "password": BENCH_PASSWORD,
+            }
+            return "POST", "/auth/login", body, 200
+        if endpoint == "register":
+            self.registered += 1
+            body = {
+                "first_name": "Load",
+                "last_name": "Test",
+                "email": f"load-{self.run_id}-{self.registered}@example.com",
+                "password": BENCH_PASSWORD,
+            }
+            return "POST", "/auth/register", body, 201
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+async def run_endpoint(
+    client, workload: Workload, endpoint: str, requests: int,
+    concurrency: int,
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, url, body, expected = workload.request(endpoint)
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != expected:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_all(args, subject_ids: tuple[int, int]) -> dict:
+    import httpx
+
+    from app.main import app
+
+    workload = Workload(subject_ids, args.users, args.seed)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        for endpoint in args.endpoints:
+            # Warm caches, pools and worker processes first
+            await run_endpoint(
+                client, workload, endpoint, args.warmup, args.concurrency
+            )
+            results[endpoint] = await run_endpoint(
+                client, workload, endpoint, args.requests, args.concurrency
+            )
+            print(format_result(endpoint, results[endpoint]))
+    return results
+
+
+def format_result(endpoint: str, result: dict) -> str:
+    return (
+        f"{endpoint:<14} p50 {result['p50_ms']:8.2f} ms  "
+        f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+        f"{result['throughput_rps']:8.1f} req/s  "
+        f"{result['errors']} errors"
+    )
+
+
+def compare(baseline: dict, current: dict, max_regression: float) -> list:
+    """Return a message for every endpoint that regressed too far."""
+    failures = []
+    for endpoint, result in current["results"].items():
+        before = baseline["results"].get(endpoint)
+        if before is None:
+            continue
+        if before["p95_ms"] and (
+            result["p95_ms"] > before["p95_ms"] * (1 + max_regression)
+        ):
+            failures.append(
+                f"{endpoint}: p95 {before['p95_ms']} ms -> "
+                f"{result['p95_ms']} ms"
+            )
+        if result["throughput_rps"] < (
+            before["throughput_rps"] * (1 - max_regression)
+        ):
+            failures.append(
+                f"{endpoint}: throughput {before['throughput_rps']} -> "
+                f"{result['throughput_rps']} req/s"
+            )
+    return failures
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def subject_id_range() -> tuple[int, int]:
+    from sqlalchemy import func, select
+
+    from app.database import SessionLocal
+    from app.models.subject import Subject
+    from benchmarks.seed import SUBJECT_PREFIX
+
+    db = SessionLocal()
+    try:
+        first, last = db.execute(
+            select(func.min(Subject.id), func.max(Subject.id))
+            .where(Subject.name.like(f"{SUBJECT_PREFIX}%"))
+        ).one()
+    finally:
+        db.close()
+    if first is None:
+        raise SystemExit("No benchmark subjects; run without --no-seed")
+    return first, last
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--subjects", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--no-seed", action="store_true",
+                        help="use the existing benchmark rows as they are")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS,
+                        default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000,
+                        help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1,
+                        help="random seed for the request mix")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline",
+                        help="earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="allowed p95/throughput regression (0.15=15%%)")
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Must be set before the app (and its engine) is imported
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not args.keep_rate_limits:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    from app.core.config import DB_MODE
+    from app.database import get_engine, prepare_schema
+
+    prepare_schema("migrate")
+    engine = get_engine()
+
+    if not args.no_seed:
+        started = time.perf_counter()
+        new_subjects, new_users = seed(args.subjects, args.users)
+        print(
+            f"Seeded {new_subjects} subjects and {new_users} users in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+    results = asyncio.run(run_all(args, subject_id_range()))
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "database": engine.dialect.name,
+            "database_url": engine.url.render_as_string(hide_password=True),
+            "db_mode": DB_MODE,
+            "python": platform.python_version(),
+            "subjects": args.subjects,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(json.load(f), report, args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Per-request cost of logging on the request thread.
+
+A "request" emits the lines of a GET /subjects/{id} cache miss: two DEBUG
+lines and one INFO line. Each scenario configures the real sinks (files in
+a temp directory, console to /dev/null or to a stream that blocks for
+0.2 ms per write, like a stdout pipe under backpressure) and reports the
+best-of-3 mean time the request thread spends in logger calls.
+
+    python -m benchmarks.logging_overhead [--requests 20000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.core.logger import configure_logging, flush_logs, logger
+
+
+def request_fstring(subject_id: int):
+    logger.debug(f"Fetching subject with ID: {subject_id}")
+    logger.debug(f"Cache miss for key: subjects:v1:id:{subject_id}")
+    logger.info(f"Retrieved subject with ID: {subject_id}")
+
+
+def request_lazy(subject_id: int):
+    logger.debug("Fetching subject with ID: {}", subject_id)
+    logger.debug("Cache miss for key: subjects:v1:id:{}", subject_id)
+    logger.info("Retrieved subject with ID: {}", subject_id)
+
+
+class SlowStream:
+    """Stand-in for a stdout pipe whose reader is falling behind."""
+
+    def write(self, message):
+        time.sleep(0.0002)
+
+    def flush(self):
+        pass
+
+
+SCENARIOS = [
+    # name, request function, configure_logging kwargs
+    (
+        "previous: f-strings, blocking sinks, app.log at DEBUG",
+        request_fstring,
+        {"file_level": "DEBUG", "enqueue": False},
+    ),
+    (
+        "lazy args, blocking sinks, app.log at INFO",
+        request_lazy,
+        {"file_level": "INFO", "enqueue": False},
+    ),
+    (
+        "lazy args, enqueued sinks, app.log at INFO",
+        request_lazy,
+        {"file_level": "INFO", "enqueue": True},
+    ),
+    (
+        "lazy args, enqueued sinks, app.log at DEBUG sampled 1%",
+        request_lazy,
+        {"file_level": "DEBUG", "enqueue": True,
+         "sample_rates": "DEBUG=0.01"},
+    ),
+    (
+        "slow stdout: lazy args, blocking sinks",
+        request_lazy,
+        {"file_level": "INFO", "enqueue": False, "console": SlowStream()},
+    ),
+    (
+        "slow stdout: lazy args, enqueued sinks",
+        request_lazy,
+        {"file_level": "INFO", "enqueue": True, "console": SlowStream()},
+    ),
+]
+
+
+def measure(request, requests: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for i in range(requests):
+            request(i)
+        best = min(best, time.perf_counter() - start)
+        flush_logs()
+    return best / requests
+
+
+def run(requests: int):
+    with tempfile.TemporaryDirectory() as directory, \
+            open(os.devnull, "w") as devnull:
+        for name, request, options in SCENARIOS:
+            configure_logging(
+                **{"level": "INFO", "directory": directory,
+                   "console": devnull, **options}
+            )
+            for i in range(min(requests, 1000)):
+                request(i)
+            flush_logs()
+            per_request = measure(request, requests)
+            print(f"{per_request * 1e6:8.1f} us/request  {name}")
+        logger.remove()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    run(parser.parse_args().requests)
@@ -0,0 +1,111 @@
+"""Seed a benchmark dataset into the configured database.
+
+Rows are tagged (``bench-subject-<n>``, ``bench-user-<n>@example.com``) and
+seeding is incremental, so re-running with the same sizes is a no-op and
+the suite can share a database with other data. Every seeded user is
+active and has the password BENCH_PASSWORD.
+
+App modules are imported inside the functions so that callers can set
+DATABASE_URL / DB_MODE before the engine is created.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.seed \\
+        --subjects 100000 --users 50000
+"""
+import argparse
+import time
+import uuid
+
+BENCH_PASSWORD = "bench-password"
+SUBJECT_PREFIX = "bench-subject-"
+USER_PREFIX = "bench-user-"
+CHUNK_SIZE = 5000
+
+
+def subject_name(index: int) -> str:
+    return f"{SUBJECT_PREFIX}{index}"
+
+
+def user_email(index: int) -> str:
+    return f"{USER_PREFIX}{index}@example.com"
+
+
+def _count(db, column, prefix: str) -> int:
+    from sqlalchemy import func, select
+
+    return db.execute(
+        select(func.count()).where(column.like(f"{prefix}%"))
+    ).scalar()
+
+
+def _insert(db, model, rows_for, start: int, total: int):
+    from sqlalchemy import insert
+
+    for chunk_start in range(start, total, CHUNK_SIZE):
+        chunk_end = min(chunk_start + CHUNK_SIZE, total)
+        db.execute(insert(model), rows_for(chunk_start, chunk_end))
+        db.commit()
+
+
+def seed(subjects: int, users: int):
+    """Top the dataset up to ``subjects`` subjects and ``users`` users."""
+    from app.core.security import _hash
+    from app.database import SessionLocal
+    from app.models.auth_user import User, UserRole
+    from app.models.subject import Subject
+
+    db = SessionLocal()
+    try:
+        existing = _count(db, Subject.name, SUBJECT_PREFIX)
+        _insert(
+            db, Subject,
+            lambda start, end: [
+                {
+                    "name": subject_name(i),
+                    "description": f"Benchmark subject {i}",
+                }
+                for i in range(start, end)
+            ],
+            existing, subjects,
+        )
+        seeded_subjects = max(subjects - existing, 0)
+
+        existing = _count(db, User.email, USER_PREFIX)
+        # One bcrypt hash shared by every user keeps seeding fast
+        password_hash = _hash(BENCH_PASSWORD)
+        _insert(
+            db, User,
+            lambda start, end: [
+                {
+                    "id": uuid.uuid4(),
+                    "first_name": "Bench",
+                    "last_name": str(i),
+                    "email": user_email(i),
+                    "password_hash": password_hash,
+                    "role": UserRole.LEARNER,
+                    "is_active": True,
+                }
+                for i in range(start, end)
+            ],
+            existing, users,
+        )
+        return seeded_subjects, max(users - existing, 0)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--subjects", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=50000)
+    args = parser.parse_args()
+
+    from app.database import prepare_schema
+
+    prepare_schema("migrate")
+
+    started = time.perf_counter()
+    new_subjects, new_users = seed(args.subjects, args.users)
+    print(
+        f"Seeded {new_subjects} subjects and {new_users} users in "
+        f"{time.perf_counter() - started:.1f}s"
+    )
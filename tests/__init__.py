@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Set before any test imports the app: test runs, and the servers
+# tests/test_startup spawns (they inherit the environment), must not write
+# into the project's logs/
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="app-test-logs-"))
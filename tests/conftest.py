@@ -1,32 +1,114 @@
 import pytest
 from fastapi.testclient import TestClient
+from fastapi import FastAPI
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import (
+    Base,
+    LazySession,
+    close_lazy_session,
+    get_async_db,
+    get_async_read_db,
+    get_db,
+    get_read_db,
+)
+from app.controllers.subject_controller import subject_cache, table_versions
+from app.core.auth import token_cache
+from app.core.config import get_async_database_url
+from app.core.idempotency import IdempotencyMiddleware, idempotency_store
+from app.core.metrics import request_latency
+from app.core.query_stats import QueryStatsMiddleware, instrument_engine
+from app.core.security import create_access_token
+from app.core.rate_limit import rate_limiter
+from app.core.revocation import revocation_store
+from app.routers.async_auth_router import router as async_auth_router
+from app.routers.async_subject_router import router as async_subject_router
 TEST_DATABASE_URL = "sqlite:///./test.db"
 
 engine = create_engine(
     TEST_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(
-    autocommit=False, autoflush=False, bind=engine
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
 )
 
+instrument_engine(engine)
+
 # Create tables
 Base.metadata.create_all(bind=engine)
 
 
-def override_get_db():
-    db = TestingSessionLocal()
+async def override_get_db():
+    db = LazySession(TestingSessionLocal, bind=engine)
     try:
         yield db
     finally:
-        db.close()
+        await close_lazy_session(db)
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+
+# Async (DB_MODE=async) routes against the same test database. NullPool
+# because TestClient may run each request on a fresh event loop.
+async_engine = create_async_engine(
+    get_async_database_url(TEST_DATABASE_URL), poolclass=NullPool
+)
+instrument_engine(async_engine.sync_engine)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+async_app = FastAPI()
+async_app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+async_app.add_middleware(QueryStatsMiddleware)
+async_app.include_router(async_subject_router)
+async_app.include_router(async_auth_router)
+async_app.dependency_overrides[get_async_db] = override_get_async_db
+async_app.dependency_overrides[get_async_read_db] = override_get_async_db
+
+
+def reset_caches():
+    # Table versions restart at 0 with the fresh schema
+    subject_cache.clear()
+    table_versions.reset()
+    rate_limiter.reset()
+    token_cache.clear()
+    revocation_store.reset()
+    idempotency_store.reset()
+    request_latency.reset()
+
+
+def query_count(response) -> int:
+    """Statements the request ran, from its Server-Timing header."""
+    timing = response.headers["server-timing"]
+    return int(timing.split('desc="', 1)[1].split(" ", 1)[0])
+
+
+def assert_max_queries(response, limit: int):
+    count = query_count(response)
+    request = response.request
+    assert count <= limit, (
+        f"{request.method} {request.url.path} ran {count} queries, "
+        f"expected at most {limit}"
+    )
+
+
+def auth_headers(user_id: str, role: str) -> dict:
+    token = create_access_token(
+        {"sub": user_id, "role": role, "type": "access"}
+    )
+    return {"Authorization": f"Bearer {token}"}
 
 
 @pytest.fixture()
@@ -34,5 +116,20 @@ def client():
     # Clear all tables before each test
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
-    
-    return TestClient(app)
\ No newline at end of file
+    reset_caches()
+
+    return TestClient(app)
+
+
+@pytest.fixture()
+def async_client():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    reset_caches()
+
+    return TestClient(async_app)
+
+
+@pytest.fixture()
+def admin_headers():
+    return auth_headers("00000000-0000-0000-0000-000000000001", "ADMIN")
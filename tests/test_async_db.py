@@ -0,0 +1,95 @@
+import pytest
+
+from app.core.config import get_async_database_url
+from app.utils.auth_service import generate_email_verification_token
+from tests.test_auth import register_active_user
+
+
+def test_async_database_url_mapping():
+    assert (
+        get_async_database_url("sqlite:///./app.db")
+        == "sqlite+aiosqlite:///./app.db"
+    )
+    assert (
+        get_async_database_url("postgresql://u:p@db:5432/x")
+        == "postgresql+asyncpg://u:p@db:5432/x"
+    )
+    with pytest.raises(ValueError):
+        get_async_database_url("mysql://u:p@db/x")
+
+
+def test_async_subject_crud(async_client):
+    response = async_client.post(
+        "/subjects/",
+        json={"name": "Programming", "description": "Tech subjects"}
+    )
+    assert response.status_code == 201
+    subject_id = response.json()["id"]
+
+    response = async_client.get(f"/subjects/{subject_id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Programming"
+
+    assert len(async_client.get("/subjects/").json()) == 1
+    search = async_client.get("/subjects/search", params={"q": "gram"})
+    assert [s["id"] for s in search.json()] == [subject_id]
+    assert async_client.delete(f"/subjects/{subject_id}").status_code == 200
+    assert async_client.get(f"/subjects/{subject_id}").status_code == 404
+
+    async_client.post("/subjects/bulk", json=[{"name": "A"}, {"name": "B"}])
+    response = async_client.post(
+        "/subjects/bulk-delete", json={"filter": {"min_id": subject_id}}
+    )
+    assert len(response.json()["deleted"]) == 2
+    response = async_client.post(
+        "/subjects/bulk-delete", json={"ids": [subject_id]}
+    )
+    assert response.json()["not_found"] == [subject_id]
+
+
+def test_async_duplicate_signup_skips_bcrypt(async_client, monkeypatch):
+    payload = {
+        "first_name": "Ada",
+        "last_name": None,
+        "email": "ada@example.com",
+        "password": "secret-password",
+    }
+    assert async_client.post("/auth/register", json=payload).status_code == 201
+
+    async def fail(password):
+        raise AssertionError("hashed a duplicate signup")
+
+    monkeypatch.setattr(
+        "app.controllers.async_auth_controller.hash_password_async", fail
+    )
+    assert async_client.post("/auth/register", json=payload).status_code == 409
+
+
+def test_async_register_and_login(async_client):
+    payload = {
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "email": "ada@example.com",
+        "password": "secret-password",
+    }
+    response = async_client.post("/auth/register", json=payload)
+    assert response.status_code == 201
+    assert async_client.post("/auth/register", json=payload).status_code == 409
+
+    login = {"email": payload["email"], "password": payload["password"]}
+    # Accounts stay inactive until the email is verified
+    assert async_client.post("/auth/login", json=login).status_code == 403
+
+    token = generate_email_verification_token(response.json()["user_id"])
+    response = async_client.get("/auth/verify-email", params={"token": token})
+    assert response.status_code == 200
+    response = async_client.get("/auth/verify-email", params={"token": token})
+    assert response.status_code == 400
+    assert async_client.post("/auth/login", json=login).status_code == 200
+
+
+def test_async_refresh_and_logout(async_client):
+    body = {"refresh_token": register_active_user(async_client)}
+    assert async_client.post("/auth/refresh", json=body).status_code == 200
+    assert async_client.post("/auth/logout", json=body).status_code == 200
+    assert async_client.post("/auth/refresh", json=body).status_code == 401
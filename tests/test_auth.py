@@ -0,0 +1,233 @@
+import time
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from passlib.context import CryptContext
+
+from app.controllers.auth_controller import (
+    change_user_password,
+    forget_user_password,
+)
+from app.core.auth import Principal, get_current_user_fresh, token_cache
+from app.core.config import ALGORITHM, SECRET_KEY
+from app.core.revocation import RevocationStore
+from app.core.security import pwd_context
+from app.models.auth_user import User, UserRole
+from app.utils.auth_service import generate_email_verification_token
+from tests.conftest import (
+    TestingSessionLocal,
+    assert_max_queries,
+    auth_headers,
+)
+
+USER_ID = "00000000-0000-0000-0000-00000000000a"
+
+
+def test_me_requires_a_valid_access_token(client):
+    assert client.get("/auth/me").status_code == 401
+    response = client.get(
+        "/auth/me", headers={"Authorization": "Bearer not-a-jwt"}
+    )
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_me_is_served_from_token_claims(client):
+    headers = auth_headers(USER_ID, "AUTHOR")
+
+    response = client.get("/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"user_id": USER_ID, "role": "AUTHOR"}
+
+    client.get("/auth/me", headers=headers)
+    assert token_cache.stats()["hits"] == 1
+
+
+def test_tampered_token_is_not_served_from_cache(client):
+    headers = auth_headers(USER_ID, "LEARNER")
+    client.get("/auth/me", headers=headers)
+
+    header, payload, signature = headers["Authorization"][7:].split(".")
+    forged = auth_headers(USER_ID, "ADMIN")["Authorization"][7:]
+    forged_payload = forged.split(".")[1]
+    response = client.get(
+        "/auth/me",
+        headers={
+            "Authorization": f"Bearer {header}.{forged_payload}.{signature}"
+        },
+    )
+    assert response.status_code == 401
+
+
+def test_require_role_rejects_other_roles(client):
+    response = client.get(
+        "/export/subjects", headers=auth_headers(USER_ID, "LEARNER")
+    )
+    assert response.status_code == 403
+
+
+def test_fresh_lookup_sees_inactive_flag(client):
+    client.post("/auth/register", json={
+        "first_name": "Ada",
+        "last_name": None,
+        "email": "ada@example.com",
+        "password": "secret-password",
+    })
+    db = TestingSessionLocal()
+    try:
+        user = db.query(User).one()
+        principal = Principal(str(user.id), UserRole.LEARNER, {})
+        with pytest.raises(HTTPException) as error:
+            get_current_user_fresh(principal, db)
+        assert error.value.status_code == 403
+    finally:
+        db.close()
+
+
+def register_active_user(client, email="grace@example.com"):
+    client.post("/auth/register", json={
+        "first_name": "Grace",
+        "last_name": None,
+        "email": email,
+        "password": "secret-password",
+    })
+    db = TestingSessionLocal()
+    try:
+        db.query(User).filter_by(email=email).update({"is_active": True})
+        db.commit()
+    finally:
+        db.close()
+    response = client.post(
+        "/auth/login", json={"email": email, "password": "secret-password"}
+    )
+    return response.json()["refresh_token"]
+
+
+def test_refresh_until_logout(client):
+    refresh_token = register_active_user(client)
+    body = {"refresh_token": refresh_token}
+
+    response = client.post("/auth/refresh", json=body)
+    assert response.status_code == 200
+    assert client.get(
+        "/auth/me",
+        headers={
+            "Authorization": f"Bearer {response.json()['access_token']}"
+        },
+    ).status_code == 200
+
+    assert client.post("/auth/logout", json=body).status_code == 200
+    assert client.post("/auth/refresh", json=body).status_code == 401
+
+
+def test_login_refresh_token_lasts_seven_days(client):
+    claims = jwt.decode(
+        register_active_user(client), SECRET_KEY, algorithms=[ALGORITHM]
+    )
+    assert claims["type"] == "refresh"
+    assert claims["exp"] - claims["iat"] == 7 * 24 * 3600
+    assert claims["exp"] - time.time() > 6 * 24 * 3600
+
+
+def test_verify_email_activates_once(client):
+    user_id = client.post("/auth/register", json={
+        "first_name": "Ada",
+        "last_name": None,
+        "email": "ada@example.com",
+        "password": "secret-password",
+    }).json()["user_id"]
+    token = generate_email_verification_token(user_id)
+
+    response = client.get("/auth/verify-email", params={"token": token})
+    assert response.status_code == 200
+    assert response.json()["email"] == "ada@example.com"
+    assert_max_queries(response, 1)
+
+    response = client.get("/auth/verify-email", params={"token": token})
+    assert response.status_code == 400
+    assert "already activated" in response.json()["detail"]
+
+
+def test_password_updates_by_id_and_email(client):
+    register_active_user(client)
+    db = TestingSessionLocal()
+    try:
+        user_id = db.query(User.id).scalar()
+        change_user_password(user_id, "changed-password", db)
+        forget_user_password("grace@example.com", "reset-password", db)
+        with pytest.raises(HTTPException) as error:
+            forget_user_password("nobody@example.com", "x-password", db)
+        assert error.value.status_code == 404
+    finally:
+        db.close()
+
+    response = client.post("/auth/login", json={
+        "email": "grace@example.com", "password": "reset-password"
+    })
+    assert response.status_code == 200
+
+
+def test_login_rehashes_outdated_cost(client):
+    register_active_user(client)
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(
+        "secret-password"
+    )
+    db = TestingSessionLocal()
+    try:
+        db.query(User).update({"password_hash": old_hash})
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post("/auth/login", json={
+        "email": "grace@example.com", "password": "secret-password"
+    })
+    assert response.status_code == 200
+    db = TestingSessionLocal()
+    try:
+        new_hash = db.query(User.password_hash).scalar()
+    finally:
+        db.close()
+    assert new_hash != old_hash
+    assert not pwd_context.needs_update(new_hash)
+    assert pwd_context.verify("secret-password", new_hash)
+
+
+def test_refresh_rejects_access_tokens(client):
+    access_token = auth_headers(USER_ID, "ADMIN")["Authorization"][7:]
+    response = client.post(
+        "/auth/refresh", json={"refresh_token": access_token}
+    )
+    assert response.status_code == 400
+
+
+def test_revocations_sync_between_workers(client):
+    refresh_token = register_active_user(client)
+    client.post("/auth/logout", json={"refresh_token": refresh_token})
+
+    # A second worker learns about the revocation from the table
+    other = RevocationStore(bucket_seconds=3600, sync_interval=0)
+    db = TestingSessionLocal()
+    try:
+        claims = jwt.get_unverified_claims(refresh_token)
+        assert other.is_revoked(db, claims["jti"], claims["exp"])
+        assert not other.is_revoked(db, uuid.uuid4().hex, claims["exp"])
+    finally:
+        db.close()
+
+
+def test_revocation_buckets_expire():
+    now = [time.time()]
+    store = RevocationStore(60, 5, clock=lambda: now[0])
+    jti = uuid.uuid4().hex
+    store.add(jti, now[0] + 30)
+    assert store.contains(jti, now[0] + 30)
+    assert store.stats()["entries"] == 1
+
+    exp = now[0] + 30
+    now[0] += 200
+    store.add(uuid.uuid4().hex, now[0] + 30)
+    assert not store.contains(jti, exp)
+    assert store.stats()["entries"] == 1
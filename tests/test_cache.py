@@ -0,0 +1,86 @@
+import sys
+import threading
+import time
+
+from app.core.cache import (
+    MemoryCacheBackend,
+    SingleFlight,
+    TableVersions,
+    etag_matches,
+)
+
+
+def test_memory_backend_lru_and_ttl():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    backend.get("a")
+    backend.set("c", 3, ttl=60)
+    assert backend.get("b") is None  # least recently used
+    assert backend.get("a") == 1
+
+    backend.set("short", 4, ttl=0)
+    assert backend.get("short") is None
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("k", load)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == ["value"] * 5
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_table_versions_survive_concurrent_writes():
+    versions = TableVersions(check_interval=60)
+    errors = []
+    done = threading.Event()
+
+    def store():
+        for i in range(20000):
+            versions._store((i, "subjects"), i)
+        done.set()
+
+    def mark_stale():
+        while not done.is_set():
+            try:
+                versions.mark_stale("users")
+            except RuntimeError as e:  # dict changed size during iteration
+                errors.append(e)
+                return
+
+    # Switch threads often so the iteration and the writes interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=f) for f in (store, mark_stale)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
@@ -0,0 +1,116 @@
+import asyncio
+
+import httpx
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.concurrency import (
+    ConcurrencyLimitMiddleware,
+    GroupLimiter,
+    route_group,
+)
+
+
+def test_route_groups():
+    assert route_group("/auth/login") == "auth"
+    assert route_group("/export/subjects.csv") == "export"
+    assert route_group("/subjects/1") == "default"
+
+
+def test_queued_request_gets_the_released_slot():
+    async def run():
+        limiter = GroupLimiter(limit=1, max_queue=1, target=1.0)
+        assert await limiter.acquire() is None
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        # Queue full
+        assert await limiter.acquire() == "queue_full"
+        limiter.release()
+        assert await waiter is None
+        assert (limiter.active, limiter.queued) == (1, 0)
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(run())
+
+
+def test_queue_time_is_bounded_by_the_target():
+    async def run():
+        limiter = GroupLimiter(limit=1, max_queue=5, target=0.05)
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.06)
+        # The queue is standing: rejected without waiting
+        assert await limiter.acquire() == "queue_time"
+        assert await first == "queue_time"
+        assert limiter.rejected == {"queue_full": 0, "queue_time": 2}
+        assert (limiter.active, limiter.queued) == (1, 0)
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    async def run():
+        limiter = GroupLimiter(limit=1, max_queue=1, target=1.0)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # The slot is handed over in the same tick the client goes away
+        limiter.release()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert (limiter.active, limiter.queued) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_excess_requests_are_shed_with_retry_after():
+    async def slow_app(scope, receive, send):
+        await asyncio.sleep(0.2)
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    limiters = {
+        "default": GroupLimiter(limit=1, max_queue=1, target=0.05),
+        "auth": GroupLimiter(limit=1, max_queue=0, target=0.05),
+    }
+    middleware = ConcurrencyLimitMiddleware(slow_app, limiters)
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=middleware),
+            base_url="http://test",
+        ) as http:
+            return await asyncio.gather(
+                http.get("/subjects/"),
+                http.get("/subjects/"),
+                http.get("/subjects/"),
+                # Another group has its own budget
+                http.post("/auth/login"),
+                # Never limited
+                http.get("/metrics"),
+            )
+
+    responses = asyncio.run(run())
+    statuses = [r.status_code for r in responses]
+    assert sorted(statuses[:3]) == [200, 503, 503]
+    assert statuses[3:] == [200, 200]
+    shed = [r for r in responses if r.status_code == 503]
+    assert all(r.headers["retry-after"] == "1" for r in shed)
+    assert limiters["default"].rejected == {
+        "queue_full": 1, "queue_time": 1
+    }
+
+
+def test_pool_timeout_is_a_fast_503(client, monkeypatch):
+    def no_connection(*args):
+        raise PoolTimeoutError("QueuePool limit reached")
+
+    monkeypatch.setattr(
+        "app.controllers.subject_controller.get_subjects", no_connection
+    )
+    response = client.get("/subjects/")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert "concurrency_rejected_total" in client.get("/metrics").text
@@ -0,0 +1,182 @@
+import socket
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import prepare_schema
+from app.models.email_outbox import EmailOutbox
+from app.utils.email_outbox import OutboxWorker
+from app.utils.email_service import SMTPEmailSender
+from tests.conftest import TestingSessionLocal
+
+USER = {
+    "first_name": "Ada",
+    "last_name": "Lovelace",
+    "email": "ada@example.com",
+    "password": "secret-password",
+}
+
+
+def _outbox():
+    db = TestingSessionLocal()
+    try:
+        return db.query(EmailOutbox).order_by(EmailOutbox.id).all()
+    finally:
+        db.close()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FailingSender:
+    def send(self, to_email, subject, body):
+        raise ConnectionRefusedError("SMTP down")
+
+    def close(self):
+        pass
+
+
+def test_register_queues_email_in_outbox(client):
+    assert client.post("/auth/register", json=USER).status_code == 201
+    # Repeated activation requests while one is pending are deduplicated
+    client.post("/auth/activate", params={"email": USER["email"]})
+
+    [message] = _outbox()
+    assert message.to_email == USER["email"]
+    assert message.status == "pending"
+    assert "/auth/verify-email?token=" in message.body
+
+
+def test_worker_delivers_batch_over_smtp(client):
+    aiosmtpd = pytest.importorskip("aiosmtpd.controller")
+    received = []
+
+    class Handler:
+        async def handle_DATA(self, server, session, envelope):
+            received.append(envelope)
+            return "250 OK"
+
+    port = _free_port()
+    smtpd = aiosmtpd.Controller(Handler(), hostname="127.0.0.1", port=port)
+    smtpd.start()
+    try:
+        client.post("/auth/register", json=USER)
+        client.post(
+            "/auth/register", json={**USER, "email": "grace@example.com"}
+        )
+        worker = OutboxWorker(
+            TestingSessionLocal,
+            sender_factory=lambda: SMTPEmailSender("127.0.0.1", port),
+        )
+        assert worker.drain_once() == 2
+    finally:
+        smtpd.stop()
+
+    assert sorted(e.rcpt_tos[0] for e in received) == [
+        "ada@example.com",
+        "grace@example.com",
+    ]
+    assert [m.status for m in _outbox()] == ["sent", "sent"]
+
+
+def test_worker_backs_off_then_gives_up(client):
+    client.post("/auth/register", json=USER)
+    worker = OutboxWorker(
+        TestingSessionLocal, sender_factory=FailingSender, max_attempts=2
+    )
+
+    worker.drain_once()
+    [message] = _outbox()
+    assert (message.status, message.attempts) == ("pending", 1)
+    assert "SMTP down" in message.last_error
+    assert message.claimed_by is None
+    # Not due again until the backoff delay has passed
+    assert worker.drain_once() == 0
+
+    db = TestingSessionLocal()
+    db.query(EmailOutbox).update({"next_attempt_at": datetime(2000, 1, 1)})
+    db.commit()
+    db.close()
+
+    worker.drain_once()
+    [message] = _outbox()
+    assert (message.status, message.attempts) == ("failed", 2)
+
+
+def test_claim_is_committed_before_sending(client):
+    client.post("/auth/register", json=USER)
+    other = OutboxWorker(TestingSessionLocal, sender_factory=FailingSender)
+    seen = []
+
+    class CheckingSender(FailingSender):
+        def send(self, to_email, subject, body):
+            # The claim is visible to other workers while SMTP runs, so a
+            # second worker (even on SQLite) finds nothing to send
+            [message] = _outbox()
+            seen.append((message.claimed_by, other.drain_once()))
+
+    worker = OutboxWorker(TestingSessionLocal, sender_factory=CheckingSender)
+    assert worker.drain_once() == 1
+
+    assert seen == [(worker.worker_id, 0)]
+    [message] = _outbox()
+    assert (message.status, message.claimed_at) == ("sent", None)
+
+
+def test_stale_claims_are_taken_over(client):
+    client.post("/auth/register", json=USER)
+    db = TestingSessionLocal()
+    db.query(EmailOutbox).update(
+        {"claimed_at": datetime.utcnow(), "claimed_by": "dead-worker"}
+    )
+    db.commit()
+    db.close()
+    sent = []
+
+    class Sender(FailingSender):
+        def send(self, to_email, subject, body):
+            sent.append(to_email)
+
+    worker = OutboxWorker(TestingSessionLocal, sender_factory=Sender)
+    assert worker.drain_once() == 0
+
+    worker.claim_timeout = 0
+    assert worker.drain_once() == 1
+    assert sent == [USER["email"]]
+
+
+def test_migrate_adds_claim_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE email_outbox (id INTEGER PRIMARY KEY, "
+            "to_email VARCHAR NOT NULL)"
+        ))
+
+    prepare_schema("migrate", engine)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("email_outbox")}
+    assert {"claimed_at", "claimed_by"} <= columns
+
+
+def test_worker_thread_survives_errors(client, monkeypatch):
+    worker = OutboxWorker(TestingSessionLocal, poll_interval=0.01)
+    calls = []
+
+    def drain_once():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("database went away")
+        worker._stop.set()
+        return 0
+
+    monkeypatch.setattr(worker, "drain_once", drain_once)
+    worker.start()
+    worker._thread.join(5)
+
+    assert not worker._thread.is_alive()
+    assert len(calls) == 3
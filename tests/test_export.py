@@ -0,0 +1,60 @@
+import csv
+import gzip
+import io
+import json
+
+from tests.conftest import auth_headers
+
+
+def _seed(client):
+    client.post(
+        "/subjects/bulk",
+        json=[{"name": f"Subject {i}", "description": "d"} for i in range(5)],
+    )
+
+
+def test_export_subjects_ndjson(client, admin_headers):
+    _seed(client)
+    response = client.get(
+        "/export/subjects",
+        headers={**admin_headers, "Accept-Encoding": "identity"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["name"] for r in rows] == [f"Subject {i}" for i in range(5)]
+
+
+def test_export_subjects_csv_gzip(client, admin_headers):
+    _seed(client)
+    with client.stream(
+        "GET",
+        "/export/subjects",
+        params={"format": "csv"},
+        headers={**admin_headers, "Accept-Encoding": "gzip"},
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        raw = b"".join(response.iter_raw())
+    rows = list(csv.reader(io.StringIO(gzip.decompress(raw).decode())))
+    assert rows[0] == ["id", "name", "description", "created_at"]
+    assert len(rows) == 6
+
+
+def test_export_users_omits_password_hash(client, admin_headers):
+    client.post("/auth/register", json={
+        "first_name": "Ada",
+        "last_name": None,
+        "email": "ada@example.com",
+        "password": "secret-password",
+    })
+    response = client.get("/export/users", headers=admin_headers)
+    [row] = [json.loads(line) for line in response.text.splitlines()]
+    assert row["email"] == "ada@example.com"
+    assert "password_hash" not in row
+
+
+def test_export_requires_admin(client):
+    learner = auth_headers("00000000-0000-0000-0000-000000000002", "LEARNER")
+    for path in ("/export/subjects", "/export/users"):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers=learner).status_code == 403
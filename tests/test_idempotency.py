@@ -0,0 +1,252 @@
+import asyncio
+import json
+
+import httpx
+
+from app.core.concurrency import ConcurrencyLimitMiddleware, GroupLimiter
+from app.core.idempotency import (
+    DatabaseIdempotencyStore,
+    IdempotencyMiddleware,
+    MemoryIdempotencyStore,
+    StoredResponse,
+)
+from tests.conftest import TestingSessionLocal, query_count
+
+USER = {
+    "first_name": "Ada",
+    "last_name": None,
+    "email": "ada@example.com",
+    "password": "secret-password",
+}
+
+
+def test_register_retry_is_replayed_without_running_the_route(client):
+    headers = {"Idempotency-Key": "signup-1"}
+    first = client.post("/auth/register", json=USER, headers=headers)
+    retry = client.post("/auth/register", json=USER, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.content == first.content
+    assert retry.headers["idempotent-replayed"] == "true"
+    # No bcrypt hash, no INSERT and no second verification email
+    assert query_count(retry) == 0
+    # Without a key the retry is a new request
+    assert client.post("/auth/register", json=USER).status_code == 409
+
+
+def test_key_reused_for_another_request_is_rejected(client):
+    headers = {"Idempotency-Key": "subject-1"}
+    first = client.post(
+        "/subjects/", json={"name": "Physics"}, headers=headers
+    )
+    other = client.post(
+        "/subjects/", json={"name": "Maths"}, headers=headers
+    )
+
+    assert first.status_code == 201
+    assert other.status_code == 422
+    assert client.get("/subjects/").json() == [first.json()]
+    assert client.post(
+        "/subjects/", json={"name": "Physics"}, headers={"Idempotency-Key": ""}
+    ).status_code == 400
+
+
+def test_async_register_retry_is_replayed(async_client):
+    headers = {"Idempotency-Key": "signup-1"}
+    first = async_client.post("/auth/register", json=USER, headers=headers)
+    retry = async_client.post("/auth/register", json=USER, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.content == first.content
+    assert query_count(retry) == 0
+
+
+def counting_app(statuses: list[int], delay: float = 0):
+    """Answers with the next status from ``statuses`` after ``delay``."""
+    calls = []
+
+    async def app(scope, receive, send):
+        message = await receive()
+        calls.append(message["body"])
+        await asyncio.sleep(delay)
+        body = json.dumps({"call": len(calls)}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": statuses[len(calls) - 1],
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    return app, calls
+
+
+def post_concurrently(app, count: int, key: str = "k", **options):
+    middleware = IdempotencyMiddleware(
+        app, MemoryIdempotencyStore(10), paths={"/items"}, **options
+    )
+
+    async def run():
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as http:
+            return await asyncio.gather(
+                *(
+                    http.post(
+                        "/items", json={"a": 1},
+                        headers={"Idempotency-Key": key},
+                    )
+                    for _ in range(count)
+                )
+            )
+
+    return asyncio.run(run())
+
+
+def test_concurrent_duplicates_wait_for_the_original():
+    app, calls = counting_app([201], delay=0.2)
+    responses = post_concurrently(app, 3)
+
+    assert len(calls) == 1
+    assert [r.status_code for r in responses] == [201] * 3
+    assert {r.json()["call"] for r in responses} == {1}
+    replayed = [r for r in responses if "idempotent-replayed" in r.headers]
+    assert len(replayed) == 2
+
+
+def test_duplicate_gives_up_after_the_wait_limit():
+    app, calls = counting_app([201], delay=0.3)
+    responses = post_concurrently(app, 2, wait_seconds=0.05)
+
+    assert len(calls) == 1
+    assert sorted(r.status_code for r in responses) == [201, 409]
+
+
+def test_retryable_responses_are_not_stored():
+    app, calls = counting_app([503, 201])
+    middleware = IdempotencyMiddleware(
+        app, MemoryIdempotencyStore(10), paths={"/items"}
+    )
+
+    async def post():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=middleware),
+            base_url="http://test",
+        ) as http:
+            return await http.post(
+                "/items", json={}, headers={"Idempotency-Key": "k"}
+            )
+
+    assert asyncio.run(post()).status_code == 503
+    assert asyncio.run(post()).status_code == 201
+    assert asyncio.run(post()).status_code == 201
+    assert len(calls) == 2
+
+
+def test_memory_store_is_bounded():
+    store = MemoryIdempotencyStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        assert store.begin(key, "f", lock_until=10, now=0) is None
+    assert len(store) == 2
+    # "a" was evicted, so it can be claimed again
+    assert store.begin("a", "f", lock_until=10, now=0) is None
+
+
+def test_database_store_is_shared_and_expires(client):
+    store = DatabaseIdempotencyStore(TestingSessionLocal)
+    other = DatabaseIdempotencyStore(TestingSessionLocal)
+
+    assert store.begin("k", "f1", lock_until=60, now=0) is None
+    assert other.begin("k", "f1", lock_until=60, now=1).pending
+
+    store.complete(
+        "k", StoredResponse("f1", 201, [["x", "1"]], b"{}", expires_at=100)
+    )
+    stored = other.begin("k", "f1", lock_until=61, now=1)
+    assert (stored.status, stored.headers, stored.body) == (
+        201, [["x", "1"]], b"{}"
+    )
+    # Expired rows are taken over by the next request
+    assert other.begin("k", "f2", lock_until=160, now=100) is None
+    other.release("k")
+    assert store.begin("k", "f3", lock_until=160, now=100) is None
+
+
+def test_waiting_duplicate_gives_its_concurrency_slot_back():
+    app, calls = counting_app([201, 201], delay=0.3)
+    limiter = GroupLimiter(limit=2, max_queue=0, target=1)
+    middleware = ConcurrencyLimitMiddleware(
+        IdempotencyMiddleware(
+            app, MemoryIdempotencyStore(10), paths={"/items"}
+        ),
+        limiters={"default": limiter},
+    )
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=middleware),
+            base_url="http://test",
+        ) as http:
+            async def post(key, delay):
+                await asyncio.sleep(delay)
+                return await http.post(
+                    "/items", json={"a": 1},
+                    headers={"Idempotency-Key": key},
+                )
+
+            return await asyncio.gather(
+                post("k", 0), post("k", 0.05), post("other", 0.1)
+            )
+
+    original, duplicate, unrelated = asyncio.run(run())
+
+    # Both slots were taken until the duplicate started waiting
+    assert unrelated.status_code == 201
+    assert duplicate.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 2
+    assert limiter.active == 0
+
+
+def test_waiting_on_another_worker_backs_off():
+    store = MemoryIdempotencyStore(10)
+    begins = []
+
+    class CountingStore:
+        blocking = False
+
+        def __getattr__(self, name):
+            return getattr(store, name)
+
+        def begin(self, *args):
+            begins.append(args)
+            return store.begin(*args)
+
+    app, calls = counting_app([201], delay=1.5)
+    # Two workers sharing the store
+    first = IdempotencyMiddleware(app, store, paths={"/items"})
+    second = IdempotencyMiddleware(
+        app, CountingStore(), paths={"/items"},
+        wait_seconds=1, max_poll_interval=0.4,
+    )
+
+    async def post(worker, delay):
+        await asyncio.sleep(delay)
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=worker),
+            base_url="http://test",
+        ) as http:
+            return await http.post(
+                "/items", json={"a": 1}, headers={"Idempotency-Key": "k"}
+            )
+
+    async def run():
+        return await asyncio.gather(post(first, 0), post(second, 0.05))
+
+    original, duplicate = asyncio.run(run())
+
+    assert (original.status_code, duplicate.status_code) == (201, 409)
+    assert len(calls) == 1
+    # 0.05, 0.1, 0.2, 0.4, 0.4 s apart rather than every 0.05 s
+    assert len(begins) <= 7
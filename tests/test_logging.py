@@ -0,0 +1,72 @@
+import threading
+
+from app.core.logger import (
+    BackgroundSink,
+    LevelSampler,
+    configure_logging,
+    flush_logs,
+    logger,
+)
+
+
+class Probe:
+    calls = 0
+
+    def __str__(self):
+        Probe.calls += 1
+        return "probe"
+
+
+def make_record(level_name: str):
+    return {"level": logger.level(level_name), "extra": {}}
+
+
+def test_disabled_levels_are_not_formatted():
+    logger.trace("Never shown: {}", Probe())
+    assert Probe.calls == 0
+
+
+def test_sampler_drops_debug_but_never_errors():
+    sampler = LevelSampler({"DEBUG": 0.01, "ERROR": 0.01}, rng=lambda: 0.5)
+    records = {
+        name: make_record(name) for name in ("DEBUG", "INFO", "ERROR")
+    }
+    for record in records.values():
+        sampler.patch(record)
+
+    assert not LevelSampler.keep(records["DEBUG"])
+    assert LevelSampler.keep(records["INFO"])
+    assert LevelSampler.keep(records["ERROR"])
+
+
+def test_background_sink_drops_instead_of_blocking():
+    written, release = [], threading.Event()
+
+    def slow_target(line):
+        release.wait()
+        written.append(line)
+
+    sink = BackgroundSink(slow_target, max_lines=2)
+    for i in range(10):
+        sink.write(f"line {i}\n")
+    assert sink.dropped > 0
+
+    release.set()
+    sink.join()
+    assert written[0] == "line 0\n"
+    assert len(written) == 10 - sink.dropped
+    sink.stop()
+
+
+def test_worker_writes_its_own_log_files(tmp_path):
+    configure_logging(directory=str(tmp_path), console=None, worker=2)
+    try:
+        logger.error("From worker two")
+        flush_logs()
+    finally:
+        configure_logging()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "app-worker-2.log", "error-worker-2.log"
+    ]
+    assert "From worker two" in (tmp_path / "app-worker-2.log").read_text()
@@ -0,0 +1,71 @@
+import threading
+
+from app.core.metrics import Histogram
+from app.database import get_engine
+
+
+def metric_lines(client, prefix: str) -> list[str]:
+    return [
+        line for line in client.get("/metrics").text.splitlines()
+        if line.startswith(prefix)
+    ]
+
+
+def test_latency_is_labelled_by_route_template(client):
+    created = client.post(
+        "/subjects/", json={"name": "Math", "description": "Numbers"}
+    ).json()
+    client.get(f"/subjects/{created['id']}")
+    client.get("/subjects/999999")
+
+    counts = metric_lines(client, "http_request_duration_seconds_count")
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/subjects/{subject_id}",status="200"} 1'
+    ) in counts
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/subjects/{subject_id}",status="404"} 1'
+    ) in counts
+
+
+def test_metrics_exposes_pool_and_executor_gauges(client):
+    # Pools are reported once their engine has been built
+    get_engine()
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'db_pool_checked_out{engine="sync"}' in response.text
+    assert "cpu_executor_queue_depth " in response.text
+    assert "password_hash_rounds " in response.text
+    assert 'http_requests_in_flight{route="/metrics"} 1' in response.text
+
+
+def test_histogram_merges_per_thread_counters():
+    histogram = Histogram((0.1, 1.0))
+
+    def observe():
+        for _ in range(1000):
+            histogram.observe(0.5, ("GET",))
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    histogram.observe(0.05, ("GET",))
+    histogram.observe(5, ("GET",))
+
+    counts = histogram.collect()[("GET",)]
+    assert counts[:3] == [1, 4000, 1]
+    assert counts[-1] == 4000 * 0.5 + 0.05 + 5
+
+
+def test_histogram_folds_in_exited_threads():
+    histogram = Histogram((0.1, 1.0))
+    for _ in range(50):
+        thread = threading.Thread(target=histogram.observe, args=(0.5,))
+        thread.start()
+        thread.join()
+
+    assert len(histogram._shards) == 0
+    assert histogram.collect()[()][:3] == [0, 50, 0]
@@ -0,0 +1,87 @@
+from sqlalchemy import text
+
+from app.core.query_stats import (
+    QueryStats,
+    current_query_stats,
+    redact_parameters,
+)
+from tests.conftest import TestingSessionLocal, assert_max_queries, query_count
+
+
+def test_server_timing_reports_request_queries(client):
+    created = client.post(
+        "/subjects/", json={"name": "Physics", "description": "Forces"}
+    )
+    assert query_count(created) >= 1
+    assert created.headers["server-timing"].startswith("db;dur=")
+
+    response = client.get(f"/subjects/{created.json()['id']}")
+    assert_max_queries(response, 2)
+    # Served from the read cache
+    assert_max_queries(client.get(f"/subjects/{created.json()['id']}"), 0)
+
+
+def test_writes_use_single_statements(client, monkeypatch):
+    response = client.post("/auth/register", json={
+        "first_name": "Ada",
+        "last_name": None,
+        "email": "ada@example.com",
+        "password": "secret-password",
+    })
+    # Email lookup, then the user and outbox inserts
+    assert_max_queries(response, 3)
+
+    hashes = []
+    monkeypatch.setattr(
+        "app.controllers.auth_controller.hash_password", hashes.append
+    )
+    response = client.post("/auth/register", json={
+        "first_name": "Ada",
+        "last_name": None,
+        "email": "ada@example.com",
+        "password": "other-password",
+    })
+    assert response.status_code == 409
+    # Rejected by the lookup, before any bcrypt work
+    assert_max_queries(response, 1)
+    assert hashes == []
+
+    created = client.post("/subjects/", json={"name": "Physics"})
+    # INSERT and the table version bump
+    assert_max_queries(created, 2)
+    subject_id = created.json()["id"]
+    assert_max_queries(client.delete(f"/subjects/{subject_id}"), 2)
+    response = client.delete(f"/subjects/{subject_id}")
+    assert response.status_code == 404
+    assert_max_queries(response, 1)
+
+
+def test_async_routes_are_counted(async_client):
+    response = async_client.get("/subjects/1")
+    assert response.status_code == 404
+    assert query_count(response) >= 1
+
+
+def test_repeated_statements_are_flagged():
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    db = TestingSessionLocal()
+    try:
+        for subject_id in range(6):
+            db.execute(
+                text("SELECT name FROM subjects WHERE id = :id"),
+                {"id": subject_id},
+            )
+    finally:
+        db.close()
+        current_query_stats.reset(token)
+
+    assert stats.count == 6
+    [(statement, count)] = stats.repeated(5)
+    assert "WHERE id = ?" in statement and count == 6
+
+
+def test_slow_query_parameters_are_redacted():
+    assert redact_parameters({"email": "a@b.c"}) == {"email": "?"}
+    assert redact_parameters(("secret", 1)) == ["?", "?"]
+    assert redact_parameters([("a",), ("b",)]) == "<2 parameter sets>"
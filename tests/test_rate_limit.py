@@ -0,0 +1,149 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.rate_limit import (
+    DatabaseRateLimitStorage,
+    MemoryRateLimitStorage,
+    RateLimit,
+    RateLimiter,
+)
+from tests.conftest import TestingSessionLocal
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_sliding_window_rejects_then_recovers():
+    clock = FakeClock()
+    limiter = RateLimiter(MemoryRateLimitStorage(100), clock=clock)
+    rule = RateLimit("login:email", limit=3, window=60)
+
+    assert [limiter.check(rule, "a@x.io") for _ in range(3)] == [None] * 3
+    assert limiter.check(rule, "a@x.io") > 0
+    # Other keys have their own budget
+    assert limiter.check(rule, "b@x.io") is None
+
+    # Half way into the next window half of the old hits still count
+    clock.now += 90
+    assert limiter.check(rule, "a@x.io") is None
+    clock.now += 60
+    assert [limiter.check(rule, "a@x.io") for _ in range(2)] == [None] * 2
+
+    assert limiter.stats()["rules"]["login:email"]["rejected"] == 1
+
+
+def test_memory_storage_is_bounded():
+    storage = MemoryRateLimitStorage(max_keys=2)
+    for key in ("a", "b", "c"):
+        storage.hit(key, 1)
+    assert storage.size() == 2
+    assert storage.get("a", 1) == 0
+
+
+def test_database_storage_shares_counts(client):
+    storage = DatabaseRateLimitStorage(TestingSessionLocal)
+    assert storage.hit("login:ip:1.2.3.4", 7) == (1, 0)
+    assert storage.hit("login:ip:1.2.3.4", 7) == (2, 0)
+    # A second worker sees the same counters
+    other = DatabaseRateLimitStorage(TestingSessionLocal)
+    assert other.get("login:ip:1.2.3.4", 7) == 2
+    assert other.hit("login:ip:1.2.3.4", 8) == (1, 2)
+    other.undo("login:ip:1.2.3.4", 7)
+    assert storage.get("login:ip:1.2.3.4", 7) == 1
+
+
+def check_concurrently(limiter, rule, count):
+    barrier = threading.Barrier(count)
+
+    def check():
+        barrier.wait()
+        return limiter.check(rule, "a@x.io")
+
+    with ThreadPoolExecutor(count) as pool:
+        return list(pool.map(lambda _: check(), range(count)))
+
+
+def test_concurrent_hits_never_exceed_the_limit(client):
+    rule = RateLimit("login:email", limit=5, window=60)
+    for storage in (
+        MemoryRateLimitStorage(100),
+        DatabaseRateLimitStorage(TestingSessionLocal),
+    ):
+        limiter = RateLimiter(storage, clock=FakeClock())
+        results = check_concurrently(limiter, rule, 12)
+
+        assert results.count(None) == 5
+        # Rejected hits were taken back
+        assert storage.get("login:email:a@x.io", 16) == 5
+
+
+def test_login_is_rejected_before_password_check(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "app.routers.auth_router.authenticate_user",
+        lambda *args: calls.append(args) or {},
+    )
+    credentials = {"email": "ada@example.com", "password": "wrong"}
+    for _ in range(5):
+        assert client.post("/auth/login", json=credentials).status_code == 200
+
+    response = client.post("/auth/login", json=credentials)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert len(calls) == 5
+
+
+def test_rejection_by_one_rule_takes_back_the_others():
+    storage = MemoryRateLimitStorage(100)
+    limiter = RateLimiter(storage, clock=FakeClock())
+    per_ip = RateLimit("login:ip", limit=10, window=60)
+    per_email = RateLimit("login:email", limit=1, window=60)
+    checks = [(per_ip, "1.2.3.4"), (per_email, "a@x.io")]
+
+    assert limiter.check_all(checks) is None
+    rule, key, retry_after = limiter.check_all(checks)
+
+    assert (rule, key) == (per_email, "a@x.io") and retry_after > 0
+    assert storage.get("login:ip:1.2.3.4", 16) == 1
+    assert storage.get("login:email:a@x.io", 16) == 1
+
+
+def test_rate_limit_counters_are_exported(client, monkeypatch):
+    monkeypatch.setattr(
+        "app.routers.auth_router.authenticate_user", lambda *args: {}
+    )
+    credentials = {"email": "ada@example.com", "password": "wrong"}
+    for _ in range(6):
+        client.post("/auth/login", json=credentials)
+
+    text = client.get("/metrics").text
+    assert (
+        'rate_limit_checks_total{rule="login:email",outcome="allowed"} 5'
+    ) in text
+    assert (
+        'rate_limit_checks_total{rule="login:email",outcome="rejected"} 1'
+    ) in text
+    assert "rate_limit_tracked_keys 2" in text
+
+
+def test_concurrent_logins_admit_exactly_the_limit(client, monkeypatch):
+    monkeypatch.setattr(
+        "app.routers.auth_router.authenticate_user", lambda *args: {}
+    )
+    credentials = {"email": "ada@example.com", "password": "wrong"}
+    barrier = threading.Barrier(12)
+
+    def login(_):
+        barrier.wait()
+        return client.post("/auth/login", json=credentials).status_code
+
+    with ThreadPoolExecutor(12) as pool:
+        statuses = list(pool.map(login, range(12)))
+
+    assert statuses.count(200) == 5
+    assert statuses.count(429) == 7
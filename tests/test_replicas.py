@@ -0,0 +1,118 @@
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.replicas import (
+    PRIMARY_COOKIE,
+    ReadYourWritesMiddleware,
+    ReplicaRouter,
+    open_read_session,
+    pinned_to_primary,
+)
+from app.database import Base, get_db, get_read_db
+from app.models.subject import Subject
+from app.routers.subject_router import router as subject_router
+from tests.conftest import TestingSessionLocal, override_get_db
+
+
+def replica_factory(path, subjects=()):
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with factory() as db:
+        db.add_all(Subject(name=name, description=name) for name in subjects)
+        db.commit()
+    return factory
+
+
+def broken_factory(tmp_path):
+    # SQLite can't create a file in a missing directory
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'r.db'}")
+    return sessionmaker(bind=engine)
+
+
+def replica_app(router: ReplicaRouter) -> FastAPI:
+    def override_get_read_db(request: Request):
+        db = open_read_session(request, router, TestingSessionLocal)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, seconds=5)
+    app.include_router(subject_router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    return app
+
+
+def request_with(cookies=None):
+    return SimpleNamespace(cookies=cookies or {})
+
+
+def test_reads_use_replica_until_client_writes(client, tmp_path):
+    factory = replica_factory(tmp_path / "replica.db", ["Replica copy"])
+    app = replica_app(ReplicaRouter([factory], eject_seconds=30))
+    writer = TestClient(app)
+
+    # The primary (test.db) is empty, so this can only come from the replica
+    assert writer.get("/subjects/1").json()["name"] == "Replica copy"
+
+    response = writer.post(
+        "/subjects/", json={"name": "Math", "description": "Numbers"}
+    )
+    assert response.status_code == 201
+    assert PRIMARY_COOKIE in response.headers["set-cookie"]
+    assert writer.get("/subjects/1").json()["name"] == "Math"
+
+    # Other clients keep reading the (lagging) replica
+    assert TestClient(app).get("/subjects/1").json()["name"] == "Replica copy"
+
+
+def test_round_robin_skips_ejected_replica(tmp_path):
+    now = [0.0]
+    good = replica_factory(tmp_path / "good.db", ["Good"])
+    router = ReplicaRouter(
+        [broken_factory(tmp_path), good], eject_seconds=30,
+        clock=lambda: now[0],
+    )
+
+    for _ in range(4):
+        db = open_read_session(request_with(), router, TestingSessionLocal)
+        try:
+            assert db.get_bind() is good.kw["bind"]
+        finally:
+            db.close()
+    assert router.ejected() == [0]
+
+    now[0] = 31
+    assert router.ejected() == []
+    assert sorted(router.candidates()) == [0, 1]
+
+
+def test_all_replicas_down_falls_back_to_primary(tmp_path):
+    router = ReplicaRouter([broken_factory(tmp_path)], eject_seconds=30)
+
+    db = open_read_session(request_with(), router, TestingSessionLocal)
+    try:
+        assert db.get_bind() is TestingSessionLocal.kw["bind"]
+    finally:
+        db.close()
+
+
+def test_primary_pin_expires():
+    assert pinned_to_primary(
+        request_with({PRIMARY_COOKIE: str(time.time() + 5)})
+    )
+    assert not pinned_to_primary(
+        request_with({PRIMARY_COOKIE: str(time.time() - 1)})
+    )
+    assert not pinned_to_primary(request_with({PRIMARY_COOKIE: "junk"}))
+    assert not pinned_to_primary(request_with())
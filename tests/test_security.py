@@ -0,0 +1,77 @@
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.core.executor import CPUExecutor, ExecutorSaturatedError
+from app.core.metrics import password_hash_seconds
+from app.core.security import (
+    calibrate_rounds,
+    hash_password,
+    verify_password,
+)
+
+
+def test_hash_and_verify_run_on_executor():
+    hashed = hash_password("secret-password")
+    assert hashed != "secret-password"
+    assert verify_password("secret-password", hashed)
+    assert not verify_password("wrong-password", hashed)
+
+    timings = password_hash_seconds.collect()
+    assert sum(timings[("hash",)][:-1]) >= 1
+    assert sum(timings[("verify",)][:-1]) >= 2
+
+
+def test_calibration_stops_at_first_cost_over_target():
+    chosen, timings = calibrate_rounds(0, min_rounds=4, max_rounds=6)
+    # Nothing fits a zero budget: the minimum is used, one cost timed
+    assert chosen == 4
+    assert list(timings) == [4]
+
+    chosen, timings = calibrate_rounds(60, min_rounds=4, max_rounds=5)
+    assert chosen == 5
+    assert timings[5] > 0
+
+
+def test_executor_rejects_when_queue_is_full():
+    executor = CPUExecutor("thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        running = executor.submit(release.wait)
+        queued = executor.submit(release.wait)
+        with pytest.raises(ExecutorSaturatedError):
+            executor.submit(release.wait)
+        assert executor.stats()["queue_depth"] == 1
+        assert executor.stats()["rejected"] == 1
+    finally:
+        release.set()
+    running.result()
+    queued.result()
+    executor.shutdown()
+    assert executor.stats()["completed"] == 2
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_executor_counts_cancelled_and_failed_resubmits(monkeypatch):
+    executor = CPUExecutor("thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+    running = executor.submit(release.wait)
+    queued = executor.submit(release.wait)
+    assert queued.cancel()
+    release.set()
+    running.result()
+    executor.shutdown()
+    stats = executor.stats()
+    assert (stats["completed"], stats["failed"]) == (1, 1)
+    assert stats["in_flight"] == 0
+
+    class BrokenPool:
+        def submit(self, fn, *args):
+            raise BrokenProcessPool("worker died")
+
+    # The thread pool it falls back to is broken too
+    monkeypatch.setattr(executor, "_get_pool", lambda: BrokenPool())
+    with pytest.raises(BrokenProcessPool):
+        executor.submit(release.wait)
+    assert executor.stats()["in_flight"] == 0
@@ -0,0 +1,83 @@
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import TimedQueuePool, pool_hold
+from app.database import LazySession
+from tests.conftest import TestingSessionLocal, engine
+
+
+def counting_factory(opened: list):
+    def open_session():
+        opened.append(1)
+        return TestingSessionLocal()
+
+    return open_session
+
+
+def test_lazy_session_opens_on_first_use():
+    opened = []
+    db = LazySession(counting_factory(opened), bind=engine)
+
+    # The table-version cache check only needs the bind
+    assert db.get_bind() is engine
+    db.close()
+    assert opened == [] and not db.opened
+
+    assert db.execute(text("SELECT 1")).scalar() == 1
+    db.execute(text("SELECT 2"))
+    assert opened == [1] and db.opened
+    db.close()
+    assert not db.opened
+
+
+def test_cached_read_never_checks_out_a_connection(client, monkeypatch):
+    created = client.post("/subjects/", json={"name": "Physics"}).json()
+    path = f"/subjects/{created['id']}"
+    client.get(path)
+
+    checkouts = []
+    original = engine.pool._do_get
+    monkeypatch.setattr(
+        engine.pool, "_do_get", lambda: checkouts.append(1) or original()
+    )
+    assert client.get(path).status_code == 200
+    # Rejected before the route ran
+    assert client.get("/subjects/search?q=").status_code == 422
+    assert checkouts == []
+
+
+def test_connection_is_returned_before_the_response_is_sent(client):
+    client.post("/subjects/", json={"name": "Physics"})
+    checked_out_at_send = []
+
+    def record(message):
+        if message["type"] == "http.response.start":
+            checked_out_at_send.append(engine.pool.checkedout())
+
+    app = client.app
+    inner = app.middleware_stack or app.build_middleware_stack()
+
+    async def spy(scope, receive, send):
+        async def send_and_record(message):
+            record(message)
+            await send(message)
+
+        await inner(scope, receive, send_and_record)
+
+    app.middleware_stack = spy
+    try:
+        response = client.get("/subjects/", params={"limit": 5})
+    finally:
+        app.middleware_stack = inner
+    assert response.status_code == 200
+    assert checked_out_at_send == [0]
+
+
+def test_pool_records_connection_hold_time(tmp_path):
+    timed = create_engine(
+        f"sqlite:///{tmp_path / 'hold.db'}", poolclass=TimedQueuePool
+    )
+    before = sum(pool_hold.collect().get(("sync",), [0])[:-1])
+    with timed.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    after = sum(pool_hold.collect()[("sync",)][:-1])
+    assert after == before + 1
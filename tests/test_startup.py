@@ -0,0 +1,220 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from app.database import prepare_schema, warm_pool
+
+STARTUP_SCRIPT = """
+import json, os
+import app.main
+from app.database import created_engines
+imported_engines = list(created_engines())
+db_created_on_import = os.path.exists(os.environ["DB_PATH"])
+
+from fastapi.testclient import TestClient
+from app.core.metrics import startup_seconds
+from app.database import get_engine
+
+with TestClient(app.main.app):
+    print(json.dumps({
+        "imported_engines": imported_engines,
+        "db_created_on_import": db_created_on_import,
+        "startup": startup_seconds,
+        "pooled": get_engine().pool.checkedin(),
+    }))
+"""
+
+
+def test_root_endpoint(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.json() == {"Hello": "World"}
+
+
+def test_import_is_lazy_and_lifespan_prepares_database(tmp_path):
+    db_path = tmp_path / "startup.db"
+    env = {
+        **os.environ,
+        "DB_PATH": str(db_path),
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "DB_MODE": "sync",
+        "DB_SCHEMA_MODE": "migrate",
+        "DB_POOL_WARMUP": "3",
+        "EMAIL_OUTBOX_WORKER": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result["imported_engines"] == []
+    assert result["db_created_on_import"] is False
+    assert set(result["startup"]) == {
+        "import", "schema", "pool_warmup", "total"
+    }
+    assert result["pooled"] == 3
+    assert "subjects" in inspect(
+        create_engine(f"sqlite:///{db_path}")
+    ).get_table_names()
+
+
+def test_schema_check_mode_requires_tables():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+
+    prepare_schema("skip", engine)
+    assert inspect(engine).get_table_names() == []
+    with pytest.raises(RuntimeError, match="missing tables"):
+        prepare_schema("check", engine)
+
+    prepare_schema("migrate", engine)
+    prepare_schema("check", engine)
+
+
+def test_warm_pool_is_capped_at_pool_size(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'warm.db'}", pool_size=2, max_overflow=5
+    )
+
+    assert warm_pool(engine, 10) == 2
+    assert engine.pool.checkedin() == 2
+    assert warm_pool(create_engine("sqlite://"), 3) == 0
+
+
+def test_migrate_indexes_existing_subjects_for_search(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        # A subjects table from before the search index existed
+        connection.execute(text(
+            "CREATE TABLE subjects (id INTEGER PRIMARY KEY, "
+            "name VARCHAR(100) NOT NULL UNIQUE, description VARCHAR(255), "
+            "created_at DATETIME)"
+        ))
+        connection.execute(
+            text("INSERT INTO subjects (name) VALUES ('Geography')")
+        )
+
+    prepare_schema("migrate", engine)
+
+    with engine.connect() as connection:
+        assert connection.execute(text(
+            "SELECT rowid FROM subjects_fts WHERE subjects_fts MATCH 'graph'"
+        )).all() == [(1,)]
+
+
+FORK_SCRIPT = """
+import json, os, threading
+from app.database import get_engine
+
+engine = get_engine()
+engine.connect().close()
+read, write = os.pipe()
+pid = os.fork()
+if pid == 0:
+    os.write(write, json.dumps({
+        "pooled": engine.pool.checkedin(),
+        "log_writers": sorted(
+            t.name for t in threading.enumerate() if t.name.startswith("log-")
+        ),
+    }).encode())
+    os._exit(0)
+os.waitpid(pid, 0)
+child = json.loads(os.read(read, 4096))
+print(json.dumps({"child": child, "parent_pooled": engine.pool.checkedin()}))
+"""
+
+
+def test_forked_worker_gets_fresh_pool_and_log_writers(tmp_path):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'fork.db'}",
+        "LOG_LEVEL": "WARNING",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", FORK_SCRIPT],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result["child"]["pooled"] == 0
+    assert result["parent_pooled"] == 1
+    assert result["child"]["log_writers"] == ["log-console", "log-files"]
+
+
+def test_limits_are_split_between_workers():
+    env = {
+        **os.environ, "WEB_WORKERS": "4", "DB_MAX_CONNECTIONS": "60",
+        "REQUEST_QUEUE_TARGET_MS": "1500",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", (
+            "from app.core import config as c; print(c.DB_POOL_SIZE, "
+            "c.DB_MAX_OVERFLOW, c.THREADPOOL_THREADS, "
+            "c.CONCURRENCY_LIMIT_DEFAULT, c.CONCURRENCY_LIMIT_AUTH, "
+            "c.CONCURRENCY_LIMIT_EXPORT, c.DB_POOL_TIMEOUT)"
+        )],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    assert output.split() == ["5", "10", "15", "15", "7", "1", "3.0"]
+
+
+def test_pool_limits_apply_outside_production(tmp_path):
+    env = {
+        **os.environ, "ENVIRONMENT": "staging", "WEB_WORKERS": "4",
+        "DB_MAX_CONNECTIONS": "60", "DB_MODE": "sync",
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'staging.db'}",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", (
+            "from app.database import _build_engine as b; p = b().pool; "
+            "print(p.size(), p._max_overflow, p._timeout)"
+        )],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    assert output.split()[-3:] == ["5", "10", "1.0"]
+
+
+def test_server_forks_workers_on_one_socket(tmp_path):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'server.db'}",
+        "DB_MODE": "sync",
+        "DB_SCHEMA_MODE": "migrate",
+        "EMAIL_OUTBOX_WORKER": "false",
+        "LOG_LEVEL": "WARNING",
+        "WEB_WORKERS": "2",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1",
+         "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/subjects/"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                response = httpx.post(url, json={"name": "Physics"})
+                break
+            except httpx.TransportError:
+                assert time.monotonic() < deadline, "server did not start"
+                time.sleep(0.2)
+        assert response.status_code == 201
+        # Schema was created once by the master, before the fork
+        assert [s["name"] for s in httpx.get(url).json()] == ["Physics"]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=30) == 0
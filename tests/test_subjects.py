@@ -1,3 +1,6 @@
+from tests.conftest import query_count
+
+
 def test_create_subject(client):
     response = client.post(
         "/subjects/",
@@ -7,7 +10,259 @@ def test_create_subject(client):
     assert response.json()["name"] == "Programming"
 
 
+def test_subject_responses_match_schema_without_revalidation(client):
+    created = client.post(
+        "/subjects/", json={"name": "Música", "description": None}
+    )
+    assert created.status_code == 201
+    assert created.headers["content-type"] == "application/json"
+    subject = created.json()
+    assert subject == {
+        "id": subject["id"], "name": "Música", "description": None
+    }
+
+    assert client.get(f"/subjects/{subject['id']}").json() == subject
+    assert client.get("/subjects/").json() == [subject]
+
+    bulk = client.post("/subjects/bulk", json=[{"name": "Art"}])
+    assert bulk.status_code == 201
+    assert bulk.json()["created"] == [
+        {"id": subject["id"] + 1, "name": "Art", "description": None}
+    ]
+
+
 def test_list_subjects(client):
     response = client.get("/subjects/")
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
\ No newline at end of file
+    assert isinstance(response.json(), list)
+
+
+def test_list_subjects_keyset_pagination(client):
+    for i in range(5):
+        client.post("/subjects/", json={"name": f"Subject {i}"})
+
+    first = client.get("/subjects/", params={"limit": 2})
+    assert first.status_code == 200
+    assert [s["name"] for s in first.json()] == ["Subject 0", "Subject 1"]
+    assert first.headers["X-Total-Count"] == "5"
+
+    seen = first.json()
+    cursor = first.headers["X-Next-Cursor"]
+    while cursor:
+        page = client.get("/subjects/", params={"limit": 2, "after": cursor})
+        seen += page.json()
+        cursor = page.headers.get("X-Next-Cursor")
+    assert [s["name"] for s in seen] == [f"Subject {i}" for i in range(5)]
+
+
+def test_list_subjects_field_projection(client):
+    client.post("/subjects/", json={"name": "Math", "description": "Numbers"})
+
+    response = client.get("/subjects/", params={"fields": "name"})
+    assert response.json() == [{"name": "Math"}]
+
+    response = client.get("/subjects/", params={"fields": "secret"})
+    assert response.status_code == 400
+    response = client.get("/subjects/", params={"after": "junk"})
+    assert response.status_code == 400
+
+
+def test_get_subject_etag_and_not_modified(client):
+    response = client.post("/subjects/", json={"name": "Physics"})
+    subject_id = response.json()["id"]
+
+    first = client.get(f"/subjects/{subject_id}")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get(
+        f"/subjects/{subject_id}", headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+def test_subject_cache_invalidated_by_writes(client):
+    assert client.get("/subjects/").json() == []
+    etag = client.get("/subjects/").headers["ETag"]
+
+    subject_id = client.post("/subjects/", json={"name": "Art"}).json()["id"]
+    response = client.get("/subjects/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [s["name"] for s in response.json()] == ["Art"]
+
+    client.delete(f"/subjects/{subject_id}")
+    assert client.get(f"/subjects/{subject_id}").status_code == 404
+    assert client.get("/subjects/").json() == []
+
+
+def test_bulk_create_reports_conflicts_per_row(client):
+    client.post("/subjects/", json={"name": "Existing"})
+
+    response = client.post(
+        "/subjects/bulk",
+        json=[
+            {"name": "Biology", "description": "Life"},
+            {"name": "Existing"},
+            {"name": "Chemistry"},
+            {"name": "Biology"},
+        ],
+    )
+    assert response.status_code == 201
+    body = response.json()
+    assert [s["name"] for s in body["created"]] == ["Biology", "Chemistry"]
+    assert [(c["index"], c["name"]) for c in body["conflicts"]] == [
+        (1, "Existing"),
+        (3, "Biology"),
+    ]
+    assert client.get("/subjects/").headers["X-Total-Count"] == "3"
+
+
+def test_search_subjects_ranks_prefix_matches_first(client):
+    client.post("/subjects/bulk", json=[
+        {"name": "Music", "description": "Learn to program a synthesizer"},
+        {"name": "Programming", "description": "Tech subjects"},
+        {"name": "Art", "description": None},
+        {"name": "Reprogramming habits", "description": None},
+    ])
+
+    response = client.get("/subjects/search", params={"q": "PROG"})
+    assert response.status_code == 200
+    # Name prefix, then name substring, then description-only matches
+    names = [s["name"] for s in response.json()]
+    assert names == ["Programming", "Reprogramming habits", "Music"]
+    assert "X-Next-Offset" not in response.headers
+
+    first = client.get("/subjects/search", params={"q": "prog", "limit": 2})
+    assert first.headers["X-Next-Offset"] == "2"
+    rest = client.get(
+        "/subjects/search", params={"q": "prog", "limit": 2, "offset": 2}
+    )
+    assert [s["name"] for s in first.json() + rest.json()] == names
+
+
+def test_search_keeps_the_exact_match_when_over_the_cap(
+    client, monkeypatch
+):
+    monkeypatch.setattr(
+        "app.controllers.subject_controller.SUBJECT_SEARCH_MAX_CANDIDATES", 3
+    )
+    client.post("/subjects/bulk", json=[
+        {"name": f"Subject {i}", "description": "Intro to chemistry"}
+        for i in range(5)
+    ] + [
+        {"name": "Chemistry for beginners", "description": None},
+        {"name": "Chemistry", "description": None},
+    ])
+
+    names = [
+        s["name"] for s in
+        client.get("/subjects/search", params={"q": "chemistry"}).json()
+    ]
+    # The first three index matches only match by description; exact and
+    # prefix name matches come from the name index on top of them
+    assert names[:2] == ["Chemistry", "Chemistry for beginners"]
+    assert len(names) == 5
+
+
+def test_search_index_follows_writes(client):
+    created = client.post("/subjects/", json={"name": "Astronomy"}).json()
+    assert len(client.get("/subjects/search?q=tron").json()) == 1
+
+    client.delete(f"/subjects/{created['id']}")
+    assert client.get("/subjects/search?q=tron").json() == []
+
+
+def test_search_treats_query_as_literal_text(client):
+    client.post("/subjects/", json={"name": "100% Maths"})
+    client.post("/subjects/", json={"name": "1000 Maths"})
+
+    names = [s["name"] for s in client.get(
+        "/subjects/search", params={"q": "0% M"}
+    ).json()]
+    assert names == ["100% Maths"]
+    assert client.get(
+        "/subjects/search", params={"q": 'a "b" OR c'}
+    ).json() == []
+
+
+def test_short_queries_match_name_prefixes(client):
+    client.post("/subjects/bulk", json=[
+        {"name": "Go", "description": None},
+        {"name": "Geography", "description": None},
+        {"name": "Algorithms", "description": "go and more"},
+    ])
+
+    def names(q):
+        response = client.get("/subjects/search", params={"q": q})
+        assert response.status_code == 200
+        return [s["name"] for s in response.json()]
+
+    assert names("go") == ["Go"]
+    assert names("G") == ["Go", "Geography"]
+    assert client.get("/subjects/search?q=").status_code == 422
+
+
+def test_bulk_delete_by_ids_reports_missing_ids(client, monkeypatch):
+    monkeypatch.setattr(
+        "app.controllers.subject_controller.BULK_DELETE_CHUNK_SIZE", 2
+    )
+    created = client.post("/subjects/bulk", json=[
+        {"name": f"Subject {i}"} for i in range(5)
+    ]).json()["created"]
+    ids = [s["id"] for s in created]
+    # Cached before the delete, must be gone after it
+    assert client.get(f"/subjects/{ids[0]}").status_code == 200
+
+    response = client.post(
+        "/subjects/bulk-delete", json={"ids": [ids[3], 999, ids[0], ids[1]]}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "deleted": sorted([ids[0], ids[1], ids[3]]),
+        "not_found": [999],
+        "has_more": False,
+    }
+    # Two DELETE ... IN chunks and a single table version bump
+    assert query_count(response) == 3
+    assert client.get(f"/subjects/{ids[0]}").status_code == 404
+    assert [s["id"] for s in client.get("/subjects/").json()] == [
+        ids[2], ids[4]
+    ]
+
+
+def test_bulk_delete_by_filter_in_chunks(client, monkeypatch):
+    monkeypatch.setattr(
+        "app.controllers.subject_controller.BULK_DELETE_CHUNK_SIZE", 2
+    )
+    monkeypatch.setattr(
+        "app.controllers.subject_controller.SUBJECTS_BULK_MAX_ITEMS", 4
+    )
+    client.post("/subjects/bulk", json=[
+        {"name": name} for name in
+        ["Old 1", "Old 2", "Old 3", "Old 4", "Old_5", "Olden", "old"]
+    ])
+
+    first = client.post(
+        "/subjects/bulk-delete", json={"filter": {"name_prefix": "Old"}}
+    ).json()
+    assert len(first["deleted"]) == 4 and first["has_more"]
+    second = client.post(
+        "/subjects/bulk-delete", json={"filter": {"name_prefix": "Old_"}}
+    ).json()
+    # "_" is matched literally, not as a LIKE wildcard
+    assert len(second["deleted"]) == 1 and not second["has_more"]
+    assert [s["name"] for s in client.get("/subjects/").json()] == [
+        "Olden", "old"
+    ]
+
+
+def test_bulk_delete_needs_exactly_one_selector(client):
+    for body in (
+        {},
+        {"ids": [1], "filter": {"min_id": 1}},
+        {"filter": {}},
+        {"ids": []},
+    ):
+        response = client.post("/subjects/bulk-delete", json=body)
+        assert response.status_code == 422, body